@@ -0,0 +1,143 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+ENCODER_MAX_BATCH = int(os.getenv("ENCODER_MAX_BATCH", "32"))
+ENCODER_MAX_WAIT_MS = float(os.getenv("ENCODER_MAX_WAIT_MS", "5"))
+# Texts allowed to wait for the encoder; beyond this callers get EncoderBusy instead of queueing forever
+ENCODER_MAX_PENDING = int(os.getenv("ENCODER_MAX_PENDING", "256"))
+
+_STOP = object()
+
+
+class EncoderBusy(Exception):
+    """Raised when the encoder backlog is full; the caller should shed the request."""
+
+
+class BatchEncoder:
+    """
+    Micro-batching front for model.encode. Concurrent callers each submit one
+    text; a single worker thread takes everything already queued (up to
+    max_batch texts) and encodes it in one batched call. Every caller gets its
+    own vector back through a Future.
+
+    A lone request is dispatched at once, so idle traffic pays no batching
+    delay. Only when others were already waiting (texts piled up while the
+    previous batch was encoding) does the worker linger up to max_wait_ms for
+    more.
+    """
+
+    def __init__(self, encode, max_batch=ENCODER_MAX_BATCH, max_wait_ms=ENCODER_MAX_WAIT_MS,
+                 max_pending=ENCODER_MAX_PENDING):
+        self._encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._counter_lock = threading.Lock() # rejected is bumped from request threads, the rest by the worker
+        self.batches = 0
+        self.texts = 0
+        self.rejected = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="batch-encoder", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(_STOP) # Blocks until there is room, so nothing queued is lost
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, text) -> Future:
+        self.start()
+        future = Future()
+        try:
+            self._queue.put_nowait((text, future))
+        except queue.Full:
+            with self._counter_lock:
+                self.rejected += 1
+            raise EncoderBusy(f"{self._queue.maxsize} texts already waiting for the encoder")
+        return future
+
+    def encode(self, text):
+        """Blocking single-text encode (for sync handlers running in the threadpool)."""
+        return self.submit(text).result()
+
+    async def encode_async(self, text):
+        """Awaitable single-text encode; the event loop never blocks on the model."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) > 1 and len(batch) < self.max_batch and not stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._encode_batch(batch)
+            if stopping:
+                return
+
+    def _encode_batch(self, batch):
+        live = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        try:
+            vectors = self._encode([text for text, _ in live], batch_size=len(live))
+        except Exception as e:
+            for _, future in live:
+                future.set_exception(e)
+            return
+        for (_, future), vector in zip(live, vectors):
+            future.set_result(vector)
+        with self._counter_lock:
+            self.batches += 1
+            self.texts += len(live)
+
+    def stats(self):
+        with self._counter_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "texts": self.texts,
+                "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0
+            }
@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import runpy
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+
+# --- CONFIGURATION ---
+MOCK_FEEDS = {
+    "data/awin_large_export.csv": "generate_awin_mock.py",
+    "data/awin_dirty_export.csv": "generate_dirty_data.py"
+}
+BENCH_QUERIES = [
+    "something to help me sleep", "hyrox", "marathon recovery", "focus at work",
+    "NeuroPeak", "50 Billion CFU", "weighted blanket 15lbs", "red light therapy",
+    "magnesium for night routine", "compression socks for travel", "gut health probiotic",
+    "home gym recovery", "blue light glasses", "smart ring sleep tracker"
+]
+
+
+def offline_env(workdir, encoder="hashing"):
+    """
+    Environment that points every external dependency at a local stand-in:
+    the numpy index instead of Pinecone, the JSONL stub instead of Resend and a
+    throwaway SQLite file instead of Postgres. Must be applied before any
+    backend module is imported, because they read their config at import.
+    """
+    return {
+        "VECTOR_BACKEND": "local",
+        "LOCAL_INDEX_DIR": os.path.join(workdir, "local_index"),
+        "LEXICAL_INDEX_DIR": os.path.join(workdir, "lexical"),
+        "INDEX_GENERATION_FILE": os.path.join(workdir, "index_generation"),
+        "CACHE_GENERATION_FILE": os.path.join(workdir, "cache_generation"),
+        "INGEST_MANIFEST_PATH": os.path.join(workdir, "ingest_manifest.db"),
+        "EMBEDDING_STORE_PATH": os.path.join(workdir, "embedding_store.db"),
+        "INGEST_SEEN_IDS_PATH": os.path.join(workdir, "ingest_seen.db"),
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "DATABASE_REPLICA_URL": "",
+        "EMAIL_SENDER": "stub",
+        "EMAIL_STUB_PATH": os.path.join(workdir, "email_stub.jsonl"),
+        "QUERY_CACHE_DISK_PATH": "",
+        "INTENT_MAP_PATH": os.path.join(workdir, "intent_map.json"),
+        "ENCODER_BACKEND": encoder,
+        "PRELOAD_MODEL": "false",
+        "RATE_LIMIT_ENABLED": "false"
+    }
+
+
+def ensure_mock_feeds():
+    """Generates the mock catalogues if they aren't on disk yet."""
+    os.makedirs("data", exist_ok=True)
+    for path, script in MOCK_FEEDS.items():
+        if not os.path.exists(path):
+            runpy.run_path(script, run_name="__main__")
+    return list(MOCK_FEEDS)
+
+
+def build_offline_index(feeds):
+    """Ingests the mock feeds into the local stand-ins; returns per-feed ingestion stats."""
+    from ingest_awin import run_ingestion
+    from vector_store import get_vector_store
+    index = get_vector_store("local")
+    return {feed: run_ingestion(feed, index=index) for feed in feeds}
+
+
+def summarize(samples_ms):
+    """Latency summary in milliseconds (p50/p95/p99/mean/max)."""
+    if not samples_ms:
+        return {"n": 0}
+    values = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(values.size),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+
+def _timed(samples, name, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+    return result
+
+
+def bench_search_stages(queries, repeats, top_k):
+    """
+    Times every stage of the /search hot path separately. The stage timings
+    call the model and indexes directly, so no cache is involved;
+    "batch_encode" is the same encode through the micro-batcher, so its gap
+    to "encode" is the hand-off cost. "end_to_end" runs the real
+    retrieve_matches_async (batcher included) on its own event loop, with
+    the query embedding cache emptied first, so each repeat pays the full
+    cost as a cold query would.
+    """
+    import main
+    from intent import match_intents
+    from resources import resources
+
+    async def end_to_end(query, intents):
+        started = time.perf_counter() # Inside the loop, so loop setup isn't counted
+        await main.retrieve_matches_async(query, intents, top_k)
+        return (time.perf_counter() - started) * 1000
+
+    resources.warm()
+    model, index = resources.model, resources.index
+    samples = {}
+    for _ in range(repeats):
+        for query in queries:
+            intents = _timed(samples, "intent_expansion", match_intents, query)
+            vector = _timed(samples, "encode", model.encode, query)
+            _timed(samples, "batch_encode", resources.batch_encoder.encode, query)
+            vector = _timed(samples, "intent_blend", resources.intent_embeddings.blend, vector, intents)
+            results = _timed(samples, "vector_query", index.query, vector,
+                             top_k=main.candidate_count(top_k), include_metadata=True, include_values=main.RERANK_WITH_VECTORS)
+            _timed(samples, "threshold", main.apply_threshold, results)
+            _timed(samples, "lexical_fuse_rerank", main.fuse_matches, query, results, top_k)
+            resources.embedding_cache.clear()
+            samples.setdefault("end_to_end", []).append(asyncio.run(end_to_end(query, intents)))
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+def bench_searchlog_writes(rows):
+    """Per-row cost of SearchLog writes: one commit per row (old path) vs the LogWriter's bulk flush."""
+    from sqlmodel import Session
+    from database import engine, create_db_and_tables
+    from models import SearchLog
+    from log_writer import LogWriter
+
+    create_db_and_tables()
+    direct = []
+    for i in range(rows):
+        started = time.perf_counter()
+        with Session(engine) as session:
+            session.add(SearchLog(query=f"bench direct {i}", results_summary="A | B | C"))
+            session.commit()
+        direct.append((time.perf_counter() - started) * 1000)
+
+    writer = LogWriter(engine, dedupe_model=SearchLog, max_queue=rows + 1, batch_size=rows, flush_interval=3600)
+    submit = []
+    for i in range(rows):
+        started = time.perf_counter()
+        writer.submit(SearchLog(query=f"bench queued {i}", results_summary="A | B | C"))
+        submit.append((time.perf_counter() - started) * 1000)
+    writer.start()
+    started = time.perf_counter()
+    writer.stop() # Drains and flushes everything submitted above in bulk
+    flush_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "direct_commit_per_row": summarize(direct),
+        "log_writer_submit": summarize(submit),
+        "log_writer_flush_per_row_ms": round(flush_ms / rows, 4) if rows else 0.0,
+        "log_writer": writer.stats()
+    }
+
+
+def run_benchmarks(repeats=5, top_k=3, log_rows=500, encoder="hashing", workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix="ventiko-bench-")
+    os.environ.update(offline_env(workdir, encoder))
+
+    # Progress chatter goes to stderr so stdout stays pure JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        feeds = ensure_mock_feeds()
+        started = time.perf_counter()
+        ingestion = build_offline_index(feeds)
+        ingest_seconds = time.perf_counter() - started
+        search_stages = bench_search_stages(BENCH_QUERIES, repeats, top_k)
+        searchlog_writes = bench_searchlog_writes(log_rows)
+
+    return {
+        "meta": {
+            "encoder": encoder,
+            "queries": len(BENCH_QUERIES),
+            "repeats": repeats,
+            "top_k": top_k,
+            "workdir": workdir,
+            "python": sys.version.split()[0],
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        },
+        "ingestion": {
+            "seconds": round(ingest_seconds, 2),
+            "feeds": {feed: {k: v for k, v in stats.items() if k != "embedding_store"}
+                      for feed, stats in ingestion.items()}
+        },
+        "search_stages": search_stages,
+        "searchlog_writes": searchlog_writes
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline per-stage benchmark of ingestion and the /search hot path (local index, stub email, SQLite)."
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the query set")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--log-rows", type=int, default=500, help="SearchLog rows written per write benchmark")
+    parser.add_argument("--encoder", default="hashing",
+                        help="ENCODER_BACKEND to use: hashing (no weights needed), torch, quantized, onnx, onnx-int8")
+    parser.add_argument("--workdir", default=None, help="Where the throwaway index and databases go (default: temp dir)")
+    parser.add_argument("--output", default=None, help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.repeats, args.top_k, args.log_rows, args.encoder, args.workdir)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            f.write(payload)
+    print(payload)
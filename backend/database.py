@@ -0,0 +1,185 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect, text
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import Session, SQLModel, create_engine
+
+import models # Registers every table on SQLModel.metadata
+
+load_dotenv()
+
+# --- POOL CONFIGURATION (per deployment) ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10")) # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Seconds; beat the provider's idle cutoff
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+# Rollups and pruning run from cron on their own engine; 0 = no statement_timeout
+MAINTENANCE_STATEMENT_TIMEOUT_MS = int(os.getenv("MAINTENANCE_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def normalize_url(url):
+    if url and url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+pool_metrics = {}
+
+
+class PoolMetrics:
+    """Checkout/checkin counters and connection hold times for one engine, fed by pool events."""
+
+    def __init__(self, engine, name):
+        self.engine = engine
+        self.name = name
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.held_ms_total = 0.0
+        self.held_ms_max = 0.0
+
+        pool = engine.pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_conn, record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_conn, record, proxy):
+        with self._lock:
+            self.checkouts += 1
+        record.info["checked_out_at"] = time.monotonic()
+
+    def _on_checkin(self, dbapi_conn, record):
+        checked_out_at = record.info.pop("checked_out_at", None)
+        held_ms = (time.monotonic() - checked_out_at) * 1000.0 if checked_out_at else 0.0
+        with self._lock:
+            self.checkins += 1
+            self.held_ms_total += held_ms
+            self.held_ms_max = max(self.held_ms_max, held_ms)
+
+    def _on_invalidate(self, dbapi_conn, record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        pool = self.engine.pool
+        stats = {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "avg_held_ms": round(self.held_ms_total / self.checkins, 2) if self.checkins else 0.0,
+            "max_held_ms": round(self.held_ms_max, 2),
+            "status": pool.status()
+        }
+        # QueuePool-only gauges (SQLite may use a different pool class)
+        for gauge in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, gauge):
+                stats[gauge] = getattr(pool, gauge)()
+        return stats
+
+
+def build_engine(url, name, statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS):
+    """Creates an engine with this deployment's pool settings and attaches PoolMetrics."""
+    if url.startswith("sqlite"):
+        engine = create_engine(url) # Pool sizing and statement_timeout are Postgres-only
+    else:
+        engine = create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING, # Drops connections the managed Postgres already closed
+            connect_args={"options": f"-c statement_timeout={statement_timeout_ms}"}
+        )
+    pool_metrics[name] = PoolMetrics(engine, name)
+    return engine
+
+# --- ENGINE CREATION ---
+database_url = normalize_url(os.getenv("DATABASE_URL"))
+
+if not database_url:
+    print("!!! WARNING: No DATABASE_URL found. Falling back to temporary SQLite.")
+    sqlite_file_name = "search_history.db"
+    database_url = f"sqlite:///{sqlite_file_name}"
+
+engine = build_engine(database_url, "primary")
+
+# Optional read replica for the heavy read-only endpoints (/archive, /admin-data, exports)
+replica_url = normalize_url(os.getenv("DATABASE_REPLICA_URL"))
+read_engine = build_engine(replica_url, "replica") if replica_url else engine
+
+def build_maintenance_engine():
+    """
+    Primary-database engine for the maintenance CLI, without the request path's
+    statement_timeout. Built on demand so API workers never open its pool.
+    """
+    if database_url.startswith("sqlite"):
+        return engine
+    return build_engine(database_url, "maintenance", MAINTENANCE_STATEMENT_TIMEOUT_MS)
+
+def create_db_and_tables():
+    """Creates missing tables (with their indexes). Cheap enough for every worker's startup."""
+    SQLModel.metadata.create_all(engine)
+
+def ensure_indexes(bind=None):
+    """
+    create_all skips tables that already exist, so add any index they're missing.
+    Run from the maintenance CLI, never at startup: on Postgres each index is
+    built CONCURRENTLY, so the live tables keep taking writes while it runs.
+    Returns the names of the indexes created.
+    """
+    bind = bind if bind is not None else engine
+    indexes = [index for table in SQLModel.metadata.sorted_tables for index in table.indexes]
+    created = []
+    if bind.dialect.name != "postgresql":
+        inspector = inspect(bind)
+        for index in indexes:
+            if index.name not in {ix["name"] for ix in inspector.get_indexes(index.table.name)}:
+                index.create(bind)
+                created.append(index.name)
+        return created
+
+    # CONCURRENTLY can't run inside a transaction block
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SET statement_timeout = 0")) # A concurrent build on a big table takes minutes
+        try:
+            for index in indexes:
+                valid = conn.execute(
+                    text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                         "WHERE c.relname = :name"),
+                    {"name": index.name}
+                ).scalar()
+                if valid:
+                    continue
+                name = conn.dialect.identifier_preparer.quote(index.name)
+                if valid is False: # Left INVALID by an interrupted concurrent build; IF NOT EXISTS would keep it
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                ddl = str(CreateIndex(index).compile(dialect=conn.dialect))
+                conn.execute(text(ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)))
+                created.append(index.name)
+        finally:
+            conn.execute(text("RESET statement_timeout"))
+    return created
+
+def get_session():
+    with Session(engine) as session:
+        yield session
+
+def get_read_session():
+    with Session(read_engine) as session:
+        yield session
+
+def pool_stats():
+    return {name: metrics.stats() for name, metrics in pool_metrics.items()}
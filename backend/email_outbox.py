@@ -0,0 +1,229 @@
+import os
+import json
+import logging
+import time
+import random
+import datetime
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import update, func
+from sqlmodel import Session, select
+
+from models import EmailOutbox
+from observability import get_logger, log_event, stage_seconds
+
+load_dotenv()
+
+logger = get_logger("email_outbox")
+
+# --- CONFIGURATION ---
+# resend | stub. Unset means resend, which needs RESEND_API_KEY; the stub is never picked implicitly
+EMAIL_SENDER = os.getenv("EMAIL_SENDER", "")
+EMAIL_FROM = os.getenv("EMAIL_FROM", "Ventiko Engine <noreply@results.ventiko.app>")
+EMAIL_STUB_PATH = os.getenv("EMAIL_STUB_PATH", "data/email_stub.jsonl")
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5.0")) # Seconds between scans when idle
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "30")) # Seconds; doubles per attempt
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+# A claimed row is hidden from other workers this long; if the sender dies mid-send it is retried after
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+
+
+# --- SENDERS ---
+
+class ResendSender:
+    def __init__(self, api_key=None):
+        import resend
+        resend.api_key = api_key or os.getenv("RESEND_API_KEY")
+        self._resend = resend
+
+    def send(self, to, subject, html):
+        self._resend.Emails.send({"from": EMAIL_FROM, "to": to, "subject": subject, "html": html})
+
+
+class StubSender:
+    """Local stand-in for Resend: appends each message to a JSONL file instead of sending it."""
+
+    def __init__(self, path=EMAIL_STUB_PATH, fail_rate=0.0):
+        self.path = path
+        self.fail_rate = fail_rate # >0 simulates a flaky provider to exercise the retries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def send(self, to, subject, html):
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise RuntimeError("stub sender: simulated provider failure")
+        record = {"to": to, "subject": subject, "html_bytes": len(html), "sent_at": time.time()}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def get_sender(kind=None):
+    """
+    The configured sender. Raises at startup rather than falling back to the
+    stub, which would mark every message sent without delivering any.
+    """
+    kind = (kind or EMAIL_SENDER or "resend").lower()
+    if kind == "resend":
+        if not os.getenv("RESEND_API_KEY"):
+            raise RuntimeError("RESEND_API_KEY is not set (set EMAIL_SENDER=stub to write emails to a local file)")
+        return ResendSender()
+    if kind == "stub":
+        return StubSender()
+    raise ValueError(f"Unknown EMAIL_SENDER '{kind}' (expected resend or stub)")
+
+
+# --- OUTBOX ---
+
+def enqueue_email(session: Session, to, subject, html) -> EmailOutbox:
+    """Adds a message to the outbox; it is sent once the caller's transaction commits."""
+    message = EmailOutbox(to=to, subject=subject, html=html)
+    session.add(message)
+    return message
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2) # Jitter so a provider outage doesn't retry in lockstep
+
+
+class OutboxSender:
+    """
+    Background delivery for EmailOutbox rows.
+
+    One daemon thread scans for pending rows whose next_attempt_at has passed,
+    claims each with a conditional UPDATE (so several workers can share one
+    outbox without double-sending), and hands it to the sender. Failures are
+    retried with exponential backoff; after max_attempts the row is marked
+    failed and left for inspection. notify() wakes the thread right after a
+    request enqueues, so the happy path doesn't wait for the poll interval.
+    The configured sender is built by start(), so a missing provider key fails
+    the server at boot rather than at import.
+    """
+
+    def __init__(self, engine, sender=None, poll_interval=OUTBOX_POLL_INTERVAL,
+                 batch_size=OUTBOX_BATCH_SIZE, max_attempts=OUTBOX_MAX_ATTEMPTS):
+        self.engine = engine
+        self.sender = sender
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        if self.sender is None:
+            self.sender = get_sender()
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.process_due()
+            except Exception as e:
+                log_event(logger, "scan_failed", level=logging.ERROR, error=str(e))
+                processed = 0
+            if processed < self.batch_size: # A full batch means more may be due right now
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def process_due(self) -> int:
+        """Sends one batch of due messages. Returns how many were attempted."""
+        now = datetime.datetime.utcnow()
+        with Session(self.engine) as session:
+            due = session.exec(
+                select(EmailOutbox.id, EmailOutbox.next_attempt_at)
+                .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.batch_size)
+            ).all()
+
+        attempted = 0
+        for message_id, seen_at in due:
+            message = self._claim(message_id, seen_at)
+            if message is not None:
+                self._deliver(message)
+                attempted += 1
+        return attempted
+
+    def _claim(self, message_id, seen_at):
+        lease_until = datetime.datetime.utcnow() + datetime.timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        with Session(self.engine, expire_on_commit=False) as session:
+            claimed = session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == message_id, EmailOutbox.status == "pending",
+                       EmailOutbox.next_attempt_at == seen_at)
+                .values(next_attempt_at=lease_until, attempts=EmailOutbox.attempts + 1)
+            ).rowcount
+            session.commit()
+            if not claimed:
+                return None # Another worker got there first
+            return session.get(EmailOutbox, message_id)
+
+    def _deliver(self, message):
+        try:
+            with stage_seconds.time(stage="email_send"):
+                self.sender.send(message.to, message.subject, message.html)
+        except Exception as e:
+            self._record_failure(message, e)
+            return
+        with Session(self.engine) as session:
+            session.execute(
+                update(EmailOutbox).where(EmailOutbox.id == message.id)
+                .values(status="sent", sent_at=datetime.datetime.utcnow(), last_error=None)
+            )
+            session.commit()
+        self.sent += 1
+        log_event(logger, "email_sent", to=message.to, attempt=message.attempts)
+
+    def _record_failure(self, message, error):
+        values = {"last_error": str(error)[:500]}
+        if message.attempts >= self.max_attempts:
+            values["status"] = "failed"
+            self.failed += 1
+            log_event(logger, "email_failed", level=logging.ERROR, to=message.to, attempts=message.attempts,
+                      error=str(error))
+        else:
+            delay = backoff_seconds(message.attempts)
+            values["next_attempt_at"] = datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
+            self.retried += 1
+            log_event(logger, "email_retry", level=logging.WARNING, to=message.to, attempt=message.attempts,
+                      retry_in_seconds=round(delay), error=str(error))
+        with Session(self.engine) as session:
+            session.execute(update(EmailOutbox).where(EmailOutbox.id == message.id).values(**values))
+            session.commit()
+
+    def stats(self):
+        with Session(self.engine) as session:
+            by_status = dict(session.exec(
+                select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+            ).all())
+        return {
+            "pending": by_status.get("pending", 0),
+            "sent_total": by_status.get("sent", 0),
+            "failed_total": by_status.get("failed", 0),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "sender": type(self.sender).__name__ if self.sender is not None else None
+        }
@@ -0,0 +1,155 @@
+import html
+import datetime
+from string import Template
+
+# --- BELSTAFF CLEAN STYLE ---
+# Parsed once at import; render_results_email() only substitutes values.
+
+LOGO_URL = "https://ventiko.app/ventiko_logo2.png" # PRODUCTION URL
+UNSUBSCRIBE_LINK = "https://ventiko.app/?modal=unsubscribe"
+
+GRID_PLACEHOLDER_IMAGE = "https://via.placeholder.com/250x200?text=Product"
+HERO_PLACEHOLDER_IMAGE = "https://via.placeholder.com/600x400?text=Top+Match"
+
+GRID_CELL = Template("""
+            <td width="50%" valign="top" style="padding: 10px;">
+                <table width="100%" border="0" cellspacing="0" cellpadding="0" style="border: 1px solid #e2e8f0; border-radius: 8px; overflow: hidden;">
+                    <tr>
+                        <td align="center" style="background-color: #ffffff; height: 200px; vertical-align: middle;">
+                            <a href="$link">
+                                <img src="$image" width="100%" style="display: block; max-height: 180px; width: auto; max-width: 100%; margin: 0 auto; object-fit: contain;" alt="$title">
+                            </a>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 15px; background-color: #f8fafc;">
+                            <div style="font-family: Helvetica, Arial, sans-serif; font-size: 13px; font-weight: bold; color: #0f172a; margin-bottom: 5px; height: 36px; overflow: hidden; line-height: 1.4;">$title</div>
+                            <div style="font-family: Helvetica, Arial, sans-serif; font-size: 12px; color: #64748b; margin-bottom: 10px;">$price</div>
+                            <a href="$link" style="display: block; text-align: center; font-family: Helvetica, Arial, sans-serif; font-size: 11px; font-weight: bold; color: #ffffff; background-color: #2c3e50; text-decoration: none; padding: 8px 0; border-radius: 4px;">VIEW &rarr;</a>
+                        </td>
+                    </tr>
+                </table>
+            </td>
+            """)
+
+GRID_ROW = Template("""
+        <tr>
+            <td style="padding: 20px 0;">
+                <table width="100%" border="0" cellspacing="0" cellpadding="0">
+                    <tr>
+                        $cells
+                    </tr>
+                </table>
+            </td>
+        </tr>
+        """)
+
+HERO = Template("""
+        <tr>
+            <td align="center" style="padding: 0 0 20px 0;">
+                <a href="$link" style="text-decoration: none;">
+                    <img src="$image" width="600" style="display: block; width: 100%; max-width: 600px; border-radius: 8px; object-fit: contain; max-height: 400px;" alt="$title">
+                </a>
+            </td>
+        </tr>
+        <tr>
+            <td align="center" style="padding: 10px 0 30px 0; border-bottom: 1px solid #f1f5f9;">
+                <h2 style="font-family: Helvetica, Arial, sans-serif; font-size: 24px; font-weight: bold; color: #0f172a; margin: 0 0 10px 0;">$title</h2>
+                <p style="font-family: Helvetica, Arial, sans-serif; font-size: 18px; color: #23F0C7; font-weight: bold; margin: 0 0 20px 0;">$price</p>
+                <a href="$link" style="background-color: #0f172a; color: #ffffff; padding: 14px 35px; font-family: Helvetica, Arial, sans-serif; font-size: 14px; font-weight: bold; text-decoration: none; border-radius: 50px; display: inline-block;">VIEW DEAL</a>
+            </td>
+        </tr>
+        """)
+
+PAGE = Template("""
+    <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+    <html xmlns="http://www.w3.org/1999/xhtml">
+    <head>
+        <meta http-equiv="Content-Type" content="text/html; charset=UTF-8" />
+        <meta name="viewport" content="width=device-width, initial-scale=1.0"/>
+        <title>Ventiko Results</title>
+    </head>
+    <body style="margin: 0; padding: 0; background-color: #f1f5f9;">
+        <table border="0" cellpadding="0" cellspacing="0" width="100%">
+            <tr>
+                <td style="padding: 20px 0 40px 0;" align="center">
+                    <table border="0" cellpadding="0" cellspacing="0" width="600" style="background-color: #ffffff; border-radius: 16px; overflow: hidden; box-shadow: 0 10px 25px rgba(0,0,0,0.05);">
+
+                        <tr>
+                            <td align="center" style="padding: 30px 0 10px 0;">
+                                <a href="https://ventiko.app" style="text-decoration: none;">
+                                    <img src="$logo_url" alt="VENTIKO" width="280" style="display: block; border: 0; max-width: 100%;">
+                                </a>
+                                <p style="margin: 5px 0 0 0; font-family: 'Courier New', monospace; font-size: 11px; color: #94a3b8; text-transform: uppercase; letter-spacing: 2px;">
+                                    AI Product Finder
+                                </p>
+                            </td>
+                        </tr>
+
+                        <tr>
+                            <td align="center" style="padding: 20px 0 30px 0;">
+                                <span style="font-family: Helvetica, Arial, sans-serif; background-color: #ecfdf5; color: #065f46; padding: 8px 20px; border-radius: 50px; font-size: 14px; font-weight: bold; border: 1px solid #23F0C7;">
+                                    "$query"
+                                </span>
+                            </td>
+                        </tr>
+
+                        $hero_html
+
+                        $grid_html
+
+                        <tr>
+                            <td bgcolor="#0f172a" style="padding: 40px 30px; text-align: center;">
+                                <p style="color: #64748b; font-family: Helvetica, Arial, sans-serif; font-size: 12px; line-height: 18px; margin: 0;">
+                                    &copy; $year Ventiko Ltd.<br/>
+                                    Isle of Man, United Kingdom
+                                </p>
+                                <p style="margin-top: 15px;">
+                                    <a href="https://ventiko.app" style="color: #475569; font-family: Helvetica, Arial, sans-serif; font-size: 11px; text-decoration: none;">Home</a>
+                                    <span style="color: #475569;">&nbsp;|&nbsp;</span>
+                                    <a href="mailto:support@ventiko.app" style="color: #475569; font-family: Helvetica, Arial, sans-serif; font-size: 11px; text-decoration: none;">Contact</a>
+                                    <span style="color: #475569;">&nbsp;|&nbsp;</span>
+                                    <a href="$unsubscribe_link" style="color: #475569; font-family: Helvetica, Arial, sans-serif; font-size: 11px; text-decoration: underline;">Unsubscribe</a>
+                                </p>
+                            </td>
+                        </tr>
+
+                    </table>
+                </td>
+            </tr>
+        </table>
+    </body>
+    </html>
+    """)
+
+
+def _fields(item, placeholder_image, default_price):
+    # Feed values are untrusted text, so escape them before they land in markup
+    return {
+        "link": html.escape(item.link),
+        "image": html.escape(item.image or placeholder_image),
+        "title": html.escape(item.title),
+        "price": html.escape(item.price or default_price)
+    }
+
+
+def render_results_email(query, results) -> str:
+    """Belstaff-style results email: first item as the hero, the next two in a grid."""
+    hero_item = results[0] if results else None
+    secondary_items = results[1:3]
+
+    hero_html = HERO.substitute(_fields(hero_item, HERO_PLACEHOLDER_IMAGE, "View Deal")) if hero_item else ""
+    grid_html = ""
+    if secondary_items:
+        cells = "".join(GRID_CELL.substitute(_fields(item, GRID_PLACEHOLDER_IMAGE, "Check Price"))
+                        for item in secondary_items)
+        grid_html = GRID_ROW.substitute(cells=cells)
+
+    return PAGE.substitute(
+        logo_url=LOGO_URL,
+        unsubscribe_link=UNSUBSCRIBE_LINK,
+        query=html.escape(query),
+        hero_html=hero_html,
+        grid_html=grid_html,
+        year=datetime.datetime.now().year
+    )
@@ -0,0 +1,157 @@
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", "data/embedding_store.db")
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+
+def text_key(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Disk-backed embedding cache keyed by (model name, hash of the exact text).
+    The same product text is embedded once no matter how many feeds, re-ingests
+    or index rebuilds it shows up in.
+    """
+
+    def __init__(self, path=EMBEDDING_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, key TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL, "
+                "last_used REAL NOT NULL, PRIMARY KEY (model, key))"
+            )
+
+    def get_many(self, model_name, texts):
+        """Returns a list aligned with texts: a float32 vector, or None on a miss."""
+        keys = [text_key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500): # Stay under SQLite's bound-parameter limit
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    (model_name, *chunk)
+                ).fetchall()
+                found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+            if found:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                        [(time.time(), model_name, key) for key in found]
+                    )
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return [found.get(key) for key in keys]
+
+    def put_many(self, model_name, texts, vectors):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((model_name, text_key(text), vector.shape[0], vector.tobytes(), now))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+
+    def compact(self, max_age_days=None, max_entries=None):
+        """Drops entries unused for max_age_days and/or beyond the max_entries most recent, then VACUUMs."""
+        removed = 0
+        with self._lock:
+            with self._conn:
+                if max_age_days is not None:
+                    cutoff = time.time() - max_age_days * 86400
+                    removed += self._conn.execute(
+                        "DELETE FROM embeddings WHERE last_used < ?", (cutoff,)
+                    ).rowcount
+                if max_entries is not None:
+                    removed += self._conn.execute(
+                        "DELETE FROM embeddings WHERE rowid NOT IN "
+                        "(SELECT rowid FROM embeddings ORDER BY last_used DESC LIMIT ?)", (max_entries,)
+                    ).rowcount
+            self._conn.execute("VACUUM")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "size_mb": round(os.path.getsize(self.path) / 1e6, 2) if os.path.exists(self.path) else 0.0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEncoder:
+    """
+    Drop-in wrapper around SentenceTransformer.encode that consults an
+    EmbeddingStore first and only runs the model on cache misses.
+    """
+
+    def __init__(self, model, store=None, model_name=None):
+        self.model = model
+        self.store = store if store is not None else EmbeddingStore()
+        # Backends from encoders.py carry a name like "all-MiniLM-L6-v2:onnx-int8", so
+        # quantized vectors never mix with reference ones in the store
+        self.model_name = model_name or getattr(model, "name", MODEL_NAME)
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = self.store.get_many(self.model_name, texts)
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            fresh = self.model.encode([texts[i] for i in missing], batch_size=batch_size, **kwargs)
+            self.store.put_many(self.model_name, [texts[i] for i in missing], fresh)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = np.asarray(vector, dtype=np.float32)
+
+        result = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return result[0] if single else result
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or compact the embedding store.")
+    parser.add_argument("--path", default=EMBEDDING_STORE_PATH)
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--max-age-days", type=float, default=None)
+    parser.add_argument("--max-entries", type=int, default=None)
+    args = parser.parse_args()
+
+    store = EmbeddingStore(args.path)
+    if args.compact:
+        removed = store.compact(args.max_age_days, args.max_entries)
+        print(f" -> Compacted: removed {removed} entries")
+    print(store.stats())
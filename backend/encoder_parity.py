@@ -0,0 +1,142 @@
+import sys
+import csv
+import json
+import time
+import queue
+import argparse
+import resource
+import multiprocessing as mp
+import numpy as np
+
+# --- CONFIGURATION ---
+BACKENDS = ["torch", "quantized", "onnx", "onnx-int8"]
+SAMPLE_FEEDS = ["data/awin_large_export.csv", "data/awin_dirty_export.csv"]
+# Seconds one backend may take to load and encode the sample before it counts as failed
+BACKEND_TIMEOUT = 900
+SAMPLE_QUERIES = [
+    "something to help me sleep", "hyrox", "marathon recovery", "focus at work",
+    "NeuroPeak", "50 Billion CFU", "weighted blanket 15lbs", "red light therapy"
+]
+
+
+def load_sample_texts(limit):
+    """Product texts built exactly like ingest_awin.py builds them, plus typical queries."""
+    from ingest_awin import clean_html # Parent process only; keeps the profiled children clean
+    texts = list(SAMPLE_QUERIES)
+    for path in SAMPLE_FEEDS:
+        try:
+            with open(path, mode='r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    if len(texts) >= limit:
+                        return texts
+                    if row['product_name']:
+                        category = row['merchant_category'] or "Uncategorized"
+                        texts.append(f"{row['product_name'].strip()}. {clean_html(row['description'])}. Category: {category}.")
+        except FileNotFoundError:
+            continue
+    return texts
+
+
+def _rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _profile_backend(backend, texts, result_q):
+    """Runs in a fresh process so RSS and load time belong to this backend alone."""
+    from encoders import load_encoder
+    try:
+        base_rss = _rss_mb()
+        started = time.perf_counter()
+        encoder = load_encoder(backend)
+        load_seconds = time.perf_counter() - started
+
+        encoder.encode(texts[:4]) # Warm-up
+        latencies = []
+        for text in texts[:200]:
+            t0 = time.perf_counter()
+            encoder.encode(text)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        vectors = np.asarray(encoder.encode(texts, batch_size=64), dtype=np.float32)
+        batch_seconds = time.perf_counter() - t0
+
+        result_q.put({
+            "backend": backend,
+            "vectors": vectors,
+            "load_seconds": round(load_seconds, 2),
+            "single_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "single_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "batch_texts_per_sec": round(len(texts) / batch_seconds, 1),
+            "rss_mb": round(_rss_mb(), 1),
+            "rss_delta_mb": round(_rss_mb() - base_rss, 1)
+        })
+    except Exception as e:
+        result_q.put({"backend": backend, "error": str(e)})
+
+
+def _wait_for_result(proc, result_q, backend, timeout):
+    """
+    The child's result, or an error if it died without one (an OOM kill or a
+    crash in native code never reaches the except in _profile_backend) or
+    ran past the timeout.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return result_q.get(timeout=1.0)
+        except queue.Empty:
+            pass
+        if not proc.is_alive():
+            try:
+                return result_q.get(timeout=1.0) # Put just before it exited
+            except queue.Empty:
+                return {"backend": backend, "error": f"process exited with code {proc.exitcode} and no result"}
+        if time.monotonic() >= deadline:
+            proc.terminate()
+            return {"backend": backend, "error": f"no result after {timeout:.0f}s"}
+
+
+def run_parity(backends, limit, min_cosine, timeout=BACKEND_TIMEOUT):
+    texts = load_sample_texts(limit)
+    ctx = mp.get_context("spawn")
+    results = {}
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        result_q = ctx.Queue()
+        proc = ctx.Process(target=_profile_backend, args=(backend, texts, result_q))
+        proc.start()
+        results[backend] = _wait_for_result(proc, result_q, backend, timeout)
+        proc.join()
+
+    reference = results["torch"].get("vectors")
+    report = {"texts": len(texts), "min_cosine_required": min_cosine, "backends": {}}
+    passed = True
+    for backend, result in results.items():
+        vectors = result.pop("vectors", None)
+        if vectors is not None and reference is not None:
+            # Divide by norms anyway so a backend that forgets to normalize still compares fairly
+            cosines = (vectors * reference).sum(axis=1) / (
+                np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)
+            )
+            result["cosine_min"] = round(float(cosines.min()), 5)
+            result["cosine_mean"] = round(float(cosines.mean()), 5)
+            result["parity_ok"] = bool(cosines.min() >= min_cosine)
+            passed = passed and result["parity_ok"]
+        elif "error" in result:
+            passed = False
+        report["backends"][backend] = result
+    return report, passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare encoder backends against the reference PyTorch model.")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--limit", type=int, default=500, help="Number of sample texts")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--timeout", type=float, default=BACKEND_TIMEOUT, help="Seconds allowed per backend")
+    args = parser.parse_args()
+
+    report, passed = run_parity(args.backends, args.limit, args.min_cosine, args.timeout)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if passed else 1)
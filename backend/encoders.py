@@ -0,0 +1,137 @@
+import os
+import zlib
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# ENCODER_BACKEND=torch (default) | quantized (int8 dynamic, PyTorch) | onnx | onnx-int8
+# | hashing (offline stand-in for benchmarks; no model weights, not for production)
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch").lower()
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+HF_MODEL_ID = f"sentence-transformers/{MODEL_NAME}"
+ONNX_DIR = os.getenv("ONNX_MODEL_DIR", "data/onnx")
+MAX_SEQ_LENGTH = 256 # Matches all-MiniLM-L6-v2's SentenceTransformer config
+
+
+class TorchEncoder:
+    """Reference backend: the stock SentenceTransformer, optionally int8-quantized."""
+
+    def __init__(self, quantize=False):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(MODEL_NAME, device="cpu")
+        if quantize:
+            import torch
+            # Dynamic quantization swaps every nn.Linear for an int8 kernel; weights are converted once here
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        # The reference backend keeps the bare model name, so embeddings stored before
+        # the other backends existed (see embedding_store.py) are still found
+        self.name = f"{MODEL_NAME}:torch-int8" if quantize else MODEL_NAME
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        return self.model.encode(sentences, batch_size=batch_size, **kwargs)
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime backend. Reproduces the SentenceTransformer pipeline
+    (tokenize -> transformer -> mean pooling -> L2 normalize) without torch.
+    """
+
+    def __init__(self, quantized=False, onnx_dir=ONNX_DIR):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = os.path.join(onnx_dir, "model-int8.onnx" if quantized else "model.onnx")
+        if not os.path.exists(path):
+            export_onnx(onnx_dir)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        self.name = f"{MODEL_NAME}:{'onnx-int8' if quantized else 'onnx'}"
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=MAX_SEQ_LENGTH, return_tensors="np"
+            )
+            feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            chunks.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+        result = np.vstack(chunks).astype(np.float32) if chunks else np.zeros((0, 384), dtype=np.float32)
+        return result[0] if single else result
+
+
+def export_onnx(onnx_dir=ONNX_DIR):
+    """One-off export of the HF transformer to ONNX, plus an int8 dynamically quantized copy."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(onnx_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_ID)
+    model = AutoModel.from_pretrained(HF_MODEL_ID).eval()
+    tokenizer.save_pretrained(onnx_dir)
+
+    sample = tokenizer(["ventiko export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    fp32_path = os.path.join(onnx_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[name] for name in names), fp32_path,
+            input_names=names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic, opset_version=14
+        )
+    quantize_dynamic(fp32_path, os.path.join(onnx_dir, "model-int8.onnx"), weight_type=QuantType.QInt8)
+    print(f" -> Exported ONNX encoder to {onnx_dir}")
+
+
+class HashingEncoder:
+    """
+    Deterministic bag-of-words hashing into EMBEDDING_DIM buckets. Needs no
+    weights or network, so benchmarks and load tests run anywhere; the vectors
+    carry no real semantics.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.name = f"hashing-{dim}:hashing"
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors[0] if single else vectors
+
+
+def load_encoder(backend=None):
+    """Returns the query/document encoder selected by ENCODER_BACKEND."""
+    backend = (backend or ENCODER_BACKEND).lower()
+    if backend == "torch":
+        return TorchEncoder()
+    if backend == "quantized":
+        return TorchEncoder(quantize=True)
+    if backend == "onnx":
+        return OnnxEncoder()
+    if backend == "onnx-int8":
+        return OnnxEncoder(quantized=True)
+    if backend == "hashing":
+        return HashingEncoder()
+    raise ValueError(f"Unknown ENCODER_BACKEND: {backend}")
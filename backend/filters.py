@@ -0,0 +1,103 @@
+import math
+import numpy as np
+
+# --- SEARCH FILTERS ---
+# Filters use Pinecone's metadata filter syntax, so the same dict is sent to the
+# hosted index as-is and evaluated locally by MetadataBitmaps.
+
+EXACT_FIELDS = ("merchant", "category")
+RANGE_FIELDS = ("price",)
+RANGE_OPS = {
+    "$gte": np.greater_equal,
+    "$gt": np.greater,
+    "$lte": np.less_equal,
+    "$lt": np.less
+}
+
+
+def build_filter(min_price=None, max_price=None, merchants=None, categories=None):
+    """Turns /search query params into a metadata filter dict (None when nothing is filtered)."""
+    clauses = {}
+    price = {}
+    if min_price is not None:
+        price["$gte"] = float(min_price)
+    if max_price is not None:
+        price["$lte"] = float(max_price)
+    if price:
+        clauses["price"] = price
+    if merchants:
+        clauses["merchant"] = {"$in": sorted(set(merchants))}
+    if categories:
+        clauses["category"] = {"$in": sorted(set(categories))}
+    return clauses or None
+
+
+def as_price(value) -> float:
+    """Metadata price as a float; tolerates the old string prices (NaN if unusable)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class MetadataBitmaps:
+    """
+    Precomputed per-merchant and per-category boolean masks plus a price column
+    for a fixed list of metadata rows. A filter becomes a few ORs and ANDs over
+    the masks instead of a per-row metadata scan.
+    """
+
+    def __init__(self, metadata):
+        self.size = len(metadata)
+        self.exact = {field: {} for field in EXACT_FIELDS}
+        for position, meta in enumerate(metadata):
+            for field in EXACT_FIELDS:
+                value = meta.get(field)
+                if value is None:
+                    continue
+                mask = self.exact[field].get(value)
+                if mask is None:
+                    mask = self.exact[field][value] = np.zeros(self.size, dtype=bool)
+                mask[position] = True
+        self.ranges = {
+            field: np.array([as_price(meta.get(field)) for meta in metadata], dtype=np.float64)
+            for field in RANGE_FIELDS
+        }
+
+    def mask(self, filter):
+        """Boolean mask of rows matching filter, or None when filter is empty."""
+        if not filter:
+            return None
+        result = np.ones(self.size, dtype=bool)
+        for field, condition in filter.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            if field in EXACT_FIELDS:
+                result &= self._exact_mask(field, condition)
+            elif field in RANGE_FIELDS:
+                column = self.ranges[field]
+                for op, bound in condition.items():
+                    if op not in RANGE_OPS:
+                        raise ValueError(f"Unsupported operator {op} for {field}")
+                    result &= RANGE_OPS[op](column, float(bound)) # NaN prices never match
+            else:
+                raise ValueError(f"Unsupported filter field: {field}")
+        return result
+
+    def _exact_mask(self, field, condition):
+        masks = self.exact[field]
+        result = np.zeros(self.size, dtype=bool)
+        for op, value in condition.items():
+            if op == "$eq":
+                values = [value]
+            elif op == "$in":
+                values = value
+            else:
+                raise ValueError(f"Unsupported operator {op} for {field}")
+            for v in values:
+                if v in masks:
+                    result |= masks[v]
+        return result
+
+    def counts(self):
+        return {field: len(values) for field, values in self.exact.items()}
@@ -72,49 +72,51 @@ def generate_description(title, category):
     return f"<strong>{title}</strong><br> {benefit} <br> <ul><li>Batch Tested</li><li>Clinical Dose</li></ul> <span>Category: {category}</span>"
 
 # --- GENERATOR LOGIC ---
-print(f"Generating {ROW_COUNT} realistic products...")
-
-rows = []
-
-for i in range(ROW_COUNT):
-    # 1. Pick a Random Category
-    cat = random.choice(categories)
-    
-    # 2. Pick a Brand
-    brand = random.choice(brands)
-    
-    # 3. Construct Title
-    # Use a specific item from that category + an adjective
-    base_item = random.choice(product_templates[cat])
-    title = f"{brand} {random.choice(adjectives)} {base_item}"
-    
-    # 4. Generate Price (Randomized reasonable range)
-    if "Electronics" in cat:
-        price = round(random.uniform(99.00, 499.00), 2)
-    elif "Home" in cat:
-        price = round(random.uniform(40.00, 150.00), 2)
-    else:
-        price = round(random.uniform(15.00, 60.00), 2)
-
-    # 5. Build Row
-    row = {
-        "merchant_id": "1001",
-        "merchant_name": brand,
-        "merchant_category": cat,
-        "aw_product_id": f"p_{random.randint(100000, 999999)}",
-        "product_name": title,
-        "description": generate_description(title, cat),
-        "search_price": f"{price}",
-        "currency": "GBP",
-        "aw_deep_link": f"https://www.awin1.com/cread.php?awinmid=1001&p={random.randint(1,9999)}",
-        "large_image": f"https://via.placeholder.com/300x300?text={base_item.replace(' ', '+')}"
-    }
-    rows.append(row)
-
-# --- WRITE TO CSV ---
-with open(OUTPUT_FILENAME, mode='w', newline='', encoding='utf-8') as f:
-    writer = csv.DictWriter(f, fieldnames=HEADERS)
-    writer.writeheader()
-    writer.writerows(rows)
-
-print(f"SUCCESS: Created {OUTPUT_FILENAME}")
\ No newline at end of file
+# (Guarded so generate_stress_feed.py can reuse the pools above without writing this file)
+if __name__ == "__main__":
+    print(f"Generating {ROW_COUNT} realistic products...")
+
+    rows = []
+
+    for i in range(ROW_COUNT):
+        # 1. Pick a Random Category
+        cat = random.choice(categories)
+
+        # 2. Pick a Brand
+        brand = random.choice(brands)
+
+        # 3. Construct Title
+        # Use a specific item from that category + an adjective
+        base_item = random.choice(product_templates[cat])
+        title = f"{brand} {random.choice(adjectives)} {base_item}"
+
+        # 4. Generate Price (Randomized reasonable range)
+        if "Electronics" in cat:
+            price = round(random.uniform(99.00, 499.00), 2)
+        elif "Home" in cat:
+            price = round(random.uniform(40.00, 150.00), 2)
+        else:
+            price = round(random.uniform(15.00, 60.00), 2)
+
+        # 5. Build Row
+        row = {
+            "merchant_id": "1001",
+            "merchant_name": brand,
+            "merchant_category": cat,
+            "aw_product_id": f"p_{random.randint(100000, 999999)}",
+            "product_name": title,
+            "description": generate_description(title, cat),
+            "search_price": f"{price}",
+            "currency": "GBP",
+            "aw_deep_link": f"https://www.awin1.com/cread.php?awinmid=1001&p={random.randint(1,9999)}",
+            "large_image": f"https://via.placeholder.com/300x300?text={base_item.replace(' ', '+')}"
+        }
+        rows.append(row)
+
+    # --- WRITE TO CSV ---
+    with open(OUTPUT_FILENAME, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=HEADERS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"SUCCESS: Created {OUTPUT_FILENAME}")
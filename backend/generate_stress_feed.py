@@ -0,0 +1,202 @@
+import os
+import csv
+import sys
+import json
+import gzip
+import time
+import random
+import argparse
+from collections import deque
+from multiprocessing import Pool
+
+from generate_awin_mock import HEADERS, brands, categories, adjectives, product_templates
+
+# --- CONFIGURATION ---
+OUTPUT_DIR = "data/stress"
+OUTPUT_PREFIX = "awin_stress"
+WRITE_BUFFER = 1 << 20 # 1 MiB file buffer; rows are streamed, never held in memory
+RECENT_IDS = 1000 # Duplicates reuse one of the last N ids of the same shard
+
+# --- DIRTY POOLS (same flavour as generate_dirty_data.py) ---
+benefits = [
+    "Optimizes circadian rhythm.", "Reduces cortisol levels.", "Enhances deep sleep cycles.",
+    "Improves cognitive function.", "Supports metabolic flexibility.", "Accelerates muscle recovery."
+]
+messy_html = [
+    "<div class='promo'><span style='color:red'>SALE</span> &pound;5 off! <br><br>",
+    "<p>Contains <b>unclosed <i>tags",
+    "&nbsp;&nbsp;<table><tr><td>Spec</td><td>Value</td></tr></table>",
+    "<script>track('feed')</script>",
+    "<!-- legacy markup --><font size=2>Limited stock</font>"
+]
+bad_prices = ["", "CALL FOR PRICE", "GBP 25.00", "£30.00", "N/A", "0.00", "-1"]
+
+
+def shard_bounds(rows, shards):
+    """Splits `rows` into `shards` contiguous [start, end) ranges, sizes differing by at most one."""
+    base, extra = divmod(rows, shards)
+    bounds, start = [], 0
+    for shard in range(shards):
+        end = start + base + (1 if shard < extra else 0)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def shard_path(output_dir, prefix, shard, shards, compress=False):
+    suffix = ".csv.gz" if compress else ".csv"
+    if shards == 1:
+        return os.path.join(output_dir, prefix + suffix)
+    return os.path.join(output_dir, f"{prefix}_{shard:05d}{suffix}")
+
+
+def generate_rows(rng, start, end, ratios):
+    """
+    Yields (row, kind) for global row numbers [start, end). Ids are derived
+    from the row number, so they are unique unless a duplicate is injected on
+    purpose; `kind` says which kind of dirt (if any) the row carries.
+    """
+    recent = deque(maxlen=RECENT_IDS)
+    for i in range(start, end):
+        cat = rng.choice(categories)
+        brand = rng.choice(brands)
+        base_item = rng.choice(product_templates[cat])
+        title = f"{brand} {rng.choice(adjectives)} {base_item}"
+
+        if "Electronics" in cat:
+            price = round(rng.uniform(99.00, 499.00), 2)
+        elif "Home" in cat:
+            price = round(rng.uniform(40.00, 150.00), 2)
+        else:
+            price = round(rng.uniform(15.00, 60.00), 2)
+
+        p_id = f"p_{i:09d}"
+        description = (f"<strong>{title}</strong><br> {rng.choice(benefits)} <br> "
+                       f"<ul><li>Batch Tested</li><li>Clinical Dose</li></ul> <span>Category: {cat}</span>")
+        kind = "clean"
+
+        roll = rng.random()
+        if roll < ratios["missing_id"]:
+            p_id = ""
+            kind = "missing_id"
+        elif recent and roll < ratios["missing_id"] + ratios["duplicate"]:
+            # Same merchant too, since ingestion keys products on merchant + id
+            p_id, brand = rng.choice(recent)
+            kind = "duplicate"
+        if rng.random() < ratios["html"]:
+            description = rng.choice(messy_html) + description + rng.choice(messy_html)
+            kind = "html" if kind == "clean" else kind
+        if rng.random() < ratios["bad_price"]:
+            price = rng.choice(bad_prices)
+            kind = "bad_price" if kind == "clean" else kind
+
+        if p_id and kind != "duplicate":
+            recent.append((p_id, brand))
+
+        row = [
+            "1001", brand, cat, p_id, title, description, f"{price}", "GBP",
+            f"https://www.awin1.com/cread.php?awinmid=1001&p={i}",
+            f"https://via.placeholder.com/300x300?text={base_item.replace(' ', '+')}"
+        ]
+        yield row, kind
+
+
+def write_shard(spec):
+    """Streams one shard to disk. Runs in a worker process when sharding; returns its stats."""
+    shard, start, end, path, seed, ratios, compress = spec
+    rng = random.Random(f"{seed}:{shard}") # Same seed + shard -> byte-identical file, however many processes
+    counts = {"clean": 0, "missing_id": 0, "duplicate": 0, "html": 0, "bad_price": 0}
+    started = time.perf_counter()
+
+    if compress:
+        f = gzip.open(path, mode='wt', newline='', encoding='utf-8', compresslevel=6)
+    else:
+        f = open(path, mode='w', newline='', encoding='utf-8', buffering=WRITE_BUFFER)
+    with f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        for row, kind in generate_rows(rng, start, end, ratios):
+            writer.writerow(row)
+            counts[kind] += 1
+
+    return {
+        "shard": shard,
+        "path": path,
+        "rows": end - start,
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - started, 3),
+        "rows_by_kind": counts
+    }
+
+
+def generate(rows, shards=1, processes=None, seed=42, output_dir=OUTPUT_DIR, prefix=OUTPUT_PREFIX,
+             missing_id=0.01, duplicate=0.01, html=0.05, bad_price=0.02, compress=False):
+    ratios = {"missing_id": missing_id, "duplicate": duplicate, "html": html, "bad_price": bad_price}
+    for name, ratio in ratios.items():
+        if not 0.0 <= ratio <= 1.0:
+            raise ValueError(f"--{name.replace('_', '-')}-ratio must be between 0 and 1")
+    if missing_id + duplicate > 1.0:
+        raise ValueError("--missing-id-ratio plus --duplicate-ratio can't exceed 1")
+
+    os.makedirs(output_dir, exist_ok=True)
+    specs = [
+        (shard, start, end, shard_path(output_dir, prefix, shard, shards, compress), seed, ratios, compress)
+        for shard, (start, end) in enumerate(shard_bounds(rows, shards))
+    ]
+
+    started = time.perf_counter()
+    processes = min(processes or os.cpu_count() or 1, shards)
+    if processes > 1:
+        with Pool(processes) as pool:
+            results = pool.map(write_shard, specs)
+    else:
+        results = [write_shard(spec) for spec in specs]
+    elapsed = time.perf_counter() - started
+
+    totals = {}
+    for result in results:
+        for kind, count in result["rows_by_kind"].items():
+            totals[kind] = totals.get(kind, 0) + count
+    return {
+        "rows": rows,
+        "shards": shards,
+        "processes": processes,
+        "seed": seed,
+        "ratios": ratios,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed) if elapsed else 0,
+        "bytes": sum(r["bytes"] for r in results),
+        "rows_by_kind": totals,
+        "files": results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stream a large synthetic Awin feed to disk for ingestion throughput and memory benchmarks."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--shards", type=int, default=1, help="Split the rows over N files")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: one per CPU, at most --shards)")
+    parser.add_argument("--seed", type=int, default=42, help="Same seed and shard count -> identical files")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--prefix", default=OUTPUT_PREFIX)
+    parser.add_argument("--missing-id-ratio", type=float, default=0.01)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.01)
+    parser.add_argument("--html-ratio", type=float, default=0.05, help="Share of rows with extra messy HTML")
+    parser.add_argument("--bad-price-ratio", type=float, default=0.02)
+    parser.add_argument("--gzip", action="store_true", help="Write .csv.gz files")
+    args = parser.parse_args()
+
+    if args.rows < 0 or args.shards < 1:
+        parser.error("--rows must be >= 0 and --shards >= 1")
+    try:
+        summary = generate(
+            args.rows, args.shards, args.processes, args.seed, args.output_dir, args.prefix,
+            args.missing_id_ratio, args.duplicate_ratio, args.html_ratio, args.bad_price_ratio, args.gzip
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(summary, indent=2))
+    print(f"SUCCESS: {summary['rows']} rows in {summary['seconds']}s ({summary['rows_per_second']} rows/s)",
+          file=sys.stderr)
@@ -0,0 +1,26 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- GUNICORN CONFIG ---
+# Usage: gunicorn main:app -c gunicorn.conf.py
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+
+# PRELOAD_MODEL=true: import main.py once in the master (which loads the encoder
+# weights) and fork workers from it, so the model is shared copy-on-write.
+preload_app = os.getenv("PRELOAD_MODEL", "false").lower() == "true"
+
+# Threads per worker for the encoder; N workers x all cores each just thrash the CPU
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", "1"))
+
+
+def post_fork(server, worker):
+    try:
+        import torch
+        torch.set_num_threads(TORCH_THREADS)
+    except ImportError:
+        pass # onnx backends don't need torch
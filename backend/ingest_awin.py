@@ -1,20 +1,36 @@
 import os
 import csv
 import re
+import sys
+import gzip
+import time
+import queue
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
+from vector_store import get_vector_store, bump_index_generation
+from ingest_manifest import IngestManifest, content_hash
+from embedding_store import CachedEncoder
+from encoders import load_encoder
+from lexical import LexicalIndexBuilder
+from seen_ids import SeenIds
 
 # 1. Setup
 load_dotenv()
-api_key = os.getenv("PINECONE_API_KEY")
-pc = Pinecone(api_key=api_key)
-index = pc.Index("ventiko-index")
-model = SentenceTransformer('all-MiniLM-L6-v2')
 
 # 2. Config
 CSV_FILE = "data/awin_dirty_export.csv" # Pointing to the dirty data
-BATCH_SIZE = 50
+BATCH_SIZE = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "50")) # Vectors per upsert call
+ENCODE_BATCH_SIZE = int(os.getenv("INGEST_ENCODE_BATCH_SIZE", "64")) # Texts per model.encode call
+UPSERT_WORKERS = int(os.getenv("INGEST_UPSERT_WORKERS", "4")) # Concurrent upsert calls
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "1024")) # Max items waiting between stages
+FULL_REFRESH = os.getenv("INGEST_FULL_REFRESH", "false").lower() == "true" # Ignore the manifest, re-embed everything
+TOUCH_BATCH_SIZE = 1000 # Unchanged ids marked as seen per manifest write
+CHECKPOINT_ROWS = int(os.getenv("INGEST_CHECKPOINT_ROWS", "10000")) # Rows between resumable checkpoints (0 = off)
+RESUME = os.getenv("INGEST_RESUME", "true").lower() == "true" # Pick up an interrupted run of the same file
+
+_DONE = object()
 
 # --- HELPER FUNCTIONS ---
 
@@ -36,86 +52,489 @@ def normalize_price(raw_price):
     except ValueError:
         return 0.0
 
-# --- MAIN LOGIC ---
+def clean_row(row):
+    """
+    Validates and cleans one feed row.
+    Returns (p_id, title, desc, category, metadata), or None if the row has no ID or title.
+    """
+    # 1. VALIDATION CHECKS (The Gatekeeper)
+    if not row['aw_product_id'] or not row['product_name']:
+        return None
+
+    p_id = f"{row['merchant_name']}-{row['aw_product_id']}".replace(" ", "_")
+
+    # 2. CLEANING (The Wash)
+    title = row['product_name'].strip()
+    desc = clean_html(row['description'])
+    category = row['merchant_category'] or "Uncategorized"
+
+    # Fix Price
+    price_val = normalize_price(row['search_price'])
+    if price_val == 0.0:
+        # Optional: Skip free/broken price items?
+        # For now, we keep them but log it.
+        pass
+
+    # 3. METADATA PREP
+    metadata = {
+        "title": title,
+        "description": desc[:300], # Truncate safely
+        "price": price_val, # Numeric, so /search can range-filter it in the index
+        "currency": "GBP",
+        "category": category,
+        "link": row['aw_deep_link'],
+        "merchant": row['merchant_name'] or "Unknown"
+    }
+    return p_id, title, desc, category, metadata
+
+def feed_fingerprint(csv_file, full_refresh=False):
+    """A checkpoint only applies to the exact same file (and mode) it was taken on."""
+    try:
+        st = os.stat(csv_file)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}:{int(full_refresh)}"
+
+def feed_name(csv_file):
+    """Manifest/segment key for a feed: its file name without a .gz/.zip wrapper, so compressing a feed keeps its history."""
+    name = os.path.basename(csv_file)
+    for suffix in (".gz", ".zip"):
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+def open_feed(csv_file):
+    """
+    Opens a feed for binary, line-by-line reading. .gz and .zip feeds are
+    decompressed as they are read, never unpacked to disk; a zip must hold
+    one CSV (the first .csv member is used).
+    """
+    lowered = csv_file.lower()
+    if lowered.endswith(".gz"):
+        return gzip.open(csv_file, mode='rb')
+    if lowered.endswith(".zip"):
+        with zipfile.ZipFile(csv_file) as archive:
+            members = [n for n in archive.namelist() if n.lower().endswith(".csv")] or archive.namelist()
+            if not members:
+                raise ValueError(f"{csv_file} is an empty zip archive")
+            # The member keeps the archive's file handle open after the ZipFile itself is closed
+            return archive.open(members[0])
+    return open(csv_file, mode='rb')
+
+class _OffsetLines:
+    """
+    Hands csv one decoded line at a time while tracking the byte offset in the file underneath
+    (the decompressed offset for .gz/.zip feeds, where seeking means reading forward).
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.offset = file.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        raw = self.file.readline()
+        if not raw:
+            raise StopIteration
+        self.offset += len(raw)
+        return raw.decode('utf-8')
+
+    def seek(self, offset):
+        self.file.seek(offset)
+        self.offset = offset
 
-print(f"--- STARTING IRON STOMACH INGESTION: {CSV_FILE} ---")
+class StageTimer:
+    """Counts rows and busy seconds for one pipeline stage (thread-safe)."""
 
-vectors_to_upload = []
-ids_seen = set() # For local deduplication
-stats = {"success": 0, "skipped": 0, "duplicates": 0}
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, rows, seconds):
+        with self._lock:
+            self.rows += rows
+            self.seconds += seconds
+
+    def rate(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+def _put(q, item, abort):
+    """Blocking put that gives up if another stage has failed."""
+    while not abort.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+# --- PIPELINE STAGES ---
+
+def parse_rows(csv_file, stats, manifest=None, full_refresh=False, lexical=None,
+               seen_ids=None, start=None, checkpoint_rows=CHECKPOINT_ROWS):
+    """
+    STAGE 1: Validates, dedupes and cleans rows, then diffs them against the manifest.
+    Yields (kind, p_id, combined_text, metadata, hashes) where kind is "embed" for
+    new or re-worded rows and "metadata" when only price/link changed.
+    Unchanged rows are only counted. Every clean row (changed or not) goes into
+    the `lexical` BM25 builder, so its segment always covers the whole feed.
+
+    Every `checkpoint_rows` rows it also yields ("checkpoint", byte_offset, row,
+    parse_counts, lexical_state) once the seen-id set, manifest touches and
+    BM25 document log up to that row are on disk. `start` = (byte_offset, row)
+    resumes from such a checkpoint by seeking straight past the done rows; the
+    lexical builder must already be cut back to the same checkpoint.
+    """
+    seen_ids = seen_ids if seen_ids is not None else SeenIds(feed=feed_name(csv_file))
+    resume_offset, resume_row = start or (0, 0)
+    seen = [] # Known ids waiting to be marked as seen in the manifest
+    with open_feed(csv_file) as file:
+        lines = _OffsetLines(file)
+        reader = csv.DictReader(lines)
+        if resume_row:
+            reader.fieldnames # Reads the header before jumping past the done rows
+            lines.seek(resume_offset)
+        boundary = lines.offset # Byte offset where the current row starts
+
+        for i, row in enumerate(reader, start=resume_row):
+
+            if manifest is not None and checkpoint_rows and i > resume_row and i % checkpoint_rows == 0:
+                seen_ids.flush()
+                if seen:
+                    manifest.touch(seen)
+                    seen = []
+                counts = {k: stats[k] for k in ("skipped", "duplicates", "unchanged")}
+                yield "checkpoint", boundary, i, counts, lexical.checkpoint() if lexical is not None else None
+            boundary = lines.offset
 
-try:
-    with open(CSV_FILE, mode='r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        
-        for i, row in enumerate(reader):
             try:
-                # 1. VALIDATION CHECKS (The Gatekeeper)
-                if not row['aw_product_id'] or not row['product_name']:
+                cleaned = clean_row(row)
+                if cleaned is None:
                     print(f"Row {i}: SKIPPING - Missing ID or Title")
                     stats['skipped'] += 1
                     continue
+                p_id, title, desc, category, metadata = cleaned
 
-                # 2. DEDUPLICATION
-                p_id = f"{row['merchant_name']}-{row['aw_product_id']}".replace(" ", "_")
-                if p_id in ids_seen:
+                # DEDUPLICATION (bounded memory: Bloom filter with an exact on-disk fallback)
+                if not seen_ids.add(p_id, i):
                     print(f"Row {i}: SKIPPING - Duplicate ID {p_id}")
                     stats['duplicates'] += 1
                     continue
-                ids_seen.add(p_id)
-
-                # 3. CLEANING (The Wash)
-                title = row['product_name'].strip()
-                desc = clean_html(row['description'])
-                category = row['merchant_category'] or "Uncategorized"
-                
-                # Fix Price
-                price_val = normalize_price(row['search_price'])
-                if price_val == 0.0:
-                    # Optional: Skip free/broken price items? 
-                    # For now, we keep them but log it.
-                    pass 
-
-                # 4. VECTORIZATION
+
                 combined_text = f"{title}. {desc}. Category: {category}."
-                vector = model.encode(combined_text).tolist()
-
-                # 5. METADATA PREP
-                metadata = {
-                    "title": title,
-                    "description": desc[:300], # Truncate safely
-                    "price": str(price_val), # Store as clean string
-                    "currency": "GBP",
-                    "category": category,
-                    "link": row['aw_deep_link'],
-                    "merchant": row['merchant_name'] or "Unknown"
-                }
-
-                vectors_to_upload.append((p_id, vector, metadata))
-                stats['success'] += 1
-
-                # 6. BATCH UPLOAD
-                if len(vectors_to_upload) >= BATCH_SIZE:
-                    index.upsert(vectors=vectors_to_upload)
-                    vectors_to_upload = []
-                    print(f" -> Uploaded batch... (Processed {i} rows)")
+
+                if lexical is not None:
+                    lexical.add(p_id, title, desc, category, metadata)
+
+                # DELTA CHECK (The Manifest)
+                hashes = (
+                    content_hash(title, desc, category),
+                    content_hash(*(f"{k}={metadata[k]}" for k in sorted(metadata)))
+                )
+                previous = manifest.lookup(p_id) if manifest is not None else None
+                if previous is not None and start is not None and previous[2] == manifest.run_id:
+                    # Written after the last checkpoint by the interrupted run; a buffering backend may have lost it
+                    previous = None
+                if previous is not None:
+                    # Still in the feed: keeps it out of the stale sweep even if its write fails below
+                    seen.append(p_id)
+                    if len(seen) >= TOUCH_BATCH_SIZE:
+                        manifest.touch(seen)
+                        seen = []
+
+                if previous is None or full_refresh or previous[0] != hashes[0]:
+                    yield "embed", p_id, combined_text, metadata, hashes
+                elif previous[1] != hashes[1]:
+                    yield "metadata", p_id, None, metadata, hashes
+                else:
+                    stats['unchanged'] += 1
 
             except Exception as e:
                 print(f"Row {i}: FATAL ERROR - {e}")
                 stats['skipped'] += 1
                 continue
 
-        # Final Batch
-        if vectors_to_upload:
-            index.upsert(vectors=vectors_to_upload)
-            print(" -> Uploaded final batch.")
+    seen_ids.flush()
+    if seen:
+        manifest.touch(seen)
+
+def _parse_stage(csv_file, stats, manifest, full_refresh, lexical, seen_ids, start, checkpoint_rows,
+                 out_q, timer, abort, errors):
+    try:
+        rows = parse_rows(csv_file, stats, manifest, full_refresh, lexical, seen_ids, start, checkpoint_rows)
+        while True:
+            started = time.perf_counter()
+            item = next(rows, _DONE)
+            timer.add(0 if item is _DONE or item[0] == "checkpoint" else 1, time.perf_counter() - started)
+            if item is _DONE or not _put(out_q, item, abort):
+                break
+        # Rows consumed without being forwarded still count towards parse throughput
+        timer.add(stats['skipped'] + stats['duplicates'] + stats['unchanged'], 0.0)
+    except BaseException as e:
+        errors.append(e)
+        abort.set()
+    finally:
+        _put(out_q, _DONE, abort)
+
+def _encode_stage(model, in_q, out_q, stats, stats_lock, timer, abort, encode_batch_size, upsert_batch_size):
+    """
+    STAGE 2: Batched model.encode, re-chunked into upsert-sized batches. Metadata-only rows pass straight through.
+    A checkpoint flushes everything buffered before it and is then forwarded, so it reaches
+    the upsert loop after every batch holding earlier rows.
+    """
+    pending = []
+    buffered = []
+    meta_buffered = []
+    done = False
+    try:
+        while not done and not abort.is_set():
+            try:
+                item = in_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            mark = None
+            if item is _DONE:
+                done = True
+            elif item[0] == "checkpoint":
+                mark = item
+            elif item[0] == "metadata":
+                _, p_id, _, metadata, hashes = item
+                meta_buffered.append(((p_id, metadata), hashes))
+            else:
+                pending.append(item)
+
+            flush = done or mark is not None
+            if pending and (flush or len(pending) >= encode_batch_size):
+                started = time.perf_counter()
+                try:
+                    vectors = model.encode(
+                        [text for _, _, text, _, _ in pending], batch_size=encode_batch_size
+                    )
+                    buffered.extend(
+                        ((p_id, vector.tolist(), metadata), hashes)
+                        for (_, p_id, _, metadata, hashes), vector in zip(pending, vectors)
+                    )
+                    timer.add(len(pending), time.perf_counter() - started)
+                except Exception as e:
+                    print(f"!!! ENCODE ERROR ({len(pending)} rows lost): {e}")
+                    with stats_lock:
+                        stats['failed'] += len(pending)
+                pending = []
+
+            for kind, items in (("upsert", buffered), ("metadata", meta_buffered)):
+                while len(items) >= upsert_batch_size or (flush and items):
+                    chunk = items[:upsert_batch_size]
+                    del items[:upsert_batch_size]
+                    if not _put(out_q, (kind, chunk), abort):
+                        return
+            if mark is not None and not _put(out_q, ("checkpoint", mark), abort):
+                return
+    finally:
+        _put(out_q, _DONE, abort)
+
+def _upsert_batch(index, manifest, kind, chunk, stats, stats_lock, timer):
+    """STAGE 3: One index write, run inside the thread pool. The manifest is only updated on success."""
+    batch = [entry for entry, _ in chunk]
+    started = time.perf_counter()
+    try:
+        if kind == "upsert":
+            index.upsert(vectors=batch)
+        else:
+            index.update_metadata(batch)
+    except Exception as e:
+        print(f"!!! UPSERT ERROR ({len(batch)} vectors lost): {e}")
+        with stats_lock:
+            stats['failed'] += len(batch)
+        return
+    timer.add(len(batch), time.perf_counter() - started)
+    if manifest is not None:
+        manifest.record([(entry[0], *hashes) for entry, hashes in chunk])
+    with stats_lock:
+        if kind == "upsert":
+            stats['success'] += len(batch)
+            print(f" -> Uploaded batch... ({stats['success']} vectors so far)")
+        else:
+            stats['metadata_updates'] += len(batch)
+
+# --- MAIN LOGIC ---
+
+def run_ingestion(csv_file=CSV_FILE, index=None, model=None,
+                  encode_batch_size=ENCODE_BATCH_SIZE, upsert_batch_size=BATCH_SIZE,
+                  upsert_workers=UPSERT_WORKERS, queue_size=QUEUE_SIZE,
+                  manifest=None, full_refresh=FULL_REFRESH, lexical=None,
+                  seen_ids=None, resume=RESUME, checkpoint_rows=CHECKPOINT_ROWS, bump_generation=True):
+    """
+    Streams csv_file through parse -> encode -> upsert. Each stage runs in its
+    own thread with a bounded queue in between, so memory stays flat and the
+    CPU-bound encode overlaps with network-bound upserts.
+
+    Only rows that changed since the last run reach the index (see IngestManifest);
+    ids that vanished from the feed are deleted once the whole file has been read.
+    The feed's BM25 segment (lexical.py) is rebuilt from the same pass.
+
+    Progress is checkpointed every checkpoint_rows rows (see IngestManifest);
+    with resume on, a run of the same unchanged file seeks to the last
+    checkpoint and carries on from there (BM25 document log included), keeping
+    the interrupted run's id so its rows aren't swept as stale. When the
+    checkpoint can't be used, every row that run touched is re-sent instead.
+
+    bump_generation=False leaves cache invalidation to the caller (the
+    multi-feed orchestrator bumps once after all feeds); stats["index_changed"]
+    says whether a bump is due.
+    """
+    index = index if index is not None else get_vector_store() # Pinecone or local, see VECTOR_BACKEND
+    # Texts seen in any earlier run or feed come back from the embedding store instead of the model
+    model = model if model is not None else CachedEncoder(load_encoder()) # ENCODER_BACKEND picks torch/quantized/onnx
+    manifest = manifest if manifest is not None else IngestManifest(feed=feed_name(csv_file))
+    lexical = lexical if lexical is not None else LexicalIndexBuilder(feed=feed_name(csv_file))
+    seen_ids = seen_ids if seen_ids is not None else SeenIds(feed=feed_name(csv_file))
+
+    print(f"--- STARTING IRON STOMACH INGESTION: {csv_file} ---")
+
+    # The parse thread owns skipped/duplicates; encode and upsert share success/failed under the lock
+    stats = {"success": 0, "skipped": 0, "duplicates": 0, "failed": 0,
+             "unchanged": 0, "metadata_updates": 0, "deleted": 0}
+    fingerprint = feed_fingerprint(csv_file, full_refresh)
+    checkpoint = manifest.checkpoint()
+    start = None
+    if (resume and checkpoint is not None and checkpoint["fingerprint"] == fingerprint
+            and checkpoint["lexical"] is not None and lexical.start(checkpoint["lexical"])):
+        manifest.run_id = checkpoint["run_id"]
+        stats.update(checkpoint["stats"])
+        seen_ids.rollback(checkpoint["row"])
+        start = (checkpoint["byte_offset"], checkpoint["row"])
+        print(f" -> Resuming at row {checkpoint['row']} (byte {checkpoint['byte_offset']}) of an interrupted run.")
+    else:
+        if checkpoint is not None: # Stale (file changed, BM25 log gone) or resume disabled
+            manifest.invalidate_run(checkpoint["run_id"])
+        manifest.clear_checkpoint()
+        lexical.start()
+        seen_ids.reset()
+        if fingerprint is not None:
+            # A run that dies before its first real checkpoint still leaves its run_id behind
+            manifest.save_checkpoint(fingerprint, 0, 0, {}, lexical.checkpoint())
+    stats_lock = threading.Lock()
+    timers = {name: StageTimer(name) for name in ("parse", "encode", "upsert")}
+    parsed_q = queue.Queue(maxsize=queue_size)
+    encoded_q = queue.Queue(maxsize=max(1, queue_size // upsert_batch_size))
+    abort = threading.Event()
+    errors = []
+    started = time.perf_counter()
+
+    parser = threading.Thread(
+        target=_parse_stage,
+        args=(csv_file, stats, manifest, full_refresh, lexical, seen_ids, start, checkpoint_rows,
+              parsed_q, timers["parse"], abort, errors),
+        name="ingest-parse", daemon=True
+    )
+    encoder = threading.Thread(
+        target=_encode_stage,
+        args=(model, parsed_q, encoded_q, stats, stats_lock, timers["encode"], abort, encode_batch_size, upsert_batch_size),
+        name="ingest-encode", daemon=True
+    )
+    parser.start()
+    encoder.start()
+
+    # Bound in-flight upserts so the pool's own work queue can't grow without limit
+    in_flight = threading.BoundedSemaphore(upsert_workers * 2)
+    futures = [] # Submitted since the last checkpoint
+    with ThreadPoolExecutor(max_workers=upsert_workers, thread_name_prefix="ingest-upsert") as pool:
+        while True:
+            try:
+                item = encoded_q.get(timeout=0.5)
+            except queue.Empty:
+                if abort.is_set():
+                    break
+                continue
+            if item is _DONE:
+                break
+            kind, chunk = item
+            if kind == "checkpoint":
+                # Every row before the mark has been handed to the pool; once those writes land it's safe to resume there
+                _, byte_offset, row, counts, lexical_state = chunk
+                wait(futures)
+                futures = []
+                # The checkpoint must not claim writes a buffering backend (local) could still lose; persist
+                # only appends what's new, the full merge waits for the end of the run
+                index.persist()
+                with stats_lock:
+                    progress = {k: stats[k] for k in ("success", "failed", "metadata_updates")}
+                manifest.save_checkpoint(fingerprint, byte_offset, row, {**progress, **counts}, lexical_state)
+                continue
+            in_flight.acquire()
+            future = pool.submit(_upsert_batch, index, manifest, kind, chunk, stats, stats_lock, timers["upsert"])
+            future.add_done_callback(lambda _: in_flight.release())
+            futures.append(future)
+
+    parser.join()
+    encoder.join()
+
+    for e in errors:
+        if isinstance(e, FileNotFoundError):
+            print("!!! ERROR: CSV file not found. Did you run generate_dirty_data.py?")
+        else:
+            print(f"!!! INGESTION ABORTED: {e}")
+
+    if not errors:
+        # Only a complete read of the feed can prove an id is gone
+        stale = manifest.stale_ids()
+        for start in range(0, len(stale), upsert_batch_size):
+            chunk = stale[start:start + upsert_batch_size]
+            try:
+                index.delete(chunk)
+                manifest.forget(chunk)
+                stats['deleted'] += len(chunk)
+            except Exception as e:
+                print(f"!!! DELETE ERROR ({len(chunk)} ids kept): {e}")
+        index.flush()
+        first_segment = not os.path.exists(lexical.path)
+        lexical.save()
+        print(f" -> Lexical segment written: {len(lexical)} documents.")
+        stats["index_changed"] = bool(stats['success'] or stats['metadata_updates'] or stats['deleted'] or first_segment)
+        if stats["index_changed"] and bump_generation:
+            generation = bump_index_generation() # Invalidates cached /search results
+            print(f" -> Index generation is now {generation}.")
+        manifest.clear_checkpoint()
+        seen_ids.reset() # The run is complete; the next one starts from row zero
+    elif fingerprint is not None:
+        print(" -> Checkpoint kept; rerun the same file to resume.")
+
+    elapsed = time.perf_counter() - started
+    print("-" * 30)
+    print(f"INGESTION COMPLETE.")
+    print(f"SUCCESS: {stats['success']}")
+    print(f"SKIPPED (Bad Data): {stats['skipped']}")
+    print(f"DUPLICATES BLOCKED: {stats['duplicates']}")
+    print(f"FAILED (Encode/Upsert): {stats['failed']}")
+    print(f"UNCHANGED (Not Re-embedded): {stats['unchanged']}")
+    print(f"METADATA ONLY UPDATES: {stats['metadata_updates']}")
+    print(f"DELETED (Gone From Feed): {stats['deleted']}")
+    print("-" * 30)
+    for timer in timers.values():
+        print(f"{timer.name.upper():<8} {timer.rows:>8} rows  {timer.rate():>10.1f} rows/sec")
+    print(f"{'TOTAL':<8} {stats['success']:>8} rows  {stats['success'] / elapsed if elapsed else 0.0:>10.1f} rows/sec ({elapsed:.1f}s)")
+    if isinstance(model, CachedEncoder):
+        store_stats = model.store.stats()
+        print(f"EMBEDDING STORE: {store_stats['hits']} hits / {store_stats['misses']} misses "
+              f"({store_stats['hit_rate']:.0%}), {store_stats['entries']} entries")
+        stats["embedding_store"] = store_stats
+    dedup_stats = seen_ids.stats()
+    print(f"DEDUP: {dedup_stats['bloom_bytes'] / 1e6:.1f} MB Bloom filter, {dedup_stats['exact_checks']} exact "
+          f"lookups ({dedup_stats['false_positives']} false positives)")
+    stats["dedup"] = dedup_stats
+    print("-" * 30)
+
+    stats["stage_rows_per_sec"] = {name: round(timer.rate(), 1) for name, timer in timers.items()}
+    stats["elapsed_seconds"] = round(elapsed, 2)
+    stats["errors"] = [str(e) for e in errors]
+    stats.setdefault("index_changed", False)
+    return stats
 
-except FileNotFoundError:
-    print("!!! ERROR: CSV file not found. Did you run generate_dirty_data.py?")
 
-print("-" * 30)
-print(f"INGESTION COMPLETE.")
-print(f"SUCCESS: {stats['success']}")
-print(f"SKIPPED (Bad Data): {stats['skipped']}")
-print(f"DUPLICATES BLOCKED: {stats['duplicates']}")
-print("-" * 30)
\ No newline at end of file
+if __name__ == "__main__":
+    # A single feed; for a directory or manifest of feeds use ingest_orchestrator.py
+    run_ingestion(sys.argv[1] if len(sys.argv) > 1 else CSV_FILE)
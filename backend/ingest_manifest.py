@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "data/ingest_manifest.db")
+
+
+def content_hash(*fields) -> str:
+    """Stable 128-bit hash of the given fields."""
+    joined = "\x1f".join("" if f is None else str(f) for f in fields)
+    return hashlib.blake2b(joined.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class IngestManifest:
+    """
+    Remembers what each feed last pushed to the index, one row per p_id:
+      text_hash - title, description and category (what the embedding is built from)
+      meta_hash - the full metadata dict (price, link, ...)
+      run_id    - the last run that saw the id in the feed
+    Entries are scoped per feed so one merchant's refresh never deletes another's products.
+
+    It also keeps each feed's ingestion checkpoint: how far an unfinished run
+    got (byte offset and row of the last fully upserted position), its run_id,
+    running stats and the BM25 builder's state at that row, so a rerun can
+    resume instead of starting from row zero.
+    """
+
+    def __init__(self, feed, path=MANIFEST_PATH):
+        self.feed = feed
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Shared by the parse thread and the upsert pool, so serialize access
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._lock = threading.Lock()
+        self.run_id = int(time.time() * 1000)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS manifest ("
+                "feed TEXT NOT NULL, p_id TEXT NOT NULL, text_hash TEXT NOT NULL, "
+                "meta_hash TEXT NOT NULL, run_id INTEGER NOT NULL, PRIMARY KEY (feed, p_id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "feed TEXT PRIMARY KEY, run_id INTEGER NOT NULL, fingerprint TEXT NOT NULL, "
+                "byte_offset INTEGER NOT NULL, row INTEGER NOT NULL, stats TEXT NOT NULL, updated_at REAL NOT NULL, "
+                "lexical TEXT)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(checkpoints)")}
+            if "lexical" not in columns: # Manifests created before checkpoints carried the BM25 state
+                self._conn.execute("ALTER TABLE checkpoints ADD COLUMN lexical TEXT")
+
+    def lookup(self, p_id):
+        """Returns (text_hash, meta_hash, run_id) from the last run that wrote or saw p_id, or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT text_hash, meta_hash, run_id FROM manifest WHERE feed = ? AND p_id = ?",
+                (self.feed, p_id)
+            ).fetchone()
+
+    def touch(self, p_ids):
+        """Marks ids as still present in the feed this run."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE manifest SET run_id = ? WHERE feed = ? AND p_id = ?",
+                [(self.run_id, self.feed, p_id) for p_id in p_ids]
+            )
+
+    def record(self, entries):
+        """Stores (p_id, text_hash, meta_hash) once the index write has succeeded."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?)",
+                [(self.feed, p_id, text_hash, meta_hash, self.run_id) for p_id, text_hash, meta_hash in entries]
+            )
+
+    def stale_ids(self):
+        """Ids this feed pushed before that were not seen in the current run."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p_id FROM manifest WHERE feed = ? AND run_id != ?", (self.feed, self.run_id)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def forget(self, p_ids):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM manifest WHERE feed = ? AND p_id = ?", [(self.feed, p_id) for p_id in p_ids]
+            )
+
+    def invalidate_run(self, run_id):
+        """
+        Forces every id last written or seen by run_id to be re-sent on its next
+        sighting: an abandoned run may have recorded writes a buffering backend lost.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE manifest SET text_hash = '' WHERE feed = ? AND run_id = ?", (self.feed, run_id)
+            )
+
+    def checkpoint(self):
+        """The feed's saved checkpoint as a dict, or None if its last run finished."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, fingerprint, byte_offset, row, stats, lexical FROM checkpoints WHERE feed = ?",
+                (self.feed,)
+            ).fetchone()
+        if row is None:
+            return None
+        run_id, fingerprint, byte_offset, row_number, stats, lexical = row
+        return {"run_id": run_id, "fingerprint": fingerprint, "byte_offset": byte_offset,
+                "row": row_number, "stats": json.loads(stats), "lexical": json.loads(lexical) if lexical else None}
+
+    def save_checkpoint(self, fingerprint, byte_offset, row, stats, lexical=None):
+        """
+        Everything before `row` (ending at `byte_offset`) is in the index and recorded here;
+        `lexical` is LexicalIndexBuilder.checkpoint() taken at the same row.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(feed, run_id, fingerprint, byte_offset, row, stats, updated_at, lexical) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.feed, self.run_id, fingerprint, byte_offset, row, json.dumps(stats), time.time(),
+                 json.dumps(lexical) if lexical is not None else None)
+            )
+
+    def clear_checkpoint(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE feed = ?", (self.feed,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
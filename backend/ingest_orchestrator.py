@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+FEED_SUFFIXES = (".csv", ".csv.gz", ".csv.zip", ".zip")
+INGEST_PROCESSES = int(os.getenv("INGEST_PROCESSES", "4")) # Feeds ingested at once, one process each
+# Index write calls per second across every process (0 = unlimited). Pinecone throttles per index,
+# not per client, so the budget is shared rather than split per feed.
+INGEST_UPSERT_RATE = float(os.getenv("INGEST_UPSERT_RATE", "0"))
+INGEST_LOG_DIR = os.getenv("INGEST_LOG_DIR", "data/ingest_logs") # One log per feed; stdout would interleave
+STAT_KEYS = ("success", "skipped", "duplicates", "failed", "unchanged", "metadata_updates", "deleted")
+
+
+# --- FEED DISCOVERY ---
+
+def discover_feeds(source):
+    """
+    Feeds to ingest from a directory (every .csv/.csv.gz/.zip in it), a JSON
+    manifest (a list of paths, or of {"path": ...} objects) or a text file with
+    one path per line (# comments allowed). Relative manifest paths are resolved
+    against the manifest's own directory.
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(FEED_SUFFIXES) and os.path.isfile(os.path.join(source, name))
+        )
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, mode='r', encoding='utf-8') as f:
+        if source.lower().endswith(".json"):
+            entries = [e["path"] if isinstance(e, dict) else e for e in json.load(f)]
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    return [path if os.path.isabs(path) else os.path.join(base, path) for path in entries]
+
+
+# --- GLOBAL UPSERT RATE LIMIT ---
+
+class RateLimiter:
+    """
+    Token bucket shared by every worker process: `rate` tokens refill per
+    second up to `burst`. The state lives in shared memory, so it must be handed
+    to workers when they start (the pool initializer), not pickled per task.
+    """
+
+    def __init__(self, rate, burst=None, ctx=None):
+        ctx = ctx or multiprocessing.get_context()
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = ctx.Value('d', self.burst, lock=False)
+        self._stamp = ctx.Value('d', time.monotonic(), lock=False)
+        self._lock = ctx.Lock()
+
+    def acquire(self, cost=1):
+        if cost > self.burst:
+            # The bucket never holds more than `burst`; callers split bigger writes (see RateLimitedIndex)
+            raise ValueError(f"cost {cost} exceeds the bucket size {self.burst}")
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens = min(self.burst, self._tokens.value + (now - self._stamp.value) * self.rate)
+                self._stamp.value = now
+                if tokens >= cost:
+                    self._tokens.value = tokens - cost
+                    return
+                self._tokens.value = tokens
+                delay = (cost - tokens) / self.rate
+            time.sleep(delay)
+
+
+class RateLimitedIndex:
+    """Vector store wrapper that takes tokens before every write (reads and flush pass straight through)."""
+
+    def __init__(self, index, limiter):
+        self.index = index
+        self.limiter = limiter
+
+    def upsert(self, vectors):
+        self.limiter.acquire(1)
+        return self.index.upsert(vectors)
+
+    def update_metadata(self, items):
+        # Pinecone makes one update call per id, so each id costs a token; chunks of at most
+        # `burst` ids keep the bucket honest instead of letting a big batch through at burst cost
+        items = list(items)
+        chunk = max(1, int(self.limiter.burst))
+        for start in range(0, len(items), chunk):
+            batch = items[start:start + chunk]
+            self.limiter.acquire(len(batch))
+            self.index.update_metadata(batch)
+
+    def delete(self, ids):
+        self.limiter.acquire(1)
+        return self.index.delete(ids)
+
+    def __getattr__(self, name):
+        return getattr(self.index, name)
+
+
+# --- WORKER PROCESS ---
+
+_limiter = None
+_index = None
+_model = None
+
+def _init_worker(limiter, torch_threads):
+    global _limiter
+    _limiter = limiter
+    try:
+        import torch
+        torch.set_num_threads(torch_threads) # N processes x all cores each just thrash the CPU
+    except ImportError:
+        pass # onnx/hashing encoders don't need torch
+
+
+def ingest_feed(path, full_refresh=None, log_dir=INGEST_LOG_DIR):
+    """Runs one feed through run_ingestion inside a worker; the index and encoder are reused across feeds."""
+    global _index, _model
+    from ingest_awin import run_ingestion, feed_name
+    from vector_store import get_vector_store
+    from embedding_store import CachedEncoder
+    from encoders import load_encoder
+
+    name = feed_name(path)
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, f"{name}.log")
+    result = {"feed": name, "path": path, "log": log_path}
+    started = time.perf_counter()
+    try:
+        if _index is None:
+            _index = get_vector_store()
+            _model = CachedEncoder(load_encoder())
+        index = RateLimitedIndex(_index, _limiter) if _limiter is not None else _index
+        options = {} if full_refresh is None else {"full_refresh": full_refresh}
+        with open(log_path, mode='w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+            stats = run_ingestion(path, index=index, model=_model, bump_generation=False, **options)
+    except Exception as e:
+        result.update(status="error", errors=[str(e)], index_changed=False)
+    else:
+        result.update({k: stats[k] for k in STAT_KEYS})
+        result.update(
+            status="error" if stats["errors"] else "ok",
+            errors=stats["errors"],
+            index_changed=stats["index_changed"]
+        )
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+# --- ORCHESTRATOR ---
+
+def run_feeds(feeds, processes=INGEST_PROCESSES, upsert_rate=INGEST_UPSERT_RATE,
+              full_refresh=None, log_dir=INGEST_LOG_DIR):
+    """
+    Ingests many feeds concurrently, one worker process per feed at a time,
+    and returns per-feed stats plus totals. Every write to the index goes
+    through one rate limiter shared by all workers. Each feed keeps its own
+    manifest scope, BM25 segment and checkpoint (see run_ingestion), and the
+    index generation is bumped once at the end rather than once per feed.
+    """
+    from ingest_awin import feed_name
+    from vector_store import VECTOR_BACKEND, bump_index_generation
+
+    names = {}
+    for path in feeds:
+        name = feed_name(path)
+        if name in names:
+            raise ValueError(f"{path} and {names[name]} share the feed name '{name}' (manifest/segment key)")
+        names[name] = path
+
+    if VECTOR_BACKEND.lower() == "local" and processes > 1:
+        # Each LocalVectorStore rewrites the whole index on flush, so parallel writers would drop each other's rows
+        print("Local vector backend has a single writer: ingesting feeds one at a time.", file=sys.stderr)
+        processes = 1
+    processes = max(1, min(processes, len(feeds) or 1))
+
+    # spawn: workers don't inherit the parent's threads or half-initialised torch state
+    ctx = multiprocessing.get_context("spawn")
+    limiter = RateLimiter(upsert_rate, ctx=ctx) if upsert_rate > 0 else None
+    torch_threads = max(1, (os.cpu_count() or 1) // processes)
+
+    started = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=_init_worker,
+                             initargs=(limiter, torch_threads)) as pool:
+        futures = {pool.submit(ingest_feed, path, full_refresh, log_dir): path for path in feeds}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e: # The worker process itself died
+                result = {"feed": feed_name(path), "path": path, "status": "error", "errors": [str(e)],
+                          "index_changed": False}
+            results[path] = result
+            print(f"[{result['status']}] {result['feed']}: " +
+                  ", ".join(f"{k}={result.get(k, 0)}" for k in STAT_KEYS), file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    generation = None
+    if any(r["index_changed"] for r in results.values()):
+        generation = bump_index_generation() # Invalidates cached /search results once for the whole batch
+
+    ordered = [results[path] for path in feeds]
+    return {
+        "feeds": ordered,
+        "totals": {k: sum(r.get(k, 0) for r in ordered) for k in STAT_KEYS},
+        "failed_feeds": [r["feed"] for r in ordered if r["status"] != "ok"],
+        "processes": processes,
+        "upsert_rate": upsert_rate or None,
+        "elapsed_seconds": round(elapsed, 2),
+        "index_generation": generation
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a directory or manifest of Awin feeds in parallel.")
+    parser.add_argument("source", help="Directory of feeds (.csv, .csv.gz, .zip) or a manifest (.json list or one path per line)")
+    parser.add_argument("--processes", type=int, default=INGEST_PROCESSES)
+    parser.add_argument("--upsert-rate", type=float, default=INGEST_UPSERT_RATE,
+                        help="Max index write calls per second across all feeds (0 = unlimited)")
+    parser.add_argument("--full-refresh", action="store_true", default=None, help="Re-embed every row of every feed")
+    parser.add_argument("--log-dir", default=INGEST_LOG_DIR)
+    parser.add_argument("--output", default=None, help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    feeds = discover_feeds(args.source)
+    if not feeds:
+        parser.error(f"no feeds found in {args.source}")
+    report = run_feeds(feeds, args.processes, args.upsert_rate, args.full_refresh, args.log_dir)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            f.write(payload)
+    print(payload)
+    sys.exit(1 if report["failed_feeds"] else 0)
@@ -0,0 +1,241 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+from observability import get_logger, log_event
+
+load_dotenv()
+
+logger = get_logger("intent")
+
+# --- CONFIGURATION ---
+# Optional JSON file ({"intent phrase": "keywords ..."}) that overrides INTENT_MAP and is hot-reloaded
+INTENT_MAP_PATH = os.getenv("INTENT_MAP_PATH", "data/intent_map.json")
+INTENT_RELOAD_INTERVAL = float(os.getenv("INTENT_RELOAD_INTERVAL", "10")) # Seconds between mtime checks
+# Share of the final query vector that comes from the user's own words (the rest from matched intents)
+INTENT_QUERY_WEIGHT = float(os.getenv("INTENT_QUERY_WEIGHT", "0.6"))
+
+# --- PHASE 18: THE INTENT MAP (KEYWORD EXPANDER) ---
+INTENT_MAP = {
+    "hyrox": "crossfit functional fitness running shoes compression gear electrolytes energy gels grip chalk",
+    "marathon": "long distance running shoes hydration vest anti-chafe balm energy gels running socks recovery salts",
+    "half marathon": "running shoes hydration energy gels running socks recovery",
+    "5k": "running shoes lightweight trainers",
+    "10k": "running shoes lightweight trainers",
+    "skin routine": "face cleanser moisturizer toner serum SPF hyaluronic acid retinol",
+    "skincare": "face cleanser moisturizer toner serum SPF",
+    "morning routine": "face cleanser vitamin c serum moisturizer light therapy lamp",
+    "night routine": "magnesium glycinate blue light blocking glasses sleep mask lavender spray night cream",
+    "sleep": "magnesium glycinate blue light blocking glasses sleep mask lavender spray weighted blanket",
+    "recovery": "massage gun compression boots protein powder sauna blanket ice bath epsom salts",
+    "gym": "protein powder creatine pre-workout lifting straps gym bag water bottle",
+    "home gym": "dumbbells kettlebell yoga mat resistance bands adjustable bench",
+    "yoga": "yoga mat yoga blocks leggings meditation cushion essential oils",
+    "focus": "lion's mane mushroom caffeine l-theanine noise cancelling headphones standing desk",
+    "travel": "neck pillow compression socks eye mask power bank travel adapter noise cancelling headphones"
+}
+
+# Hyphens split words ("marathon-training" -> marathon, training); apostrophes don't ("lion's")
+TOKEN_PATTERN = re.compile(r"[\w']+")
+_END = object()
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class IntentMatcher:
+    """
+    Word-level trie over every intent phrase. Matching walks the query tokens
+    once, taking the longest phrase at each position, so cost depends on the
+    query length rather than the number of intents. Phrases only match whole
+    words: "5k" does not fire inside "15kg", "marathon" does fire in
+    "marathon-training", and "half marathon" wins over "marathon".
+    """
+
+    def __init__(self, intent_map):
+        self.intent_map = dict(intent_map)
+        self.max_phrase_len = 1
+        self._trie = {}
+        for phrase in self.intent_map:
+            tokens = tokenize(phrase)
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_END] = phrase
+            self.max_phrase_len = max(self.max_phrase_len, len(tokens))
+
+    def match(self, query: str) -> list:
+        """Returns the matched intent phrases in query order (no overlaps, no repeats)."""
+        tokens = tokenize(query)
+        matched = []
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            best, best_len = None, 0
+            for j in range(i, min(len(tokens), i + self.max_phrase_len)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if _END in node:
+                    best, best_len = node[_END], j - i + 1
+            if best is None:
+                i += 1
+                continue
+            if best not in matched:
+                matched.append(best)
+            i += best_len
+        return matched
+
+    def keywords(self, query: str) -> list:
+        """Expansion keywords for every matched intent, deduplicated in first-seen order."""
+        seen = set()
+        keywords = []
+        for phrase in self.match(query):
+            for word in self.intent_map[phrase].split():
+                if word.lower() not in seen:
+                    seen.add(word.lower())
+                    keywords.append(word)
+        return keywords
+
+
+class IntentRegistry:
+    """Holds the live IntentMatcher and rebuilds it when INTENT_MAP_PATH changes on disk."""
+
+    def __init__(self, path=INTENT_MAP_PATH, default_map=INTENT_MAP, reload_interval=INTENT_RELOAD_INTERVAL):
+        self.path = path
+        self.default_map = default_map
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self.matcher = IntentMatcher(default_map)
+        self.reload()
+
+    def reload(self):
+        """Loads the intent file if it changed. A broken file keeps the current matcher."""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if self._mtime is not None:
+                log_event(logger, "intent_file_removed", path=self.path)
+                self._mtime = None
+                self.matcher = IntentMatcher(self.default_map)
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as f:
+                intent_map = json.load(f)
+            self.matcher = IntentMatcher(intent_map) # Swapped in one assignment; readers never see a half-built trie
+            self._mtime = mtime
+            log_event(logger, "intents_loaded", path=self.path, intents=len(intent_map))
+        except (OSError, ValueError) as e:
+            self._mtime = mtime # Don't retry the same broken file every interval
+            log_event(logger, "intent_reload_failed", level=logging.ERROR, path=self.path, error=str(e))
+
+    def current(self) -> IntentMatcher:
+        if time.monotonic() - self._checked_at >= self.reload_interval:
+            with self._lock:
+                if time.monotonic() - self._checked_at >= self.reload_interval:
+                    self.reload()
+        return self.matcher
+
+
+class IntentEmbeddings:
+    """
+    One precomputed embedding per intent, so an expanded query costs a single
+    short encode of the user's words. The final vector is a weighted blend of
+    the raw query embedding and the mean of the matched intent vectors.
+    Vectors are keyed by (phrase, keywords), so a hot-reloaded map only
+    re-encodes the intents that actually changed. That re-encode runs on a
+    background thread: blend() sits on the async /search path and never
+    calls the model, it just skips intents whose vectors aren't ready yet.
+    """
+
+    def __init__(self, encode, registry=None, query_weight=INTENT_QUERY_WEIGHT):
+        self.encode = encode
+        self.registry = registry if registry is not None else intent_registry
+        self.query_weight = query_weight
+        self._vectors = {}
+        self._matcher = None
+        self._lock = threading.Lock()
+        self._warming = None # Background re-warm thread after a hot reload
+
+    def warm(self):
+        """Encodes every intent of the live matcher that isn't cached yet, in one batch."""
+        matcher = self.registry.current()
+        if matcher is self._matcher:
+            return matcher
+        with self._lock:
+            if matcher is not self._matcher:
+                keys = [(phrase, keywords) for phrase, keywords in matcher.intent_map.items()]
+                missing = [key for key in keys if key not in self._vectors]
+                if missing:
+                    vectors = self.encode([f"{phrase} {keywords}" for phrase, keywords in missing])
+                    for key, vector in zip(missing, vectors):
+                        self._vectors[key] = _unit(np.asarray(vector, dtype=np.float32))
+                live = set(keys)
+                self._vectors = {key: vec for key, vec in self._vectors.items() if key in live}
+                self._matcher = matcher
+        return matcher
+
+    def _rewarm_in_background(self):
+        with self._lock:
+            if self._warming is not None and self._warming.is_alive():
+                return
+            self._warming = threading.Thread(target=self._rewarm, name="intent-warm", daemon=True)
+            self._warming.start()
+
+    def _rewarm(self):
+        try:
+            self.warm()
+        except Exception as e:
+            log_event(logger, "intent_warm_failed", level=logging.ERROR, error=str(e))
+
+    def blend(self, query_vector, intents):
+        """Weighted blend of the query vector and the matched intent vectors (unit length)."""
+        query_vector = _unit(np.asarray(query_vector, dtype=np.float32))
+        if not intents:
+            return query_vector
+        matcher = self.registry.current()
+        if matcher is not self._matcher:
+            self._rewarm_in_background() # New or edited intents blend in once their vectors exist
+        vectors = self._vectors
+        intent_vectors = [
+            vectors.get((phrase, matcher.intent_map[phrase]))
+            for phrase in intents if phrase in matcher.intent_map
+        ]
+        intent_vectors = [vec for vec in intent_vectors if vec is not None]
+        if not intent_vectors:
+            return query_vector
+        intent_mean = _unit(np.mean(intent_vectors, axis=0))
+        return _unit(self.query_weight * query_vector + (1.0 - self.query_weight) * intent_mean)
+
+
+def _unit(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+intent_registry = IntentRegistry()
+
+
+def match_intents(user_query: str) -> list:
+    return intent_registry.current().match(user_query)
+
+
+def expand_query_intent(user_query: str) -> str:
+    keywords = intent_registry.current().keywords(user_query)
+    if keywords:
+        expansion = " ".join(keywords)
+        return f"{user_query} {expansion}"
+    return user_query
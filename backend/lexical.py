@@ -0,0 +1,447 @@
+import os
+import re
+import json
+import math
+import time
+import heapq
+import shutil
+import struct
+import zipfile
+import threading
+from array import array
+from collections import Counter
+import numpy as np
+from dotenv import load_dotenv
+
+from query_cache import GENERATION_CHECK_INTERVAL
+from filters import MetadataBitmaps
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "data/lexical")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+TITLE_WEIGHT = 2 # Title tokens are counted this many times (cheap field boost)
+# Lexical-only hits must match at least this share of the query's IDF mass, so "for" alone never surfaces a product
+LEXICAL_MIN_COVERAGE = float(os.getenv("LEXICAL_MIN_COVERAGE", "0.5"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+SEGMENT_SUFFIX = ".bm25.npz"
+# Segments are built from sorted runs of this many documents spilled to disk, so an
+# ingest's memory doesn't grow with the feed (about 12 bytes per posting per run)
+LEXICAL_RUN_DOCS = int(os.getenv("LEXICAL_RUN_DOCS", "50000"))
+LEXICAL_MERGE_FANIN = 64 # Runs merged at once; more are merged in passes
+_RUN_RECORD = struct.Struct("<II") # term bytes, postings
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or that the this to with".split()
+)
+RAW_TOKEN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+TOKEN_PARTS = re.compile(r"[0-9]+(?:[.,][0-9]+)*|[a-z]+")
+
+
+def analyze(text: str) -> list:
+    """
+    Lowercased word tokens minus stopwords. Mixed tokens like "15lbs" or "500mg"
+    also emit their parts ("15", "lbs"), so "15 lbs" and "15lbs" still meet.
+    """
+    tokens = []
+    for raw in RAW_TOKEN.findall(text.lower()):
+        if raw in STOPWORDS:
+            continue
+        tokens.append(raw)
+        parts = TOKEN_PARTS.findall(raw)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p not in STOPWORDS)
+    return tokens
+
+
+class LexicalIndexBuilder:
+    """
+    Collects one feed's cleaned rows during ingestion and writes them as a
+    BM25 segment: a CSR postings matrix (term -> doc positions and term
+    frequencies) plus the display metadata, in a single uncompressed .npz.
+
+    Memory stays flat however big the feed: add() appends each document's id,
+    metadata and tokens to a log on disk next to the segment, and save()
+    turns the log into sorted runs of run_docs documents that are merged
+    into the segment. Callers dedupe ids before add().
+    """
+
+    def __init__(self, feed, directory=LEXICAL_INDEX_DIR, run_docs=LEXICAL_RUN_DOCS):
+        self.feed = feed
+        self.path = segment_path(feed, directory)
+        self.log_path = self.path[:-len(".npz")] + ".docs"
+        self.run_docs = max(1, run_docs)
+        self.docs = 0
+        self._log = None
+
+    def __len__(self):
+        return self.docs
+
+    def start(self, state=None):
+        """
+        Opens the document log: empty, or cut back to a checkpoint() state to
+        carry on an interrupted run. Returns False (and starts empty) when the
+        log no longer holds that state.
+        """
+        self.close()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        resumed = False
+        if state is not None and os.path.exists(self.log_path) and os.path.getsize(self.log_path) >= state["log_bytes"]:
+            self._log = open(self.log_path, mode='r+b')
+            self._log.truncate(state["log_bytes"]) # Documents added after the checkpoint are added again
+            self._log.seek(state["log_bytes"])
+            self.docs = state["docs"]
+            resumed = True
+        else:
+            self._log = open(self.log_path, mode='wb')
+            self.docs = 0
+        return resumed
+
+    def add(self, p_id, title, description, category, metadata):
+        if self._log is None:
+            self.start()
+        tokens = analyze(title) * TITLE_WEIGHT + analyze(description) + analyze(category)
+        record = json.dumps([p_id, metadata, " ".join(tokens)], separators=(",", ":"))
+        self._log.write(record.encode("utf-8") + b"\n")
+        self.docs += 1
+
+    def checkpoint(self):
+        """Flushes the log and returns the state start() needs to resume from here."""
+        if self._log is None:
+            self.start()
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        return {"docs": self.docs, "log_bytes": self._log.tell()}
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def save(self):
+        if self._log is None:
+            self.start()
+        self.close()
+        work = self.path + ".build"
+        shutil.rmtree(work, ignore_errors=True)
+        os.makedirs(work)
+        try:
+            runs = self._spill_runs(work)
+            level = 0
+            while len(runs) > LEXICAL_MERGE_FANIN:
+                merged = []
+                for n in range(0, len(runs), LEXICAL_MERGE_FANIN):
+                    path = os.path.join(work, f"merge{level}_{n}.run")
+                    with open(path, mode='wb') as out:
+                        for term, docs, tf in _merge_runs(runs[n:n + LEXICAL_MERGE_FANIN]):
+                            _write_run_record(out, term, docs, tf)
+                    merged.append(path)
+                for path in runs:
+                    os.remove(path)
+                runs = merged
+                level += 1
+            self._write_segment(work, runs)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        os.replace(self.path + ".tmp", self.path) # Readers never see a half-written segment
+        os.remove(self.log_path)
+        return self.path
+
+    def _spill_runs(self, work):
+        """
+        Reads the log once: postings go to one sorted run file per run_docs
+        documents, ids/metadata/doc lengths to flat files for the final write.
+        """
+        runs = []
+        vocab, terms, docs, tfs = {}, array('i'), array('i'), array('f')
+
+        def spill():
+            path = os.path.join(work, f"run{len(runs):06d}.run")
+            names = sorted(vocab)
+            rank = np.empty(len(names), dtype=np.int64)
+            rank[[vocab[name] for name in names]] = np.arange(len(names))
+            keys = rank[np.frombuffer(terms, dtype=np.int32)]
+            order = np.argsort(keys, kind="stable") # Stable: postings stay in doc order
+            run_docs = np.frombuffer(docs, dtype=np.int32)[order]
+            run_tf = np.frombuffer(tfs, dtype=np.float32)[order]
+            bounds = np.searchsorted(keys[order], np.arange(len(names) + 1))
+            with open(path, mode='wb') as out:
+                for i, name in enumerate(names):
+                    _write_run_record(out, name, run_docs[bounds[i]:bounds[i + 1]], run_tf[bounds[i]:bounds[i + 1]])
+            runs.append(path)
+
+        with open(self.log_path, mode='rb') as log, \
+                open(os.path.join(work, "ids"), mode='wb') as ids, \
+                open(os.path.join(work, "metadata"), mode='wb') as metadata, \
+                open(os.path.join(work, "doc_len"), mode='wb') as doc_len:
+            doc = 0
+            for line in log:
+                p_id, meta, tokens = json.loads(line)
+                separator = b"," if doc else b""
+                ids.write(separator + json.dumps(p_id).encode("utf-8"))
+                metadata.write(separator + json.dumps(meta, separators=(",", ":")).encode("utf-8"))
+                tokens = tokens.split()
+                doc_len.write(struct.pack("<f", len(tokens)))
+                for token, tf in Counter(tokens).items():
+                    term = vocab.get(token)
+                    if term is None:
+                        term = vocab[token] = len(vocab)
+                    terms.append(term)
+                    docs.append(doc)
+                    tfs.append(tf)
+                doc += 1
+                if doc % self.run_docs == 0:
+                    spill()
+                    vocab, terms, docs, tfs = {}, array('i'), array('i'), array('f')
+            if vocab:
+                spill()
+        self.docs = doc
+        return runs
+
+    def _write_segment(self, work, runs):
+        """Merges the runs into the .npz (written entry by entry, never held in memory whole)."""
+        terms = []
+        offsets = array('q', [0])
+        with open(os.path.join(work, "postings"), mode='wb') as postings, \
+                open(os.path.join(work, "tf"), mode='wb') as tf_out:
+            for term, docs, tf in _merge_runs(runs):
+                terms.append(term)
+                postings.write(docs.tobytes())
+                tf_out.write(tf.tobytes())
+                offsets.append(offsets[-1] + len(docs))
+
+        head, middle, tail = b'{"ids":[', b'],"metadata":[', b']}'
+        docs_size = (len(head) + os.path.getsize(os.path.join(work, "ids")) + len(middle)
+                     + os.path.getsize(os.path.join(work, "metadata")) + len(tail))
+        with zipfile.ZipFile(self.path + ".tmp", mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as npz:
+            _write_npy(npz, "terms", np.array(terms, dtype=np.str_))
+            _write_npy(npz, "offsets", np.frombuffer(offsets, dtype=np.int64))
+            _copy_npy(npz, "postings", np.int32, [os.path.join(work, "postings")])
+            _copy_npy(npz, "tf", np.float32, [os.path.join(work, "tf")])
+            _copy_npy(npz, "doc_len", np.float32, [os.path.join(work, "doc_len")])
+            _copy_npy(npz, "docs", np.uint8, [head, os.path.join(work, "ids"), middle,
+                                              os.path.join(work, "metadata"), tail], size=docs_size)
+
+
+def _write_run_record(out, term, docs, tf):
+    encoded = term.encode("utf-8")
+    out.write(_RUN_RECORD.pack(len(encoded), len(docs)))
+    out.write(encoded)
+    out.write(np.asarray(docs, dtype=np.int32).tobytes())
+    out.write(np.asarray(tf, dtype=np.float32).tobytes())
+
+def _read_run(path, run):
+    """Yields (term, run, docs, tf) from one run file, in term order."""
+    with open(path, mode='rb') as f:
+        while True:
+            header = f.read(_RUN_RECORD.size)
+            if not header:
+                return
+            term_bytes, count = _RUN_RECORD.unpack(header)
+            term = f.read(term_bytes).decode("utf-8")
+            docs = np.frombuffer(f.read(4 * count), dtype=np.int32)
+            tf = np.frombuffer(f.read(4 * count), dtype=np.float32)
+            yield term, run, docs, tf
+
+def _merge_runs(paths):
+    """K-way merge of sorted runs: yields (term, docs, tf) with each term's postings in doc order."""
+    current, docs, tfs = None, [], []
+    for term, _, run_docs, run_tf in heapq.merge(*(_read_run(path, n) for n, path in enumerate(paths))):
+        if term != current:
+            if current is not None:
+                yield current, np.concatenate(docs), np.concatenate(tfs)
+            current, docs, tfs = term, [], []
+        docs.append(run_docs)
+        tfs.append(run_tf)
+    if current is not None:
+        yield current, np.concatenate(docs), np.concatenate(tfs)
+
+def _write_npy(npz, name, values):
+    with npz.open(name + ".npy", mode='w', force_zip64=True) as f:
+        np.lib.format.write_array(f, values)
+
+def _copy_npy(npz, name, dtype, parts, size=None):
+    """Writes a 1-D .npy entry whose raw bytes come from files (paths) and literal byte strings."""
+    size = size if size is not None else sum(os.path.getsize(p) for p in parts)
+    dtype = np.dtype(dtype)
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (size // dtype.itemsize,)}
+    with npz.open(name + ".npy", mode='w', force_zip64=True) as f:
+        np.lib.format.write_array_header_1_0(f, header)
+        for part in parts:
+            if isinstance(part, bytes):
+                f.write(part)
+            else:
+                with open(part, mode='rb') as src:
+                    shutil.copyfileobj(src, f, 1 << 20)
+
+
+def segment_path(feed, directory=LEXICAL_INDEX_DIR):
+    name = re.sub(r"[^\w.-]+", "_", feed)
+    return os.path.join(directory, name + SEGMENT_SUFFIX)
+
+
+class _Segment:
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.terms = {term: i for i, term in enumerate(data["terms"].tolist())}
+            self.offsets = data["offsets"]
+            self.postings = data["postings"]
+            self.tf = data["tf"]
+            self.doc_len = data["doc_len"]
+            docs = json.loads(data["docs"].tobytes().decode("utf-8"))
+        self.ids = docs["ids"]
+        self.metadata = docs["metadata"]
+        self.bitmaps = MetadataBitmaps(self.metadata)
+
+    def df(self, term):
+        i = self.terms.get(term)
+        return 0 if i is None else int(self.offsets[i + 1] - self.offsets[i])
+
+    def postings_for(self, term):
+        i = self.terms.get(term)
+        if i is None:
+            return None, None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.postings[start:end], self.tf[start:end]
+
+
+class LexicalIndex:
+    """
+    Read side of the BM25 segments (one per feed). IDF and average document
+    length are computed across all segments, so scores are comparable no matter
+    which feed a product came from. Segments are reloaded when ingestion bumps
+    the index generation (checked every check_interval seconds).
+    """
+
+    def __init__(self, directory=LEXICAL_INDEX_DIR, generation_source=None,
+                 check_interval=GENERATION_CHECK_INTERVAL):
+        self.directory = directory
+        self.generation_source = generation_source
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._segments = []
+        self._generation = generation_source() if generation_source else None
+        self._checked_at = time.time()
+        self.load_ms = 0.0
+        self.load()
+
+    def load(self):
+        started = time.perf_counter()
+        segments = []
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                if name.endswith(SEGMENT_SUFFIX):
+                    segments.append(_Segment(os.path.join(self.directory, name)))
+        self._segments = segments
+        self.total_docs = sum(len(s.ids) for s in segments)
+        total_len = sum(float(s.doc_len.sum()) for s in segments)
+        self.avg_doc_len = total_len / self.total_docs if self.total_docs else 0.0
+        self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def __len__(self):
+        return self.total_docs
+
+    def _maybe_reload(self):
+        if self.generation_source is None:
+            return
+        now = time.time()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            generation = self.generation_source()
+            if generation != self._generation:
+                self._generation = generation
+                self.load()
+
+    def _idf(self, df):
+        return math.log(1.0 + (self.total_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top_k=20, filter=None) -> dict:
+        """
+        BM25 top_k as {"matches": [{"id", "score", "coverage", "metadata"}]}, best first.
+        filter (see filters.py) is applied through each segment's bitmaps before ranking.
+        """
+        self._maybe_reload()
+        segments = self._segments
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms or not self.total_docs:
+            return {"matches": []}
+
+        # Terms missing from the corpus still count towards the query's mass (coverage < 1)
+        query_idf = {term: self._idf(sum(s.df(term) for s in segments)) for term in terms}
+        query_mass = sum(query_idf.values())
+        idf = {term: weight for term, weight in query_idf.items() if any(s.df(term) for s in segments)}
+
+        candidates = []
+        for segment in segments:
+            scores = None
+            matched = None
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * segment.doc_len / self.avg_doc_len)
+            for term, weight in idf.items():
+                docs, tf = segment.postings_for(term)
+                if docs is None:
+                    continue
+                if scores is None:
+                    scores = np.zeros(len(segment.ids), dtype=np.float32)
+                    matched = np.zeros(len(segment.ids), dtype=np.float32)
+                scores[docs] += weight * tf * (BM25_K1 + 1.0) / (tf + norm[docs])
+                matched[docs] += weight
+            if scores is None:
+                continue
+            mask = segment.bitmaps.mask(filter)
+            if mask is not None:
+                scores[~mask] = 0.0
+            hits = np.flatnonzero(scores)
+            if len(hits) > top_k:
+                hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+            candidates.extend((float(scores[i]), float(matched[i]) / query_mass, segment, int(i)) for i in hits)
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        matches = []
+        seen = set()
+        for score, coverage, segment, i in candidates:
+            p_id = segment.ids[i]
+            if p_id in seen:
+                continue
+            seen.add(p_id)
+            matches.append({"id": p_id, "score": score, "coverage": round(coverage, 4),
+                            "metadata": segment.metadata[i]})
+            if len(matches) >= top_k:
+                break
+        return {"matches": matches}
+
+    def stats(self):
+        return {
+            "segments": len(self._segments),
+            "documents": self.total_docs,
+            "terms": sum(len(s.terms) for s in self._segments),
+            "load_ms": self.load_ms,
+            "generation": self._generation
+        }
+
+
+def rrf_fuse(ranked_lists, k=RRF_K, limit=None, score_from=None) -> list:
+    """
+    Reciprocal rank fusion: each list contributes 1 / (k + rank) per match.
+    Returns matches (first-seen metadata kept) ordered by "fused_score", best
+    first, with any "values" a list carried. "score" is the raw score from the
+    list named by score_from (None for matches that list didn't return), so
+    callers keep one score scale rather than a mix of cosine and BM25.
+    """
+    fused = {}
+    for name, matches in ranked_lists.items():
+        for rank, match in enumerate(matches, start=1):
+            entry = fused.get(match["id"])
+            if entry is None:
+                entry = fused[match["id"]] = {"id": match["id"], "score": None, "fused_score": 0.0,
+                                              "metadata": match["metadata"]}
+            entry["fused_score"] += 1.0 / (k + rank)
+            if name == score_from:
+                entry["score"] = match["score"]
+            if "values" in match:
+                entry["values"] = match["values"]
+    ordered = sorted(fused.values(), key=lambda m: m["fused_score"], reverse=True)
+    return ordered[:limit] if limit else ordered
@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from benchmark import BENCH_QUERIES, offline_env, ensure_mock_feeds, build_offline_index, summarize
+
+# --- CONFIGURATION ---
+DEFAULT_URL = "http://127.0.0.1:8000"
+ENDPOINTS = ("search", "track-click")
+
+
+def unique_query(i):
+    """
+    A benchmark query made unique per request number, so no timed /search is
+    answered from the result or embedding cache a previous request filled.
+    """
+    return f"{BENCH_QUERIES[i % len(BENCH_QUERIES)]} {i}"
+
+def _search_request(session, base_url, i):
+    return session.get(f"{base_url}/search", params={"query": unique_query(i)}, timeout=30)
+
+def _click_request(session, base_url, i):
+    payload = {
+        "product_title": f"Load Test Product {i % 50}",
+        "query": BENCH_QUERIES[i % len(BENCH_QUERIES)],
+        "link": "https://ventiko.app"
+    }
+    return session.post(f"{base_url}/track-click", json=payload, timeout=30)
+
+REQUESTS = {"search": _search_request, "track-click": _click_request}
+
+
+def drive(base_url, endpoint, concurrency, total, warmup=10, first=0):
+    """
+    Fires `total` requests at one endpoint from `concurrency` threads (one
+    keep-alive session each) and returns latency percentiles, throughput and
+    status counts. Requests are numbered from `first`, so runs given disjoint
+    ranges never replay each other's queries.
+    """
+    send = REQUESTS[endpoint]
+    local = threading.local()
+    latencies = []
+    statuses = {}
+    errors = []
+    lock = threading.Lock()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            status = send(session(), base_url, i).status_code
+        except requests.RequestException as e:
+            status = "error"
+            with lock:
+                errors.append(str(e))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed_ms)
+
+    with requests.Session() as warm:
+        for i in range(warmup): # Builds the lazily loaded resources; numbered past the timed range
+            send(warm, base_url, first + total + i)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(first, first + total)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "endpoint": f"/{endpoint}",
+        "concurrency": concurrency,
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=lambda kv: str(kv[0]))},
+        "latency": summarize(latencies),
+        "errors_sample": errors[:5]
+    }
+
+
+@contextlib.contextmanager
+def offline_server(port, encoder, workers=1, workdir=None):
+    """Builds the offline index and serves main:app on it with uvicorn; yields the base URL."""
+    workdir = workdir or tempfile.mkdtemp(prefix="ventiko-load-")
+    env = offline_env(workdir, encoder)
+    os.environ.update(env)
+    with contextlib.redirect_stdout(sys.stderr):
+        build_offline_index(ensure_mock_feeds())
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        env={**os.environ, **env}, stdout=sys.stderr, stderr=sys.stderr
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 120
+        while True:
+            try:
+                if requests.get(base_url + "/", timeout=1).status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            if process.poll() is not None or time.time() > deadline:
+                raise RuntimeError("offline server did not come up")
+            time.sleep(0.25)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def run_load(base_url, endpoints, concurrency, total, warmup=10):
+    runs = [(endpoint, c) for endpoint in endpoints for c in concurrency]
+    return {
+        "meta": {
+            "url": base_url,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        },
+        "results": [drive(base_url, endpoint, c, total, warmup, first=n * (total + warmup))
+                    for n, (endpoint, c) in enumerate(runs)]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test /search and /track-click and report latency percentiles as JSON.")
+    parser.add_argument("--url", default=None,
+                        help=f"Running server to hit (e.g. {DEFAULT_URL}); omit to start an offline one")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, action="append", help="Repeatable; default both")
+    parser.add_argument("--concurrency", type=int, action="append", help="Repeatable; default 1, 8 and 32")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint per concurrency level")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the offline server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the offline server")
+    parser.add_argument("--encoder", default="hashing", help="ENCODER_BACKEND for the offline server")
+    parser.add_argument("--output", default=None, help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    endpoints = args.endpoint or list(ENDPOINTS)
+    concurrency = args.concurrency or [1, 8, 32]
+    if args.url:
+        report = run_load(args.url.rstrip("/"), endpoints, concurrency, args.requests)
+    else:
+        with offline_server(args.port, args.encoder, args.workers) as base_url:
+            report = run_load(base_url, endpoints, concurrency, args.requests)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            f.write(payload)
+    print(payload)
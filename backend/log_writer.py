@@ -0,0 +1,147 @@
+import os
+import time
+import logging
+import queue
+import threading
+from sqlmodel import Session, select
+from dotenv import load_dotenv
+
+from observability import get_logger, log_event, stage_seconds
+
+load_dotenv()
+
+logger = get_logger("log_writer")
+
+# --- CONFIGURATION ---
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "2.0")) # Seconds
+LOG_SHUTDOWN_TIMEOUT = float(os.getenv("LOG_SHUTDOWN_TIMEOUT", "10.0")) # Seconds
+
+_STOP = object()
+
+
+class LogWriter:
+    """
+    Write-behind buffer for analytics rows (SearchLog, ClickLog).
+
+    Request handlers call submit() and return immediately; a single daemon
+    thread drains the queue and bulk-inserts rows in one transaction whenever
+    LOG_BATCH_SIZE rows are buffered or LOG_FLUSH_INTERVAL seconds pass.
+
+    BACKPRESSURE POLICY: the queue is bounded at LOG_QUEUE_SIZE. When it is
+    full, submit() drops the new row and counts it in `dropped` instead of
+    blocking the request. Analytics are best-effort; search latency is not.
+    A failed flush is logged and its batch discarded (counted in `failed`).
+
+    Rows of `dedupe_model` keep the old /search behaviour: if the query matches
+    the most recent logged query (case-insensitive), the existing row's
+    timestamp is bumped instead of inserting a duplicate. The most recent row
+    is read inside each flush's transaction, so it is the latest one written
+    by any worker, not just this process.
+    """
+
+    def __init__(self, engine, dedupe_model=None, max_queue=LOG_QUEUE_SIZE,
+                 batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        self.engine = engine
+        self.dedupe_model = dedupe_model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._counter_lock = threading.Lock() # submit() runs on many request threads at once
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record) -> bool:
+        """Queues a row for the next bulk insert. Returns False if it was dropped."""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped += 1
+            return False
+        with self._counter_lock:
+            self.submitted += 1
+        return True
+
+    def stop(self, timeout=LOG_SHUTDOWN_TIMEOUT):
+        """Flushes everything still queued, then stops the writer thread."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            log_event(logger, "shutdown_queue_full", level=logging.ERROR, queued=self._queue.qsize())
+            return
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                if batch:
+                    self._flush(batch)
+                return
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._flush(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        try:
+            with Session(self.engine) as session:
+                last = None
+                if self.dedupe_model is not None and any(isinstance(r, self.dedupe_model) for r in batch):
+                    model = self.dedupe_model
+                    statement = select(model).order_by(model.timestamp.desc(), model.id.desc()).limit(1)
+                    last = session.exec(statement).first()
+                for record in batch:
+                    if self.dedupe_model is not None and isinstance(record, self.dedupe_model):
+                        if last is not None and last.query.lower() == record.query.lower():
+                            last.timestamp = record.timestamp
+                            continue
+                        last = record
+                    session.add(record)
+                session.commit()
+            with self._counter_lock:
+                self.written += len(batch)
+                self.flushes += 1
+            stage_seconds.observe(time.perf_counter() - started, stage="db_log")
+        except Exception as e:
+            with self._counter_lock:
+                self.failed += len(batch)
+            log_event(logger, "flush_failed", level=logging.ERROR, rows_lost=len(batch), error=str(e))
+
+    def stats(self):
+        with self._counter_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "written": self.written,
+                "failed": self.failed,
+                "flushes": self.flushes
+            }
@@ -1,14 +1,31 @@
 import os
-import datetime
+import gc
+import json
+import time
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from fastapi import FastAPI, Request, Depends, HTTPException, Header
+from fastapi import FastAPI, Request, Response, Depends, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
-from sqlmodel import Field, Session, SQLModel, create_engine, select, delete
+from sqlmodel import Session, select, delete
 from pydantic import BaseModel
-import resend
+
+from models import SearchLog, UserLead, ClickLog
+from database import engine, read_engine, create_db_and_tables, get_session, get_read_session, pool_stats
+from maintenance import total_clicks, top_queries, top_products
+from log_writer import LogWriter
+from email_outbox import OutboxSender, enqueue_email
+from email_templates import render_results_email
+from intent import match_intents
+from resources import resources, PRELOAD_MODEL
+from query_cache import bump_cache_generation
+from batch_encoder import EncoderBusy
+from lexical import rrf_fuse, LEXICAL_MIN_COVERAGE
+from filters import build_filter
+from rerank import diversify
+from observability import get_logger, log_event, metrics, stage_seconds, request_seconds, requests_total
+from pagination import keyset_page, count_rows, stream_export, EXPORT_MEDIA_TYPES, DEFAULT_PAGE_SIZE
 
 # SECURITY TOOLS
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -18,99 +35,61 @@ from secure import Secure
 
 load_dotenv()
 
-# --- CONFIGURATION ---
-resend.api_key = os.getenv("RESEND_API_KEY")
+logger = get_logger("api")
 
+# --- CONFIGURATION ---
 # INTELLIGENCE SETTINGS
 SCORE_THRESHOLD = 0.35 
-
-# --- PHASE 18: THE INTENT MAP (KEYWORD EXPANDER) ---
-INTENT_MAP = {
-    "hyrox": "crossfit functional fitness running shoes compression gear electrolytes energy gels grip chalk",
-    "marathon": "long distance running shoes hydration vest anti-chafe balm energy gels running socks recovery salts",
-    "half marathon": "running shoes hydration energy gels running socks recovery",
-    "5k": "running shoes lightweight trainers",
-    "10k": "running shoes lightweight trainers",
-    "skin routine": "face cleanser moisturizer toner serum SPF hyaluronic acid retinol",
-    "skincare": "face cleanser moisturizer toner serum SPF",
-    "morning routine": "face cleanser vitamin c serum moisturizer light therapy lamp",
-    "night routine": "magnesium glycinate blue light blocking glasses sleep mask lavender spray night cream",
-    "sleep": "magnesium glycinate blue light blocking glasses sleep mask lavender spray weighted blanket",
-    "recovery": "massage gun compression boots protein powder sauna blanket ice bath epsom salts",
-    "gym": "protein powder creatine pre-workout lifting straps gym bag water bottle",
-    "home gym": "dumbbells kettlebell yoga mat resistance bands adjustable bench",
-    "yoga": "yoga mat yoga blocks leggings meditation cushion essential oils",
-    "focus": "lion's mane mushroom caffeine l-theanine noise cancelling headphones standing desk",
-    "travel": "neck pillow compression socks eye mask power bank travel adapter noise cancelling headphones"
-}
-
-def expand_query_intent(user_query: str) -> str:
-    query_lower = user_query.lower()
-    additional_keywords = []
-    for key, values in INTENT_MAP.items():
-        if key in query_lower:
-            additional_keywords.append(values)
-    if additional_keywords:
-        expansion = " ".join(additional_keywords)
-        return f"{user_query} {expansion}"
-    return user_query
-
-# --- DATABASE SETUP ---
-class SearchLog(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    query: str
-    timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
-    results_summary: str 
-
-class UserLead(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    email: str
-    query: str
-    results_summary: str
-    opt_in: bool = Field(default=False)
-    timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
-
-class ClickLog(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    product_title: str
-    query: str
-    link_clicked: str
-    timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
-
-# --- ENGINE CREATION ---
-database_url = os.getenv("DATABASE_URL")
-if database_url and database_url.startswith("postgres://"):
-    database_url = database_url.replace("postgres://", "postgresql://", 1)
-
-if not database_url:
-    print("!!! WARNING: No DATABASE_URL found. Falling back to temporary SQLite.")
-    sqlite_file_name = "search_history.db"
-    database_url = f"sqlite:///{sqlite_file_name}"
-
-engine = create_engine(database_url)
-
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
-
-def get_session():
-    with Session(engine) as session:
-        yield session
-
-# --- PINECONE SETUP ---
-api_key = os.getenv("PINECONE_API_KEY")
-pc = Pinecone(api_key=api_key)
-index = pc.Index("ventiko-index")
-model = SentenceTransformer('all-MiniLM-L6-v2')
+DEFAULT_TOP_K = 3
+MAX_TOP_K = 20
+# Vector and BM25 each over-fetch at least this many candidates (and OVERFETCH_FACTOR x top_k)
+# in a single query; fusion, de-duplication and MMR then trim them to top_k
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+OVERFETCH_FACTOR = int(os.getenv("OVERFETCH_FACTOR", "4"))
+# Fetch stored vectors with the candidates so de-duplication and MMR can compare them by cosine.
+# Free for the local index; on Pinecone it adds every candidate's 384 floats to each query
+# response, so it's off there by default and re-ranking falls back to title similarity.
+RERANK_WITH_VECTORS = os.getenv(
+    "RERANK_WITH_VECTORS", "true" if os.getenv("VECTOR_BACKEND", "pinecone").lower() == "local" else "false"
+).lower() == "true"
+
+# Search and click analytics are written behind the request, in bulk
+log_writer = LogWriter(engine, dedupe_model=SearchLog)
+# Result emails go through a durable outbox so a slow provider never holds a request
+email_outbox = OutboxSender(engine)
+
+# --- SEARCH RESOURCES ---
+# Encoder, index, caches and intent vectors are built lazily by `resources`
+# (see resources.py). With PRELOAD_MODEL=true and `gunicorn --preload`, the
+# master loads the weights once and every forked worker shares those pages.
+if PRELOAD_MODEL:
+    resources.preload()
+    gc.freeze() # Keep the GC from touching (and so copying) the preloaded objects in each worker
 
 # --- SECURITY SETUP ---
-limiter = Limiter(key_func=get_remote_address)
+# RATE_LIMIT_ENABLED=false is for local load tests only (see loadtest.py)
+limiter = Limiter(key_func=get_remote_address, enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true")
 secure_headers = Secure.with_default_headers()
 
-app = FastAPI()
+def require_admin(x_admin_secret: str = Header(None)):
+    env_secret = os.getenv("ADMIN_SECRET", "ventiko_admin_2026")
+    if x_admin_secret != env_secret:
+        raise HTTPException(status_code=401, detail="Unauthorized Access")
 
-@app.on_event("startup")
-def on_startup():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     create_db_and_tables()
+    email_outbox.start() # Builds the email sender; a missing provider key stops the boot here
+    resources.warm()
+    log_writer.start()
+    log_event(logger, "startup", timings_ms=resources.timings_ms)
+    yield
+    log_writer.stop() # Flush buffered logs before the worker exits
+    email_outbox.stop() # Unsent messages stay pending in the table for the next start
+    if resources.is_loaded("batch_encoder"):
+        resources.batch_encoder.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -128,6 +107,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.middleware("http")
@@ -136,65 +116,127 @@ async def set_secure_headers(request, call_next):
     await secure_headers.set_headers_async(response)
     return response
 
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (/search), never the raw URL, to keep cardinality bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        request_seconds.observe(time.perf_counter() - started, route=path, method=request.method)
+        requests_total.inc(route=path, method=request.method, status=status)
+
 @app.get("/")
 def health_check():
-    return {"status": "online", "system": "Ventiko Product Finder"}
+    return {"status": "online", "system": "Ventiko Product Finder", "startup_ms": resources.timings_ms}
 
 # --- SEARCH ENDPOINT ---
-@app.get("/search")
-@limiter.limit("30/minute") 
-def search(request: Request, query: str, session: Session = Depends(get_session)):
-    print(f"Received Query: {query}")
-    if len(query.strip()) < 3:
-        return {"matches": []}
-
-    expanded_query = expand_query_intent(query)
-    if expanded_query != query:
-        print(f" -> Expanded to: {expanded_query}")
-
-    query_vector = model.encode(expanded_query).tolist()
-    results = index.query(
-        vector=query_vector,
-        top_k=3,
-        include_metadata=True
-    )
-    
+def apply_threshold(results) -> list:
     final_matches = []
-    result_titles = [] 
-
     for match in results['matches']:
         if match['score'] < SCORE_THRESHOLD:
             continue
-        m_data = match['metadata']
         final_matches.append({
             "id": match['id'],
             "score": match['score'],
-            "metadata": m_data
+            "metadata": match['metadata'],
+            "values": match.get('values')
         })
-        result_titles.append(m_data.get('title', 'Unknown Product'))
+    return final_matches
+
+def candidate_count(top_k: int) -> int:
+    return max(HYBRID_CANDIDATES, top_k * OVERFETCH_FACTOR)
+
+def fuse_matches(query: str, vector_results, top_k=DEFAULT_TOP_K, filter=None) -> list:
+    """
+    Hybrid ranking: vector candidates above SCORE_THRESHOLD and BM25 candidates
+    covering enough of the query are merged with reciprocal rank fusion, so exact
+    brand/SKU/dosage hits surface even when MiniLM ranks them low. The fused list
+    is then de-duplicated and MMR re-ranked down to top_k (see rerank.py).
+    Each match keeps "score" as its cosine similarity (None for BM25-only
+    hits) and carries the RRF score that ordered it under "fused_score".
+    """
+    lexical_results = resources.lexical_index.search(query, top_k=candidate_count(top_k), filter=filter)
+    lexical_matches = [m for m in lexical_results['matches'] if m['coverage'] >= LEXICAL_MIN_COVERAGE]
+    fused = rrf_fuse({"vector": apply_threshold(vector_results), "lexical": lexical_matches}, score_from="vector")
+    return diversify(fused, top_k)
+
+async def retrieve_matches_async(query: str, intents: list, top_k=DEFAULT_TOP_K, filter=None) -> list:
+    """
+    Encodes the query, blends in its intents, hits the vector index once and
+    fuses in BM25 hits. filter (see filters.py) is applied inside both indexes,
+    so every candidate already satisfies it. Never blocks the event loop:
+    encoding waits on the batch encoder's own thread and the vector query on
+    the index's own bounded pool, so FastAPI's shared threadpool is never held.
+    """
+    with stage_seconds.time(stage="encode"):
+        query_vector = await resources.embedding_cache.get_or_encode_async(query, resources.batch_encoder.encode_async)
+    with stage_seconds.time(stage="blend"):
+        query_vector = resources.intent_embeddings.blend(query_vector, intents)
+    with stage_seconds.time(stage="vector_query"):
+        results = await resources.index.query_async(
+            vector=query_vector,
+            top_k=candidate_count(top_k),
+            include_metadata=True,
+            include_values=RERANK_WITH_VECTORS,
+            filter=filter
+        )
+    with stage_seconds.time(stage="lexical_rerank"):
+        return fuse_matches(query, results, top_k, filter) # In-memory BM25; cheaper than a thread hop
+
+@app.get("/search")
+@limiter.limit("30/minute") 
+async def search(request: Request, query: str,
+                 min_price: Optional[float] = None, max_price: Optional[float] = None,
+                 merchant: Optional[List[str]] = Query(None), category: Optional[List[str]] = Query(None),
+                 top_k: int = Query(DEFAULT_TOP_K, ge=1, le=MAX_TOP_K)):
+    if len(query.strip()) < 3:
+        return {"matches": []}
+
+    with stage_seconds.time(stage="expand"):
+        intents = match_intents(query)
+
+    filter = build_filter(min_price, max_price, merchant, category)
+    cache_key = " | ".join([query, *intents, f"top_k={top_k}"] + ([json.dumps(filter, sort_keys=True)] if filter else []))
+    final_matches = resources.result_cache.get(cache_key)
+    if final_matches is None:
+        try:
+            final_matches = await retrieve_matches_async(query, intents, top_k, filter)
+        except EncoderBusy:
+            raise HTTPException(status_code=503, detail="Search is busy, please retry.")
+        resources.result_cache.put(cache_key, final_matches)
+    result_titles = [m['metadata'].get('title', 'Unknown Product') for m in final_matches]
+    log_event(logger, "search", sampled=True, query=query, intents=intents, filter=filter, results=len(final_matches))
 
     if final_matches:
-        statement = select(SearchLog).order_by(SearchLog.timestamp.desc()).limit(1)
-        last_log = session.exec(statement).first()
-        if last_log and last_log.query.lower() == query.lower():
-            last_log.timestamp = datetime.datetime.utcnow()
-            session.add(last_log)
-            session.commit()
-        else:
-            summary_str = " | ".join(result_titles)
-            new_log = SearchLog(query=query, results_summary=summary_str)
-            session.add(new_log)
-            session.commit()
+        summary_str = " | ".join(result_titles)
+        log_writer.submit(SearchLog(query=query, results_summary=summary_str)) # Non-blocking; written in bulk
 
     return {"matches": final_matches}
 
 # --- ARCHIVE ENDPOINT ---
+# Returns one page (newest first) as a plain list; the next page's cursor is in X-Next-Cursor.
+# Reads go to the replica (when DATABASE_REPLICA_URL is set) so they never queue behind log writes.
 @app.get("/archive")
-def get_archive(session: Session = Depends(get_session)):
-    statement = select(SearchLog).order_by(SearchLog.timestamp.desc())
-    results = session.exec(statement).all()
+def get_archive(response: Response, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                session: Session = Depends(get_read_session)):
+    results, next_cursor = keyset_page(session, SearchLog, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return results
 
+# The full export is a bulk dump of every query, so unlike the paged view it is admin-only
+@app.get("/archive/export", dependencies=[Depends(require_admin)])
+def export_archive(format: str = "ndjson"):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    return StreamingResponse(stream_export(read_engine, SearchLog, format), media_type=EXPORT_MEDIA_TYPES[format])
+
 # --- CLICK TRACKING ENDPOINT ---
 class ClickRequest(BaseModel):
     product_title: str
@@ -202,21 +244,19 @@ class ClickRequest(BaseModel):
     link: str
 
 @app.post("/track-click")
-def track_click(data: ClickRequest, session: Session = Depends(get_session)):
+def track_click(data: ClickRequest):
     new_click = ClickLog(
         product_title=data.product_title, 
         query=data.query,
         link_clicked=data.link
     )
-    session.add(new_click)
-    session.commit()
-    print(f" -> CLICK TRACKED: {data.product_title}")
+    log_writer.submit(new_click)
+    log_event(logger, "click", sampled=True, product_title=data.product_title, query=data.query)
     return {"status": "logged"}
 
 # --- UNSUBSCRIBE ENDPOINT ---
 @app.get("/unsubscribe")
 def unsubscribe(email: str, session: Session = Depends(get_session)):
-    print(f"--- UNSUBSCRIBE REQUEST: {email} ---")
     statement = select(UserLead).where(UserLead.email == email)
     results = session.exec(statement).all()
     if not results:
@@ -224,7 +264,7 @@ def unsubscribe(email: str, session: Session = Depends(get_session)):
     for record in results:
         session.delete(record)
     session.commit()
-    print(f" -> DELETED {len(results)} records for {email}")
+    log_event(logger, "unsubscribe", email=email, deleted=len(results))
     return {"status": "success", "message": f"Successfully removed {email}."}
 
 # --- EMAIL CAPTURE ENDPOINT (BELSTAFF CLEAN STYLE) ---
@@ -256,171 +296,117 @@ def capture_email(request: Request, data: EmailRequest, session: Session = Depen
         opt_in=data.opt_in
     )
     session.add(new_lead)
+    # Queued in the same transaction as the lead; the outbox thread sends (and retries) it
+    enqueue_email(session, data.email, f"Your Results: {data.query}", render_results_email(data.query, data.results))
     session.commit()
-    print(f" -> LEAD CAPTURED: {data.email}")
+    email_outbox.notify()
+    log_event(logger, "lead_captured", email=data.email, query=data.query)
+    return {"status": "success", "message": "Queued."}
 
-    # --- HTML GENERATION (BELSTAFF STYLE) ---
-    
-    # 1. Config
-    LOGO_URL = "https://ventiko.app/ventiko_logo2.png" # PRODUCTION URL
-    unsubscribe_link = "https://ventiko.app/?modal=unsubscribe"
-
-    # 2. Split Data
-    hero_item = data.results[0] if data.results else None
-    secondary_items = data.results[1:3] if len(data.results) > 1 else []
-
-    # 3. Build Secondary Rows (The Grid)
-    grid_html = ""
-    if secondary_items:
-        grid_content = ""
-        for item in secondary_items:
-            img_src = item.image if item.image else "https://via.placeholder.com/250x200?text=Product"
-            price_tag = item.price if item.price else "Check Price"
-            
-            grid_content += f"""
-            <td width="50%" valign="top" style="padding: 10px;">
-                <table width="100%" border="0" cellspacing="0" cellpadding="0" style="border: 1px solid #e2e8f0; border-radius: 8px; overflow: hidden;">
-                    <tr>
-                        <td align="center" style="background-color: #ffffff; height: 200px; vertical-align: middle;">
-                            <a href="{item.link}">
-                                <img src="{img_src}" width="100%" style="display: block; max-height: 180px; width: auto; max-width: 100%; margin: 0 auto; object-fit: contain;" alt="{item.title}">
-                            </a>
-                        </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 15px; background-color: #f8fafc;">
-                            <div style="font-family: Helvetica, Arial, sans-serif; font-size: 13px; font-weight: bold; color: #0f172a; margin-bottom: 5px; height: 36px; overflow: hidden; line-height: 1.4;">{item.title}</div>
-                            <div style="font-family: Helvetica, Arial, sans-serif; font-size: 12px; color: #64748b; margin-bottom: 10px;">{price_tag}</div>
-                            <a href="{item.link}" style="display: block; text-align: center; font-family: Helvetica, Arial, sans-serif; font-size: 11px; font-weight: bold; color: #ffffff; background-color: #2c3e50; text-decoration: none; padding: 8px 0; border-radius: 4px;">VIEW &rarr;</a>
-                        </td>
-                    </tr>
-                </table>
-            </td>
-            """
-        grid_html = f"""
-        <tr>
-            <td style="padding: 20px 0;">
-                <table width="100%" border="0" cellspacing="0" cellpadding="0">
-                    <tr>
-                        {grid_content}
-                    </tr>
-                </table>
-            </td>
-        </tr>
-        """
-
-    # 4. Build Hero HTML
-    hero_html = ""
-    if hero_item:
-        hero_img_src = hero_item.image if hero_item.image else "https://via.placeholder.com/600x400?text=Top+Match"
-        hero_price = hero_item.price if hero_item.price else "View Deal"
-        
-        hero_html = f"""
-        <tr>
-            <td align="center" style="padding: 0 0 20px 0;">
-                <a href="{hero_item.link}" style="text-decoration: none;">
-                    <img src="{hero_img_src}" width="600" style="display: block; width: 100%; max-width: 600px; border-radius: 8px; object-fit: contain; max-height: 400px;" alt="{hero_item.title}">
-                </a>
-            </td>
-        </tr>
-        <tr>
-            <td align="center" style="padding: 10px 0 30px 0; border-bottom: 1px solid #f1f5f9;">
-                <h2 style="font-family: Helvetica, Arial, sans-serif; font-size: 24px; font-weight: bold; color: #0f172a; margin: 0 0 10px 0;">{hero_item.title}</h2>
-                <p style="font-family: Helvetica, Arial, sans-serif; font-size: 18px; color: #23F0C7; font-weight: bold; margin: 0 0 20px 0;">{hero_price}</p>
-                <a href="{hero_item.link}" style="background-color: #0f172a; color: #ffffff; padding: 14px 35px; font-family: Helvetica, Arial, sans-serif; font-size: 14px; font-weight: bold; text-decoration: none; border-radius: 50px; display: inline-block;">VIEW DEAL</a>
-            </td>
-        </tr>
-        """
-
-    # 5. Full Template Assembly
-    html_content = f"""
-    <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
-    <html xmlns="http://www.w3.org/1999/xhtml">
-    <head>
-        <meta http-equiv="Content-Type" content="text/html; charset=UTF-8" />
-        <meta name="viewport" content="width=device-width, initial-scale=1.0"/>
-        <title>Ventiko Results</title>
-    </head>
-    <body style="margin: 0; padding: 0; background-color: #f1f5f9;">
-        <table border="0" cellpadding="0" cellspacing="0" width="100%">
-            <tr>
-                <td style="padding: 20px 0 40px 0;" align="center">
-                    <table border="0" cellpadding="0" cellspacing="0" width="600" style="background-color: #ffffff; border-radius: 16px; overflow: hidden; box-shadow: 0 10px 25px rgba(0,0,0,0.05);">
-                        
-                        <tr>
-                            <td align="center" style="padding: 30px 0 10px 0;">
-                                <a href="https://ventiko.app" style="text-decoration: none;">
-                                    <img src="{LOGO_URL}" alt="VENTIKO" width="280" style="display: block; border: 0; max-width: 100%;">
-                                </a>
-                                <p style="margin: 5px 0 0 0; font-family: 'Courier New', monospace; font-size: 11px; color: #94a3b8; text-transform: uppercase; letter-spacing: 2px;">
-                                    AI Product Finder
-                                </p>
-                            </td>
-                        </tr>
-
-                        <tr>
-                            <td align="center" style="padding: 20px 0 30px 0;">
-                                <span style="font-family: Helvetica, Arial, sans-serif; background-color: #ecfdf5; color: #065f46; padding: 8px 20px; border-radius: 50px; font-size: 14px; font-weight: bold; border: 1px solid #23F0C7;">
-                                    "{data.query}"
-                                </span>
-                            </td>
-                        </tr>
-
-                        {hero_html}
-
-                        {grid_html}
-
-                        <tr>
-                            <td bgcolor="#0f172a" style="padding: 40px 30px; text-align: center;">
-                                <p style="color: #64748b; font-family: Helvetica, Arial, sans-serif; font-size: 12px; line-height: 18px; margin: 0;">
-                                    &copy; {datetime.datetime.now().year} Ventiko Ltd.<br/>
-                                    Isle of Man, United Kingdom
-                                </p>
-                                <p style="margin-top: 15px;">
-                                    <a href="https://ventiko.app" style="color: #475569; font-family: Helvetica, Arial, sans-serif; font-size: 11px; text-decoration: none;">Home</a>
-                                    <span style="color: #475569;">&nbsp;|&nbsp;</span>
-                                    <a href="mailto:support@ventiko.app" style="color: #475569; font-family: Helvetica, Arial, sans-serif; font-size: 11px; text-decoration: none;">Contact</a>
-                                    <span style="color: #475569;">&nbsp;|&nbsp;</span>
-                                    <a href="{unsubscribe_link}" style="color: #475569; font-family: Helvetica, Arial, sans-serif; font-size: 11px; text-decoration: underline;">Unsubscribe</a>
-                                </p>
-                            </td>
-                        </tr>
-
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
+# --- ADMIN ENDPOINTS ---
+@app.get("/admin-data", dependencies=[Depends(require_admin)])
+def get_admin_data(limit: int = 50, leads_cursor: Optional[str] = None, clicks_cursor: Optional[str] = None,
+                   session: Session = Depends(get_read_session)):
+    leads, next_leads = keyset_page(session, UserLead, limit, leads_cursor)
+    clicks, next_clicks = keyset_page(session, ClickLog, limit, clicks_cursor)
 
-    try:
-        resend.Emails.send({
-            "from": "Ventiko Engine <noreply@results.ventiko.app>",
-            "to": data.email,
-            "subject": f"Your Results: {data.query}",
-            "html": html_content
-        })
-        return {"status": "success", "message": "Sent."}
-    except Exception as e:
-        print(f"!!! EMAIL ERROR: {e}")
-        return {"status": "partial_success", "message": "Saved, but email failed."}
-
-# --- ADMIN ENDPOINT ---
-@app.get("/admin-data")
-def get_admin_data(x_admin_secret: str = Header(None), session: Session = Depends(get_session)):
-    env_secret = os.getenv("ADMIN_SECRET", "ventiko_admin_2026")
-    if x_admin_secret != env_secret:
-        raise HTTPException(status_code=401, detail="Unauthorized Access")
-
-    leads = session.exec(select(UserLead).order_by(UserLead.timestamp.desc())).all()
-    clicks = session.exec(select(ClickLog).order_by(ClickLog.timestamp.desc())).all()
-    
     return {
         "leads": leads,
         "clicks": clicks,
         "stats": {
-            "total_leads": len(leads),
-            "total_clicks": len(clicks)
+            "total_leads": count_rows(session, UserLead),
+            "total_clicks": total_clicks(session), # Rollups + raw rows since the last rollup
+            "top_queries": top_queries(session),
+            "top_products": top_products(session)
+        },
+        "next_cursors": {
+            "leads": next_leads,
+            "clicks": next_clicks
         }
-    }
\ No newline at end of file
+    }
+
+@app.get("/admin-data/export", dependencies=[Depends(require_admin)])
+def export_admin_data(table: str = "leads", format: str = "ndjson"):
+    models = {"leads": UserLead, "clicks": ClickLog}
+    if table not in models or format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="table must be leads or clicks, format ndjson or csv")
+    return StreamingResponse(stream_export(read_engine, models[table], format), media_type=EXPORT_MEDIA_TYPES[format])
+
+@app.get("/cache-stats", dependencies=[Depends(require_admin)])
+def get_cache_stats():
+    return {
+        "embeddings": resources.embedding_cache.stats(),
+        "results": resources.result_cache.stats(),
+        "batch_encoder": resources.batch_encoder.stats(),
+        "lexical_index": resources.lexical_index.stats(),
+        "log_writer": log_writer.stats(),
+        "email_outbox": email_outbox.stats(),
+        "db_pools": pool_stats()
+    }
+
+@app.post("/cache-purge", dependencies=[Depends(require_admin)])
+def purge_cache():
+    # Every worker's query caches drop their entries when the cache generation moves; clear() only reaches
+    # this one. The index generation is left alone, so no worker remaps its index or reloads BM25.
+    generation = bump_cache_generation()
+    purged = resources.result_cache.clear()
+    resources.embedding_cache.clear()
+    log_event(logger, "cache_purged", results_purged=purged, generation=generation)
+    return {"status": "purged", "results_purged": purged, "generation": generation}
+
+# --- METRICS ---
+def collect_gauges():
+    """Point-in-time gauges from the components' own stats(); only loaded components are read."""
+    gauges = {}
+    caches = [("embeddings", "embedding_cache"), ("results", "result_cache")]
+    for label, name in caches:
+        if resources.is_loaded(name):
+            gauges.setdefault("cache_size", []).append(({"cache": label}, getattr(resources, name).stats()["size"]))
+    if resources.is_loaded("batch_encoder"):
+        stats = resources.batch_encoder.stats()
+        gauges["queue_depth"] = [({"queue": "batch_encoder"}, stats["queue_depth"])]
+        gauges["batch_encoder_avg_batch_size"] = stats["avg_batch_size"]
+    gauges.setdefault("queue_depth", []).append(({"queue": "log_writer"}, log_writer.stats()["queue_depth"]))
+    if resources.is_loaded("lexical_index"):
+        gauges["lexical_documents"] = resources.lexical_index.stats()["documents"]
+    for pool, stats in pool_stats().items():
+        for key in ("checkedout", "checkedin", "overflow", "avg_held_ms", "max_held_ms"):
+            if key in stats:
+                gauges.setdefault(f"db_pool_{key}", []).append(({"pool": pool}, stats[key]))
+    return gauges
+
+def collect_counters():
+    """Cumulative totals from the same stats(), exported as counters so rate() works across restarts."""
+    counters = {}
+    caches = [("embeddings", "embedding_cache"), ("results", "result_cache")]
+    for label, name in caches:
+        if resources.is_loaded(name):
+            stats = getattr(resources, name).stats()
+            for key in ("hits", "misses", "evictions"):
+                if key in stats:
+                    counters.setdefault(f"cache_{key}_total", []).append(({"cache": label}, stats[key]))
+    if resources.is_loaded("batch_encoder"):
+        stats = resources.batch_encoder.stats()
+        for key in ("rejected", "batches", "texts"):
+            counters[f"batch_encoder_{key}_total"] = stats[key]
+    stats = log_writer.stats()
+    for key in ("dropped", "written", "failed"):
+        counters[f"log_writer_{key}_total"] = stats[key]
+    for pool, stats in pool_stats().items():
+        for key in ("checkouts", "invalidations"):
+            counters.setdefault(f"db_pool_{key}_total", []).append(({"pool": pool}, stats[key]))
+    return counters
+
+def collect_outbox():
+    stats = email_outbox.stats() # One GROUP BY on the outbox table
+    return {"email_outbox": [({"status": s}, stats[key]) for s, key in
+                             (("pending", "pending"), ("sent", "sent_total"), ("failed", "failed_total"))]}
+
+metrics.register_collector(collect_gauges)
+metrics.register_collector(collect_counters, kind="counter")
+metrics.register_collector(collect_outbox)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text format for this worker: stage/request histograms, caches, queues and DB pools."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
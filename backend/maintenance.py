@@ -0,0 +1,192 @@
+import os
+import argparse
+import datetime
+from collections import Counter
+from dotenv import load_dotenv
+from sqlalchemy import func, delete
+from sqlmodel import Session, select
+
+from models import SearchLog, ClickLog, DailyQueryStat, DailyProductStat, EmailOutbox
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+RAW_LOG_RETENTION_DAYS = int(os.getenv("RAW_LOG_RETENTION_DAYS", "90"))
+# Rows removed per DELETE; each batch commits on its own so locks and WAL stay small
+PRUNE_BATCH_SIZE = int(os.getenv("PRUNE_BATCH_SIZE", "5000"))
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def _day_bounds(day):
+    start = datetime.datetime.combine(day, datetime.time.min)
+    return start, start + datetime.timedelta(days=1)
+
+
+def rolled_up_until(session: Session):
+    """First day NOT yet covered by the rollups (None if nothing was ever rolled up)."""
+    last_day = session.exec(select(func.max(DailyQueryStat.day))).one()
+    last_product_day = session.exec(select(func.max(DailyProductStat.day))).one()
+    days = [d for d in (last_day, last_product_day) if d is not None]
+    if not days:
+        return None
+    return max(_as_date(d) for d in days) + datetime.timedelta(days=1)
+
+def _as_date(value):
+    # SQLite hands dates back as strings from aggregate functions
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def rollup_day(session: Session, day):
+    """Recomputes one day's per-query and per-product counts (idempotent)."""
+    start, end = _day_bounds(day)
+
+    searches = Counter()
+    for query, count in session.exec(
+        select(SearchLog.query, func.count()).where(SearchLog.timestamp >= start, SearchLog.timestamp < end)
+        .group_by(SearchLog.query)
+    ):
+        searches[_normalize_query(query)] += count
+
+    query_clicks = Counter()
+    product_clicks = Counter()
+    for query, title, count in session.exec(
+        select(ClickLog.query, ClickLog.product_title, func.count())
+        .where(ClickLog.timestamp >= start, ClickLog.timestamp < end)
+        .group_by(ClickLog.query, ClickLog.product_title)
+    ):
+        query_clicks[_normalize_query(query)] += count
+        product_clicks[title] += count
+
+    session.execute(delete(DailyQueryStat).where(DailyQueryStat.day == day))
+    session.execute(delete(DailyProductStat).where(DailyProductStat.day == day))
+    for query in set(searches) | set(query_clicks):
+        session.add(DailyQueryStat(day=day, query=query, searches=searches[query], clicks=query_clicks[query]))
+    for title, count in product_clicks.items():
+        session.add(DailyProductStat(day=day, product_title=title, clicks=count))
+    return len(searches) + len(product_clicks)
+
+
+def run_rollup(engine, start_day=None):
+    """
+    Rolls up every complete day (UTC, before today) not yet covered.
+    Today is left to the raw tables because it is still being written.
+    """
+    today = datetime.datetime.utcnow().date()
+    with Session(engine) as session:
+        if start_day is None:
+            start_day = rolled_up_until(session)
+        if start_day is None:
+            oldest = session.exec(select(func.min(SearchLog.timestamp))).one()
+            oldest_click = session.exec(select(func.min(ClickLog.timestamp))).one()
+            candidates = [_as_datetime(t).date() for t in (oldest, oldest_click) if t is not None]
+            start_day = min(candidates) if candidates else today
+
+        day = start_day
+        rolled = 0
+        while day < today:
+            rollup_day(session, day)
+            session.commit() # One transaction per day keeps locks short
+            rolled += 1
+            day += datetime.timedelta(days=1)
+    print(f" -> ROLLUP: {rolled} day(s) aggregated from {start_day}")
+    return rolled
+
+def _as_datetime(value):
+    return datetime.datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _delete_in_batches(engine, model, *conditions, batch_size=PRUNE_BATCH_SIZE):
+    """Deletes matching rows batch_size ids at a time, one transaction per batch; returns the count."""
+    removed = 0
+    while True:
+        with Session(engine) as session:
+            ids = session.exec(select(model.id).where(*conditions).order_by(model.id).limit(batch_size)).all()
+            if not ids:
+                return removed
+            removed += session.execute(delete(model).where(model.id.in_(ids))).rowcount
+            session.commit()
+        if len(ids) < batch_size:
+            return removed
+
+def prune_raw_logs(engine, retention_days=RAW_LOG_RETENTION_DAYS, batch_size=PRUNE_BATCH_SIZE):
+    """Deletes raw SearchLog/ClickLog rows past the retention window, but never rows not yet rolled up."""
+    with Session(engine) as session:
+        watermark = rolled_up_until(session)
+    if watermark is None:
+        print(" -> PRUNE: nothing rolled up yet, keeping all raw rows")
+        return 0
+    cutoff_day = min(watermark, datetime.datetime.utcnow().date() - datetime.timedelta(days=retention_days))
+    cutoff = datetime.datetime.combine(cutoff_day, datetime.time.min)
+    removed = 0
+    for model in (SearchLog, ClickLog):
+        removed += _delete_in_batches(engine, model, model.timestamp < cutoff, batch_size=batch_size)
+    print(f" -> PRUNE: removed {removed} raw rows older than {cutoff_day}")
+    return removed
+
+def prune_sent_emails(engine, retention_days=RAW_LOG_RETENTION_DAYS, batch_size=PRUNE_BATCH_SIZE):
+    """Drops delivered outbox rows past the retention window (failed rows are kept for inspection)."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=retention_days)
+    removed = _delete_in_batches(engine, EmailOutbox, EmailOutbox.status == "sent", EmailOutbox.timestamp < cutoff,
+                                 batch_size=batch_size)
+    print(f" -> PRUNE: removed {removed} sent emails older than {cutoff.date()}")
+    return removed
+
+
+# --- READ SIDE (used by /admin-data) ---
+
+def total_clicks(session: Session) -> int:
+    """Rolled-up clicks plus raw clicks since the rollup watermark; correct even after pruning."""
+    watermark = rolled_up_until(session)
+    raw = select(func.count()).select_from(ClickLog)
+    if watermark is None:
+        return session.exec(raw).one()
+    rolled = session.exec(select(func.coalesce(func.sum(DailyProductStat.clicks), 0))).one()
+    since = datetime.datetime.combine(watermark, datetime.time.min)
+    return rolled + session.exec(raw.where(ClickLog.timestamp >= since)).one()
+
+def top_queries(session: Session, days=30, limit=10):
+    since = datetime.datetime.utcnow().date() - datetime.timedelta(days=days)
+    rows = session.exec(
+        select(DailyQueryStat.query, func.sum(DailyQueryStat.searches), func.sum(DailyQueryStat.clicks))
+        .where(DailyQueryStat.day >= since)
+        .group_by(DailyQueryStat.query)
+        .order_by(func.sum(DailyQueryStat.searches).desc())
+        .limit(limit)
+    ).all()
+    return [{"query": q, "searches": s, "clicks": c} for q, s, c in rows]
+
+def top_products(session: Session, days=30, limit=10):
+    since = datetime.datetime.utcnow().date() - datetime.timedelta(days=days)
+    rows = session.exec(
+        select(DailyProductStat.product_title, func.sum(DailyProductStat.clicks))
+        .where(DailyProductStat.day >= since)
+        .group_by(DailyProductStat.product_title)
+        .order_by(func.sum(DailyProductStat.clicks).desc())
+        .limit(limit)
+    ).all()
+    return [{"product_title": t, "clicks": c} for t, c in rows]
+
+
+if __name__ == "__main__":
+    from database import build_maintenance_engine, create_db_and_tables, ensure_indexes
+
+    parser = argparse.ArgumentParser(description="Log rollups, retention and index maintenance (run from cron).")
+    parser.add_argument("task", choices=["indexes", "rollup", "prune", "all"])
+    parser.add_argument("--retention-days", type=int, default=RAW_LOG_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=PRUNE_BATCH_SIZE, help="Rows deleted per transaction")
+    parser.add_argument("--since", type=datetime.date.fromisoformat, default=None,
+                        help="Re-roll from this day (YYYY-MM-DD) instead of the watermark")
+    args = parser.parse_args()
+    engine = build_maintenance_engine() # No request-path statement_timeout: a day's rollup can take a while
+
+    if args.task in ("indexes", "all"):
+        create_db_and_tables() # Also creates the rollup tables
+        created = ensure_indexes(engine) # Not done at startup: a concurrent build can take minutes
+        print(f" -> INDEXES: created {', '.join(created) or 'none'}")
+    if args.task in ("rollup", "all"):
+        run_rollup(engine, args.since)
+    if args.task in ("prune", "all"):
+        prune_raw_logs(engine, args.retention_days, args.batch_size)
+        prune_sent_emails(engine, args.retention_days, args.batch_size)
@@ -0,0 +1,65 @@
+import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel, Index
+
+# --- DATABASE TABLES ---
+# Kept free of any model/index imports so migrations and scripts can use them cheaply.
+
+# Every log table is read newest-first and paged on (timestamp, id), hence the composite
+# (timestamp, id) indexes; they also serve the rollup and retention range scans on timestamp
+
+class SearchLog(SQLModel, table=True):
+    __table_args__ = (Index("ix_searchlog_timestamp_id", "timestamp", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    query: str = Field(index=True)
+    timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    results_summary: str 
+
+class UserLead(SQLModel, table=True):
+    __table_args__ = (Index("ix_userlead_timestamp_id", "timestamp", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    email: str = Field(index=True) # /unsubscribe filters on it
+    query: str
+    results_summary: str
+    opt_in: bool = Field(default=False)
+    timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+
+class ClickLog(SQLModel, table=True):
+    __table_args__ = (Index("ix_clicklog_timestamp_id", "timestamp", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    product_title: str
+    query: str = Field(index=True)
+    link_clicked: str
+    timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+
+# --- ROLLUP TABLES ---
+# Filled by maintenance.py from the raw logs; raw rows older than the retention window are pruned.
+
+class DailyQueryStat(SQLModel, table=True):
+    day: datetime.date = Field(primary_key=True)
+    query: str = Field(primary_key=True) # Lowercased, whitespace-collapsed
+    searches: int = Field(default=0)
+    clicks: int = Field(default=0)
+
+class DailyProductStat(SQLModel, table=True):
+    day: datetime.date = Field(primary_key=True)
+    product_title: str = Field(primary_key=True)
+    clicks: int = Field(default=0)
+
+# --- EMAIL OUTBOX ---
+# Written in the same transaction as the UserLead; email_outbox.py delivers it with retries.
+
+class EmailOutbox(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    to: str
+    subject: str
+    html: str
+    status: str = Field(default="pending", index=True) # pending | sent | failed
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow, index=True)
+    last_error: Optional[str] = None
+    timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow, index=True)
+    sent_at: Optional[datetime.datetime] = None
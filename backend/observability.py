@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import threading
+import logging.handlers
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Share of high-volume per-request events (search received, click tracked) that get logged
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# --- STRUCTURED LOGGING ---
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event and any extra fields."""
+
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+def configure_logging():
+    """
+    Routes the "ventiko" loggers through a QueueHandler, so request threads
+    only enqueue a record; a listener thread formats it and writes stdout.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        records = queue.Queue(-1)
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter())
+        listener = logging.handlers.QueueListener(records, stream, respect_handler_level=False)
+        listener.start()
+        atexit.register(listener.stop) # Flushes whatever is still queued
+
+        root = logging.getLogger("ventiko")
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(logging.handlers.QueueHandler(records))
+        root.propagate = False
+        _configured = True
+
+
+def get_logger(name):
+    configure_logging()
+    return logging.getLogger(f"ventiko.{name}")
+
+
+def log_event(logger, event, level=logging.INFO, sampled=False, **fields):
+    """Logs `event` with structured fields. sampled=True keeps only LOG_SAMPLE_RATE of them."""
+    if sampled and random.random() >= LOG_SAMPLE_RATE:
+        return
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+# --- METRICS ---
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in sorted(labels.items()))
+    return "{" + inner + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.label_names, key)))} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in seconds, labelled (e.g. by stage)."""
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {} # label key -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += seconds
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = dict(zip(self.label_names, key))
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {series[len(self.buckets)]}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {round(series[-1], 6)}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series[len(self.buckets)]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms updated on the hot path, plus collectors
+    (callbacks returning {name: value} or {name: [(labels, value), ...]})
+    that read existing stats() at scrape time, so idle metrics cost nothing.
+    A collector's samples are typed as gauges unless it is registered with
+    kind="counter" for cumulative totals.
+    """
+
+    def __init__(self, prefix="ventiko"):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, label_names=()):
+        metric = Counter(f"{self.prefix}_{name}", help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(f"{self.prefix}_{name}", help_text, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect, kind="gauge"):
+        if kind not in ("gauge", "counter"):
+            raise ValueError(f"Unknown collector kind '{kind}' (expected gauge or counter)")
+        self._collectors.append((collect, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect, kind in self._collectors:
+            try:
+                collected = collect()
+            except Exception as e: # A broken collector must not take /metrics down
+                lines.append(f"# collector error: {e}")
+                continue
+            for name, value in collected.items():
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full_name} {kind}")
+                samples = value if isinstance(value, list) else [({}, value)]
+                for labels, sample in samples:
+                    if isinstance(sample, bool):
+                        sample = int(sample)
+                    if isinstance(sample, (int, float)):
+                        lines.append(f"{full_name}{_format_labels(labels)} {sample}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry; every gunicorn worker exposes its own numbers
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram(
+    "stage_seconds", "Latency of each request stage (expand, encode, vector_query, lexical_rerank, db_log, email_send)",
+    ("stage",)
+)
+request_seconds = metrics.histogram("request_seconds", "End-to-end request latency by route", ("route", "method"))
+requests_total = metrics.counter("requests_total", "Requests by route and status code", ("route", "method", "status"))
@@ -0,0 +1,89 @@
+import io
+import csv
+import json
+import base64
+import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, func
+from sqlmodel import Session, select
+
+# --- CONFIGURATION ---
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_FETCH_SIZE = 1000 # Rows pulled per round-trip from the server-side cursor
+
+
+def encode_cursor(row) -> str:
+    raw = f"{row.timestamp.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str):
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def keyset_page(session: Session, model, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+    """
+    One page of `model` rows, newest first, ordered by (timestamp, id).
+    Seeks straight past the cursor instead of OFFSET-scanning, so page 1000
+    costs the same as page 1. Returns (rows, next_cursor or None).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    statement = select(model).order_by(model.timestamp.desc(), model.id.desc())
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        statement = statement.where(or_(
+            model.timestamp < timestamp,
+            and_(model.timestamp == timestamp, model.id < row_id)
+        ))
+    rows = session.exec(statement.limit(limit + 1)).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def count_rows(session: Session, model) -> int:
+    return session.exec(select(func.count()).select_from(model)).one()
+
+
+def stream_export(engine, model, fmt: str = "ndjson"):
+    """
+    Yields every `model` row as NDJSON lines or CSV text, newest first.
+    Rows come from a server-side cursor in EXPORT_FETCH_SIZE chunks, so memory
+    stays flat however large the table is. Opens its own session because the
+    request's session is closed before a streamed body is sent.
+    """
+    columns = list(model.model_fields.keys())
+    statement = select(model).order_by(model.timestamp.desc(), model.id.desc())
+    statement = statement.execution_options(stream_results=True, yield_per=EXPORT_FETCH_SIZE)
+
+    with Session(engine) as session:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for row in session.exec(statement):
+                writer.writerow([_plain(getattr(row, c)) for c in columns])
+                if buffer.tell() > 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            lines = []
+            for row in session.exec(statement):
+                lines.append(json.dumps({c: _plain(getattr(row, c)) for c in columns}))
+                if len(lines) >= 500:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
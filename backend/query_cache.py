@@ -0,0 +1,304 @@
+import os
+import time
+import logging
+import asyncio
+import sqlite3
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+
+from observability import get_logger, log_event
+
+load_dotenv()
+
+logger = get_logger("query_cache")
+
+# --- CONFIGURATION ---
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "86400")) # Seconds
+# Optional SQLite file shared by every gunicorn worker on the box (empty = memory only)
+QUERY_CACHE_DISK_PATH = os.getenv("QUERY_CACHE_DISK_PATH", "")
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600")) # Seconds
+# How often (seconds) to re-read the index and cache generations; keeps the file reads off most requests
+GENERATION_CHECK_INTERVAL = float(os.getenv("GENERATION_CHECK_INTERVAL", "5"))
+# Bumped by /cache-purge so every worker drops its cached embeddings and results, without touching the index
+CACHE_GENERATION_FILE = os.getenv("CACHE_GENERATION_FILE", "data/cache_generation")
+
+
+def normalize_key(text: str) -> str:
+    """Lowercases and collapses whitespace so trivially different queries share a key."""
+    return " ".join(text.lower().split())
+
+
+def read_generation(path) -> int:
+    """Returns the number in a generation file (0 if it was never bumped)."""
+    try:
+        with open(path, mode='r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def bump_generation(path) -> int:
+    """Increments a generation file (atomically replaced, so readers never see it half-written)."""
+    generation = read_generation(path) + 1
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", mode='w', encoding='utf-8') as f:
+        f.write(str(generation))
+    os.replace(path + ".tmp", path)
+    return generation
+
+def read_cache_generation():
+    return read_generation(CACHE_GENERATION_FILE)
+
+def bump_cache_generation():
+    """Invalidates every worker's query caches; each drops its entries on its next check."""
+    return bump_generation(CACHE_GENERATION_FILE)
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU + TTL cache of query embeddings, keyed on the encoder's name
+    plus the normalized expanded query. Misses fall through to an optional
+    on-disk tier before the model is called, so one worker's encode warms the
+    others; the model name in the key keeps a switch of ENCODER_BACKEND from
+    serving another model's vectors out of that shared file. With a
+    generation_source (read_cache_generation), the memory tier is dropped
+    when another worker purges the caches.
+    """
+
+    def __init__(self, model_name="", max_size=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL,
+                 disk_path=QUERY_CACHE_DISK_PATH, generation_source=None, check_interval=GENERATION_CHECK_INTERVAL):
+        self.model_name = model_name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.generation_source = generation_source
+        self.check_interval = check_interval
+        self._entries = OrderedDict() # key -> (expires_at, vector)
+        self._lock = threading.Lock()
+        self._generation = generation_source() if generation_source else None
+        self._checked_at = time.time()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS query_embeddings "
+                    "(key TEXT PRIMARY KEY, expires_at REAL, dim INTEGER, vector BLOB)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.disk_path, timeout=1.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _key(self, text):
+        return f"{self.model_name}\x1f{normalize_key(text)}"
+
+    def _sync_generation(self, now):
+        if self.generation_source is None or now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        generation = self.generation_source()
+        if generation != self._generation:
+            self._generation = generation
+            self._entries.clear()
+
+    def get(self, text):
+        key = self._key(text)
+        now = time.time()
+        with self._lock:
+            self._sync_generation(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        vector = self._disk_get(key, now)
+        with self._lock:
+            if vector is not None:
+                self.disk_hits += 1
+                self._store(key, vector, now)
+            else:
+                self.misses += 1
+        return vector
+
+    def put(self, text, vector):
+        key = self._key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        now = time.time()
+        with self._lock:
+            self._store(key, vector, now)
+        self._disk_put(key, vector, now)
+
+    def get_or_encode(self, text, encode):
+        """Returns the cached vector for text, calling encode(text) only on a miss."""
+        vector = self.get(text)
+        if vector is None:
+            vector = np.asarray(encode(text), dtype=np.float32)
+            self.put(text, vector)
+        return vector
+
+    async def get_or_encode_async(self, text, encode_async):
+        """Async twin of get_or_encode; the SQLite tier (if any) is read off the event loop."""
+        vector = await asyncio.to_thread(self.get, text) if self.disk_path else self.get(text)
+        if vector is None:
+            vector = np.asarray(await encode_async(text), dtype=np.float32)
+            if self.disk_path:
+                await asyncio.to_thread(self.put, text, vector)
+            else:
+                self.put(text, vector)
+        return vector
+
+    def _store(self, key, vector, now):
+        self._entries[key] = (now + self.ttl, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # --- SHARED DISK TIER ---
+    def _disk_get(self, key, now):
+        if not self.disk_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT expires_at, vector FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            log_event(logger, "disk_error", level=logging.ERROR, path=self.disk_path, error=str(e))
+            return None
+        if row is None or row[0] <= now:
+            return None
+        return np.frombuffer(row[1], dtype=np.float32)
+
+    def _disk_put(self, key, vector, now):
+        if not self.disk_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?, ?)",
+                    (key, now + self.ttl, vector.shape[0], vector.tobytes())
+                )
+        except sqlite3.Error as e:
+            log_event(logger, "disk_error", level=logging.ERROR, path=self.disk_path, error=str(e))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM query_embeddings")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "model": self.model_name,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_tier": bool(self.disk_path)
+            }
+
+
+class ResultCache:
+    """
+    Bounded LRU + TTL cache of final search payloads per normalized query.
+    Every entry belongs to a generation; when it moves (ingestion bumping the
+    index generation, or /cache-purge the cache generation) the whole cache
+    is dropped on the next lookup.
+    """
+
+    def __init__(self, generation_source, max_size=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL,
+                 check_interval=GENERATION_CHECK_INTERVAL):
+        self.generation_source = generation_source
+        self.max_size = max_size
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._entries = OrderedDict() # key -> (expires_at, payload)
+        self._lock = threading.Lock()
+        self._generation = generation_source()
+        self._checked_at = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _sync_generation(self, now):
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        generation = self.generation_source()
+        if generation != self._generation:
+            self._generation = generation
+            self._entries.clear()
+            self.invalidations += 1
+
+    def get(self, text):
+        key = normalize_key(text)
+        now = time.time()
+        with self._lock:
+            self._sync_generation(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, text, payload):
+        key = normalize_key(text)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            purged = len(self._entries)
+            self._entries.clear()
+            return purged
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
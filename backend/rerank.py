@@ -0,0 +1,77 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+from lexical import analyze
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Candidates this similar to a better-ranked one are dropped as near-duplicates
+DEDUP_COSINE = float(os.getenv("DEDUP_COSINE", "0.97"))
+DEDUP_TITLE_JACCARD = float(os.getenv("DEDUP_TITLE_JACCARD", "0.8"))
+# MMR trade-off: 1.0 ranks on relevance only, lower values favour variety
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+
+def _title_tokens(match):
+    return frozenset(analyze(match["metadata"].get("title", "")))
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def similarity_matrix(candidates, titles):
+    """
+    Pairwise similarity of candidates: cosine of their stored vectors where both
+    have one, title-token Jaccard otherwise (BM25-only hits carry no vector).
+    """
+    n = len(candidates)
+    sims = np.array([[_jaccard(titles[i], titles[j]) for j in range(n)] for i in range(n)], dtype=np.float32)
+
+    with_vectors = [i for i, c in enumerate(candidates) if c.get("values") is not None]
+    if len(with_vectors) > 1:
+        matrix = np.vstack([np.asarray(candidates[i]["values"], dtype=np.float32) for i in with_vectors])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        cosine = matrix @ matrix.T
+        sims[np.ix_(with_vectors, with_vectors)] = cosine
+    return sims
+
+
+def diversify(candidates, top_k, mmr_lambda=MMR_LAMBDA):
+    """
+    Collapses near-duplicates (same product under another merchant or id) and
+    then picks top_k with Maximal Marginal Relevance over "fused_score".
+    Candidates must be best-first; "values" is stripped from what is returned.
+    """
+    if not candidates:
+        return []
+    titles = [_title_tokens(c) for c in candidates]
+    sims = similarity_matrix(candidates, titles)
+
+    kept = []
+    for i in range(len(candidates)):
+        duplicate = any(
+            (candidates[i].get("values") is not None and candidates[j].get("values") is not None
+             and sims[i, j] >= DEDUP_COSINE)
+            or _jaccard(titles[i], titles[j]) >= DEDUP_TITLE_JACCARD
+            for j in kept
+        )
+        if not duplicate:
+            kept.append(i)
+
+    best = candidates[kept[0]]["fused_score"] or 1.0
+    relevance = {i: candidates[i]["fused_score"] / best for i in kept}
+    selected = []
+    remaining = list(kept)
+    while remaining and len(selected) < top_k:
+        def marginal(i):
+            redundancy = max((sims[i, j] for j in selected), default=0.0)
+            return mmr_lambda * relevance[i] - (1.0 - mmr_lambda) * redundancy
+        pick = max(remaining, key=marginal)
+        selected.append(pick)
+        remaining.remove(pick)
+
+    return [{k: v for k, v in candidates[i].items() if k != "values"} for i in selected]
@@ -0,0 +1,108 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+
+from vector_store import get_vector_store, read_index_generation
+from query_cache import EmbeddingCache, ResultCache, read_cache_generation
+from intent import IntentEmbeddings
+from lexical import LexicalIndex
+from batch_encoder import BatchEncoder
+from encoders import load_encoder
+from observability import get_logger, log_event
+
+load_dotenv()
+
+logger = get_logger("resources")
+
+# --- CONFIGURATION ---
+# PRELOAD_MODEL=true loads the encoder at import so `gunicorn --preload` shares it copy-on-write
+PRELOAD_MODEL = os.getenv("PRELOAD_MODEL", "false").lower() == "true"
+
+
+def result_generation():
+    """Cached /search payloads go stale on a new ingest (index generation) or a purge (cache generation)."""
+    return read_index_generation(), read_cache_generation()
+
+
+class Resources:
+    """
+    Heavy search dependencies, each built on first use and timed.
+    Nothing here is created at import, so importing main.py (or models.py)
+    stays cheap for tooling and tests.
+    """
+
+    def __init__(self):
+        self.timings_ms = {}
+        self._lock = threading.RLock()
+        self._values = {}
+
+    def _get(self, name, factory):
+        value = self._values.get(name)
+        if value is not None:
+            return value
+        with self._lock:
+            if name not in self._values:
+                started = time.perf_counter()
+                self._values[name] = factory()
+                self.timings_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+                log_event(logger, "resource_ready", resource=name, ms=self.timings_ms[name], pid=os.getpid())
+            return self._values[name]
+
+    @property
+    def model(self):
+        return self._get("model", load_encoder)
+
+    @property
+    def index(self):
+        # Follows the index generation like the result cache and BM25 segments, so a new ingest is served everywhere
+        return self._get("index", lambda: get_vector_store(generation_source=read_index_generation))
+
+    @property
+    def batch_encoder(self):
+        return self._get("batch_encoder", lambda: BatchEncoder(self.model.encode))
+
+    @property
+    def embedding_cache(self):
+        return self._get("embedding_cache", lambda: EmbeddingCache(model_name=self.model.name,
+                                                                   generation_source=read_cache_generation))
+
+    @property
+    def result_cache(self):
+        return self._get("result_cache", lambda: ResultCache(result_generation))
+
+    @property
+    def lexical_index(self):
+        return self._get("lexical_index", lambda: LexicalIndex(generation_source=read_index_generation))
+
+    @property
+    def intent_embeddings(self):
+        def build():
+            intent_embeddings = IntentEmbeddings(self.model.encode)
+            intent_embeddings.warm()
+            return intent_embeddings
+        return self._get("intent_embeddings", build)
+
+    def preload(self):
+        """
+        Master-process half of --preload: weights and index only. Nothing is
+        encoded here, because running the model before fork leaves OpenMP
+        thread pools that hang in the children.
+        """
+        self.model
+        self.index
+
+    def warm(self):
+        """Per-worker half: builds everything else so the first request isn't slow."""
+        self.preload()
+        self.embedding_cache
+        self.result_cache
+        self.batch_encoder
+        self.lexical_index
+        self.intent_embeddings
+
+    def is_loaded(self, name):
+        return name in self._values
+
+
+resources = Resources()
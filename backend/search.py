@@ -1,14 +1,12 @@
-import os
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
+from vector_store import get_vector_store
+from embedding_store import CachedEncoder
+from encoders import load_encoder
 
 # 1. Setup
 load_dotenv()
-api_key = os.getenv("PINECONE_API_KEY")
-pc = Pinecone(api_key=api_key)
-index = pc.Index("ventiko-index")
-model = SentenceTransformer('all-MiniLM-L6-v2')
+index = get_vector_store() # Pinecone or local, see VECTOR_BACKEND
+model = CachedEncoder(load_encoder())
 
 # 2. Define the User's Query
 query = "something to help me sleep"
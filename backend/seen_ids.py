@@ -0,0 +1,134 @@
+import os
+import math
+import sqlite3
+import hashlib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+SEEN_IDS_PATH = os.getenv("INGEST_SEEN_IDS_PATH", "data/ingest_seen.db")
+# The Bloom filter is sized once for this many ids (~1.2 MB per million at 1%); past it
+# the false-positive rate climbs, which costs extra SQLite lookups but never correctness
+SEEN_IDS_CAPACITY = int(os.getenv("INGEST_SEEN_IDS_CAPACITY", "5000000"))
+SEEN_IDS_ERROR_RATE = float(os.getenv("INGEST_SEEN_IDS_ERROR_RATE", "0.01"))
+SEEN_IDS_FLUSH_SIZE = 2000 # New ids buffered in memory per SQLite write
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (blake2b, double hashing)."""
+
+    def __init__(self, capacity=SEEN_IDS_CAPACITY, error_rate=SEEN_IDS_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.nbytes = len(self._bits)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def clear(self):
+        self._bits = bytearray(self.nbytes)
+
+
+class SeenIds:
+    """
+    The set of p_ids already read from a feed in the current run, in bounded memory.
+
+    A Bloom filter answers "definitely new" for almost every id without I/O;
+    only when it says "maybe seen" is the exact set in SQLite consulted, so a
+    false positive never drops a product. Each id is stored with the row it
+    came from, which lets an interrupted run roll the set back to its last
+    checkpoint and carry on.
+    """
+
+    def __init__(self, feed, path=SEEN_IDS_PATH, capacity=SEEN_IDS_CAPACITY,
+                 error_rate=SEEN_IDS_ERROR_RATE):
+        self.feed = feed
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Used by one parse thread at a time, so no lock; WAL lets feeds in other processes write alongside
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._pending = {} # p_id -> row, not yet written to SQLite
+        self.exact_checks = 0
+        self.false_positives = 0
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_ids ("
+                "feed TEXT NOT NULL, p_id TEXT NOT NULL, row INTEGER NOT NULL, "
+                "PRIMARY KEY (feed, p_id)) WITHOUT ROWID"
+            )
+
+    def add(self, p_id, row) -> bool:
+        """Records p_id; returns False if it was already seen this run."""
+        if p_id in self._bloom:
+            if p_id in self._pending:
+                return False
+            self.exact_checks += 1
+            found = self._conn.execute(
+                "SELECT 1 FROM seen_ids WHERE feed = ? AND p_id = ?", (self.feed, p_id)
+            ).fetchone()
+            if found:
+                return False
+            self.false_positives += 1
+        else:
+            self._bloom.add(p_id)
+        self._pending[p_id] = row
+        if len(self._pending) >= SEEN_IDS_FLUSH_SIZE:
+            self.flush()
+        return True
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_ids VALUES (?, ?, ?)",
+                [(self.feed, p_id, row) for p_id, row in self._pending.items()]
+            )
+        self._pending = {}
+
+    def reset(self):
+        """Forgets every id for this feed (start of a fresh run, or after a finished one)."""
+        self._pending = {}
+        self._bloom.clear()
+        with self._conn:
+            self._conn.execute("DELETE FROM seen_ids WHERE feed = ?", (self.feed,))
+
+    def rollback(self, row):
+        """Keeps only ids read before `row` and reloads them into the filter (resuming a run)."""
+        self._pending = {}
+        self._bloom.clear()
+        with self._conn:
+            self._conn.execute("DELETE FROM seen_ids WHERE feed = ? AND row >= ?", (self.feed, row))
+        cursor = self._conn.execute("SELECT p_id FROM seen_ids WHERE feed = ?", (self.feed,))
+        for (p_id,) in cursor:
+            self._bloom.add(p_id)
+
+    def stats(self):
+        return {
+            "bloom_bytes": self._bloom.nbytes,
+            "bloom_hashes": self._bloom.hashes,
+            "exact_checks": self.exact_checks,
+            "false_positives": self.false_positives
+        }
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,77 @@
+import time
+import asyncio
+import threading
+import numpy as np
+import pytest
+
+from batch_encoder import BatchEncoder, EncoderBusy
+
+
+class GatedEncoder:
+    """Records each batch; the first call blocks until released so later texts pile up behind it."""
+
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def encode(self, texts, batch_size=32):
+        self.batches.append(list(texts))
+        self.started.set()
+        self.release.wait(5)
+        return np.array([[float(text.split()[-1])] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def gated():
+    encoder = GatedEncoder()
+    yield encoder
+    encoder.release.set()
+
+
+def test_texts_queued_behind_a_batch_are_encoded_together(gated):
+    batcher = BatchEncoder(gated.encode, max_batch=32, max_wait_ms=50)
+    first = batcher.submit("text 0")
+    assert gated.started.wait(5)
+
+    results = {}
+    def call(i):
+        results[i] = batcher.encode(f"text {i}")
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(1, 6)]
+    for thread in threads:
+        thread.start()
+    while batcher.stats()["queue_depth"] < 5:
+        time.sleep(0.001)
+    gated.release.set()
+    for thread in threads:
+        thread.join(5)
+    batcher.stop()
+
+    assert first.result()[0] == 0.0
+    assert {i: vector[0] for i, vector in results.items()} == {i: float(i) for i in range(1, 6)} # Each its own
+    assert gated.batches[0] == ["text 0"]
+    assert sorted(gated.batches[1]) == [f"text {i}" for i in range(1, 6)] and len(gated.batches) == 2
+    assert batcher.stats()["avg_batch_size"] == 3.0
+
+
+def test_a_lone_request_does_not_wait_for_the_linger(gated):
+    gated.release.set()
+    batcher = BatchEncoder(gated.encode, max_wait_ms=2000)
+    started = time.perf_counter()
+    assert asyncio.run(batcher.encode_async("text 7"))[0] == 7.0
+    assert time.perf_counter() - started < 0.5
+    batcher.stop()
+
+
+def test_a_full_backlog_is_rejected_instead_of_queued(gated):
+    batcher = BatchEncoder(gated.encode, max_pending=2)
+    batcher.submit("text 0")
+    assert gated.started.wait(5) # The worker holds text 0; the queue itself is empty again
+    batcher.submit("text 1")
+    batcher.submit("text 2")
+    with pytest.raises(EncoderBusy):
+        batcher.submit("text 3")
+    assert batcher.stats()["rejected"] == 1
+    gated.release.set()
+    batcher.stop()
+    assert batcher.stats()["texts"] == 3
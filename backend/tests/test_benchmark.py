@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import threading
+import subprocess
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+
+import loadtest
+from benchmark import BENCH_QUERIES
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def server():
+    queries = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            queries.append(parse_qs(urlparse(self.path).query)["query"][0])
+            body = b'{"matches": []}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", queries
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_every_load_test_query_is_unique():
+    queries = [loadtest.unique_query(i) for i in range(len(BENCH_QUERIES) * 5)]
+    assert len(set(queries)) == len(queries)
+
+
+def test_drive_never_repeats_a_query_within_or_across_runs(server):
+    base_url, queries = server
+    first = loadtest.drive(base_url, "search", concurrency=4, total=20, warmup=3, first=0)
+    second = loadtest.drive(base_url, "search", concurrency=4, total=20, warmup=3, first=23)
+    assert first["statuses"] == {"200": 20} and second["latency"]["n"] == 20
+    assert len(queries) == 46 and len(set(queries)) == 46
+
+
+def test_run_load_gives_each_run_a_disjoint_range(monkeypatch):
+    ranges = []
+    def fake_drive(base_url, endpoint, concurrency, total, warmup=10, first=0):
+        ranges.append(set(range(first, first + total + warmup)))
+        return {}
+    monkeypatch.setattr(loadtest, "drive", fake_drive)
+    loadtest.run_load("http://unused", ["search", "track-click"], [1, 8], total=50, warmup=5)
+    assert len(ranges) == 4
+    assert sum(len(r) for r in ranges) == len(set().union(*ranges))
+
+
+def test_offline_benchmark_reports_every_stage(tmp_path):
+    script = (
+        "import json, benchmark\n"
+        f"report = benchmark.run_benchmarks(repeats=1, log_rows=20, workdir={str(tmp_path)!r})\n"
+        "print(json.dumps({'stages': report['search_stages'], 'writes': report['searchlog_writes']['log_writer']}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, capture_output=True, text=True,
+                            timeout=300)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    stages = report["stages"]
+    for stage in ("intent_expansion", "encode", "batch_encode", "intent_blend", "vector_query",
+                  "lexical_fuse_rerank", "end_to_end"):
+        assert stages[stage]["n"] == len(BENCH_QUERIES), stage
+    assert report["writes"]["written"] == 20 and report["writes"]["dropped"] == 0
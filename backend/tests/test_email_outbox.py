@@ -0,0 +1,100 @@
+import datetime
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import email_outbox
+from email_outbox import OutboxSender, enqueue_email, get_sender, StubSender
+from models import EmailOutbox
+
+
+class FakeSender:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def send(self, to, subject, html):
+        if self.fail:
+            raise RuntimeError("provider down")
+        self.sent.append(to)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+def enqueue(engine, *recipients):
+    with Session(engine) as session:
+        for to in recipients:
+            enqueue_email(session, to, "Your results", "<p>hi</p>")
+        session.commit()
+
+def rows(engine):
+    with Session(engine) as session:
+        return {row.to: row for row in session.exec(select(EmailOutbox)).all()}
+
+
+def test_due_messages_are_sent_once(engine):
+    enqueue(engine, "a@example.com", "b@example.com")
+    sender = FakeSender()
+    outbox = OutboxSender(engine, sender=sender)
+    assert outbox.process_due() == 2
+    assert outbox.process_due() == 0
+    assert sorted(sender.sent) == ["a@example.com", "b@example.com"]
+    assert {row.status for row in rows(engine).values()} == {"sent"}
+
+
+def test_a_claim_wins_once_and_leases_the_row(engine):
+    enqueue(engine, "a@example.com")
+    row = rows(engine)["a@example.com"]
+    first, second = OutboxSender(engine, sender=FakeSender()), OutboxSender(engine, sender=FakeSender())
+    assert first._claim(row.id, row.next_attempt_at) is not None
+    assert second._claim(row.id, row.next_attempt_at) is None # Lost the race
+    # While leased the row isn't due, so another worker's scan skips it
+    assert second.process_due() == 0
+    leased = rows(engine)["a@example.com"]
+    assert leased.status == "pending" and leased.attempts == 1
+    assert leased.next_attempt_at > datetime.datetime.utcnow()
+
+
+def test_failures_back_off_then_give_up(engine, monkeypatch):
+    monkeypatch.setattr(email_outbox, "backoff_seconds", lambda attempts: -1.0) # Due again at once
+    enqueue(engine, "a@example.com")
+    outbox = OutboxSender(engine, sender=FakeSender(fail=True), max_attempts=3)
+    for attempt in (1, 2):
+        assert outbox.process_due() == 1
+        row = rows(engine)["a@example.com"]
+        assert (row.status, row.attempts, row.last_error) == ("pending", attempt, "provider down")
+    assert outbox.process_due() == 1
+    assert rows(engine)["a@example.com"].status == "failed"
+    assert outbox.process_due() == 0
+    assert (outbox.retried, outbox.failed) == (2, 1)
+
+
+def test_sender_is_never_stubbed_implicitly(monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_SENDER", "")
+    monkeypatch.delenv("RESEND_API_KEY", raising=False)
+    with pytest.raises(RuntimeError):
+        get_sender()
+    assert isinstance(get_sender("stub"), StubSender)
+    with pytest.raises(ValueError):
+        get_sender("carrier-pigeon")
+
+
+def test_sender_is_built_at_start_not_construction(engine, monkeypatch, tmp_path):
+    monkeypatch.setattr(email_outbox, "EMAIL_SENDER", "")
+    monkeypatch.delenv("RESEND_API_KEY", raising=False)
+    outbox = OutboxSender(engine) # What importing main does
+    assert outbox.stats()["sender"] is None
+    with pytest.raises(RuntimeError):
+        outbox.start()
+    assert outbox._thread is None
+
+    monkeypatch.setattr(email_outbox, "EMAIL_SENDER", "stub")
+    monkeypatch.chdir(tmp_path) # The stub writes under data/
+    outbox.start()
+    try:
+        assert outbox.stats()["sender"] == "StubSender"
+    finally:
+        outbox.stop()
@@ -0,0 +1,59 @@
+import time
+import numpy as np
+
+from query_cache import EmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, text):
+        self.calls.append(text)
+        return np.full(4, len(self.calls), dtype=np.float32)
+
+
+def test_normalized_queries_share_one_encode():
+    cache = EmbeddingCache(max_size=8, ttl=60, disk_path="")
+    encoder = CountingEncoder()
+    first = cache.get_or_encode("Magnesium  for SLEEP", encoder.encode)
+    second = cache.get_or_encode("magnesium for sleep ", encoder.encode)
+    assert encoder.calls == ["Magnesium  for SLEEP"]
+    np.testing.assert_array_equal(first, second)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = EmbeddingCache(max_size=2, ttl=60, disk_path="")
+    cache.put("a", np.ones(4))
+    cache.put("b", np.ones(4))
+    assert cache.get("a") is not None # a is now the most recent
+    cache.put("c", np.ones(4))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    cache = EmbeddingCache(max_size=8, ttl=0.05, disk_path="")
+    cache.put("hyrox", np.ones(4))
+    assert cache.get("hyrox") is not None
+    time.sleep(0.1)
+    assert cache.get("hyrox") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_disk_tier_warms_another_worker(tmp_path):
+    path = str(tmp_path / "query_cache.db")
+    first, second = EmbeddingCache(ttl=60, disk_path=path), EmbeddingCache(ttl=60, disk_path=path)
+    first.put("blue light glasses", np.arange(4, dtype=np.float32))
+
+    encoder = CountingEncoder()
+    vector = second.get_or_encode("Blue light glasses", encoder.encode)
+    assert encoder.calls == [] # Served from the shared file, not the model
+    np.testing.assert_array_equal(vector, np.arange(4, dtype=np.float32))
+    assert second.stats()["disk_hits"] == 1
+
+    second.clear()
+    assert first.get("blue light glasses") is not None # Its own memory tier survives
+    assert EmbeddingCache(ttl=60, disk_path=path).get("blue light glasses") is None
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import types
+import multiprocessing as mp
+import numpy as np
+import pytest
+
+import encoders
+from encoders import load_encoder, HashingEncoder
+from encoder_parity import _wait_for_result
+from embedding_store import CachedEncoder
+
+
+class FakeSentenceTransformer:
+    def __init__(self, name, device=None):
+        self.name = name
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        return np.ones((len(sentences), 4), dtype=np.float32)
+
+
+@pytest.fixture
+def fake_sentence_transformers(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers",
+                        types.SimpleNamespace(SentenceTransformer=FakeSentenceTransformer))
+
+
+def test_the_reference_backend_keeps_the_bare_model_name(fake_sentence_transformers):
+    # Embeddings stored under the bare name before backends were selectable must still be found
+    encoder = load_encoder("torch")
+    assert encoder.name == encoders.MODEL_NAME
+    assert CachedEncoder(encoder, store=object()).model_name == encoders.MODEL_NAME
+
+
+def test_hashing_encoder_is_deterministic_and_unit_length():
+    encoder = HashingEncoder(dim=32)
+    first, second = encoder.encode(["yoga mat", "yoga mat"])
+    np.testing.assert_array_equal(first, second)
+    assert np.linalg.norm(first) == pytest.approx(1.0)
+    assert encoder.encode("yoga mat").shape == (32,)
+    with pytest.raises(ValueError):
+        load_encoder("tensorflow")
+
+
+@pytest.fixture
+def ctx():
+    return mp.get_context("fork")
+
+
+def test_parity_result_is_returned(ctx):
+    result_q = ctx.Queue()
+    proc = ctx.Process(target=result_q.put, args=({"backend": "onnx", "load_seconds": 1.0},))
+    proc.start()
+    assert _wait_for_result(proc, result_q, "onnx", timeout=30) == {"backend": "onnx", "load_seconds": 1.0}
+    proc.join()
+
+
+def test_a_backend_that_dies_without_a_result_fails_fast(ctx):
+    result_q = ctx.Queue()
+    proc = ctx.Process(target=os._exit, args=(3,)) # Like an OOM kill: no except block runs
+    proc.start()
+    started = time.monotonic()
+    result = _wait_for_result(proc, result_q, "onnx-int8", timeout=60)
+    assert result == {"backend": "onnx-int8", "error": "process exited with code 3 and no result"}
+    assert time.monotonic() - started < 10
+
+
+def test_a_hung_backend_is_terminated_at_the_timeout(ctx):
+    result_q = ctx.Queue()
+    proc = ctx.Process(target=time.sleep, args=(60,))
+    proc.start()
+    result = _wait_for_result(proc, result_q, "quantized", timeout=1)
+    proc.join(timeout=5)
+    assert result == {"backend": "quantized", "error": "no result after 1s"}
+    assert not proc.is_alive()
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from filters import build_filter, MetadataBitmaps
+from lexical import LexicalIndexBuilder, LexicalIndex
+from vector_store import LocalVectorStore
+
+CATALOGUE = [
+    ("a", {"title": "Magnesium Glycinate", "merchant": "Holland", "category": "Supplements", "price": 12.0}),
+    ("b", {"title": "Magnesium Spray", "merchant": "Boots", "category": "Supplements", "price": 25.0}),
+    ("c", {"title": "Magnesium Bath Flakes", "merchant": "Boots", "category": "Bath", "price": 8.5}),
+    ("d", {"title": "Magnesium Gummies", "merchant": "Holland", "category": "Supplements", "price": "GBP 9"})
+]
+
+
+def test_build_filter_from_search_params():
+    assert build_filter() is None
+    assert build_filter(min_price=10, merchants=["Boots", "Boots", "Holland"]) == {
+        "price": {"$gte": 10.0}, "merchant": {"$in": ["Boots", "Holland"]}
+    }
+    assert build_filter(max_price=20, categories=["Bath"]) == {"price": {"$lte": 20.0}, "category": {"$in": ["Bath"]}}
+
+
+def test_bitmaps_and_fields_together():
+    bitmaps = MetadataBitmaps([meta for _, meta in CATALOGUE])
+    assert bitmaps.mask(None) is None
+    assert bitmaps.mask({"merchant": {"$in": ["Boots"]}}).tolist() == [False, True, True, False]
+    assert bitmaps.mask({"merchant": "Holland", "price": {"$lte": 20}}).tolist() == [True, False, False, False]
+    # An unparseable price never satisfies a range
+    assert bitmaps.mask({"price": {"$gte": 0}}).tolist() == [True, True, True, False]
+    assert not bitmaps.mask({"merchant": {"$in": ["Nobody"]}}).any()
+    with pytest.raises(ValueError):
+        bitmaps.mask({"colour": "red"})
+
+
+def test_vector_query_ranks_only_rows_that_pass_the_filter(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    vectors = {"a": [1, 0, 0], "b": [0.9, 0.1, 0], "c": [0, 1, 0], "d": [0.95, 0, 0.05]}
+    store.upsert([(p_id, np.asarray(vectors[p_id], dtype=np.float32), meta) for p_id, meta in CATALOGUE])
+    store.flush()
+    query = np.asarray([1, 0, 0], dtype=np.float32)
+
+    assert [m["id"] for m in store.query(query, top_k=2)["matches"]] == ["a", "d"]
+    boots = store.query(query, top_k=2, filter={"merchant": {"$in": ["Boots"]}})["matches"]
+    assert [m["id"] for m in boots] == ["b", "c"] # Filled to top_k from the filtered rows, not post-filtered
+    assert store.query(query, top_k=2, filter={"price": {"$gt": 100}})["matches"] == []
+
+
+def test_lexical_search_applies_the_same_filter(tmp_path):
+    builder = LexicalIndexBuilder("feed.csv", str(tmp_path))
+    for p_id, meta in CATALOGUE:
+        builder.add(p_id, meta["title"], "", meta["category"], meta)
+    builder.save()
+    index = LexicalIndex(str(tmp_path))
+
+    assert len(index.search("magnesium")["matches"]) == 4
+    cheap = index.search("magnesium", filter={"price": {"$lt": 10}})["matches"]
+    assert [m["id"] for m in cheap] == ["c"]
+    assert {m["id"] for m in index.search("magnesium", filter={"category": {"$in": ["Supplements"]}})["matches"]} == {
+        "a", "b", "d"}
@@ -0,0 +1,95 @@
+import csv
+import numpy as np
+import pytest
+
+from ingest_awin import run_ingestion
+from ingest_manifest import IngestManifest
+from vector_store import VectorStore
+
+COLUMNS = ["aw_product_id", "product_name", "merchant_name", "description", "merchant_category",
+           "search_price", "aw_deep_link"]
+
+
+class RecordingIndex(VectorStore):
+    def __init__(self):
+        super().__init__()
+        self.upserted = []
+        self.updated = []
+        self.deleted = []
+
+    def upsert(self, vectors):
+        self.upserted.extend(p_id for p_id, _, _ in vectors)
+
+    def update_metadata(self, items):
+        self.updated.extend(p_id for p_id, _ in items)
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+
+
+class FakeModel:
+    def encode(self, sentences, batch_size=32, **kwargs):
+        return np.ones((len(sentences), 8), dtype=np.float32)
+
+
+def product(p_id, name, description="A product.", price="9.99"):
+    return {"aw_product_id": p_id, "product_name": name, "merchant_name": "Shop", "description": description,
+            "merchant_category": "Health", "search_price": price, "aw_deep_link": f"https://shop.test/{p_id}"}
+
+def write_feed(path, rows):
+    with open(path, mode='w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def feed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # Default BM25, dedup and generation files land under data/ here
+    return str(tmp_path / "feed.csv"), str(tmp_path / "manifest.db")
+
+def ingest(feed, rows):
+    csv_file, manifest_path = feed
+    write_feed(csv_file, rows)
+    index = RecordingIndex()
+    stats = run_ingestion(csv_file, index=index, model=FakeModel(), upsert_workers=1,
+                          manifest=IngestManifest("feed.csv", manifest_path))
+    return index, stats
+
+
+def test_unchanged_rows_are_not_re_embedded(feed):
+    rows = [product("1", "Magnesium"), product("2", "Sleep Mask"), product("3", "Neck Pillow")]
+    first, _ = ingest(feed, rows)
+    assert sorted(first.upserted) == ["Shop-1", "Shop-2", "Shop-3"]
+
+    second, stats = ingest(feed, rows)
+    assert (second.upserted, second.updated, second.deleted) == ([], [], [])
+    assert stats["unchanged"] == 3
+
+
+def test_only_the_changed_part_of_a_row_is_sent(feed):
+    ingest(feed, [product("1", "Magnesium"), product("2", "Sleep Mask"), product("3", "Neck Pillow")])
+    index, stats = ingest(feed, [
+        product("1", "Magnesium", price="12.50"), # Price only: metadata update, no re-embed
+        product("2", "Sleep Mask", description="Now with memory foam."), # Text changed: re-embed
+        product("4", "Eye Drops") # New
+    ])
+    assert index.updated == ["Shop-1"]
+    assert sorted(index.upserted) == ["Shop-2", "Shop-4"]
+    assert index.deleted == ["Shop-3"] # Gone from the feed
+    assert (stats["metadata_updates"], stats["success"], stats["deleted"]) == (1, 2, 1)
+
+
+def test_manifest_is_scoped_per_feed(tmp_path):
+    path = str(tmp_path / "manifest.db")
+    first, second = IngestManifest("a.csv", path), IngestManifest("b.csv", path)
+    first.record([("p1", "text", "meta")])
+    second.record([("p2", "text", "meta")])
+    assert first.lookup("p1")[:2] == ("text", "meta")
+    assert first.lookup("p2") is None
+
+    second.run_id += 1 # A later run of feed b that no longer lists p2
+    assert second.stale_ids() == ["p2"]
+    assert first.stale_ids() == []
+    second.forget(["p2"])
+    assert second.lookup("p2") is None and first.lookup("p1") is not None
@@ -0,0 +1,157 @@
+import os
+import json
+import multiprocessing
+import numpy as np
+import pytest
+
+from encoders import HashingEncoder
+from generate_stress_feed import generate
+from ingest_awin import run_ingestion, feed_name
+from ingest_manifest import IngestManifest
+from lexical import LexicalIndexBuilder
+from seen_ids import SeenIds
+from vector_store import LocalVectorStore
+
+CHECKPOINT_ROWS = 100
+
+
+class CrashingStore(LocalVectorStore):
+    """Kills the whole process on the crash_at-th upsert, like an OOM kill or a deploy would."""
+
+    def __init__(self, index_dir, crash_at):
+        super().__init__(index_dir)
+        self.crash_at = crash_at
+        self.calls = 0
+
+    def upsert(self, vectors):
+        self.calls += 1
+        if self.calls == self.crash_at:
+            os._exit(3)
+        return super().upsert(vectors)
+
+
+@pytest.fixture(scope="module")
+def feed(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("feed")
+    # Missing ids and repeated ids included, so dedup and skips are resumed too
+    generate(600, output_dir=str(directory), prefix="feed", missing_id=0.03, duplicate=0.05)
+    return str(directory / "feed.csv")
+
+
+def ingest(feed, workdir, index=None, run_docs=50):
+    name = feed_name(feed)
+    return run_ingestion(
+        feed,
+        index=index if index is not None else LocalVectorStore(os.path.join(workdir, "index")),
+        model=HashingEncoder(),
+        manifest=IngestManifest(name, os.path.join(workdir, "manifest.db")),
+        lexical=LexicalIndexBuilder(name, os.path.join(workdir, "lexical"), run_docs=run_docs),
+        seen_ids=SeenIds(name, os.path.join(workdir, "seen.db")),
+        checkpoint_rows=CHECKPOINT_ROWS,
+        upsert_batch_size=20,
+        upsert_workers=1,
+        bump_generation=False
+    )
+
+def crash(feed, workdir, crash_at):
+    def target():
+        ingest(feed, workdir, CrashingStore(os.path.join(workdir, "index"), crash_at))
+    process = multiprocessing.get_context("fork").Process(target=target)
+    process.start()
+    process.join()
+    assert process.exitcode == 3
+
+def index_rows(workdir):
+    store = LocalVectorStore(os.path.join(workdir, "index"))
+    return {p_id: (np.asarray(store.embeddings[i]), store.metadata[i]) for i, p_id in enumerate(store.ids)}
+
+def segment(workdir, feed):
+    builder = LexicalIndexBuilder(feed_name(feed), os.path.join(workdir, "lexical"))
+    with np.load(builder.path) as data:
+        return {name: data[name] for name in data.files}
+
+def assert_same_index(workdir, expected_dir):
+    rows, expected = index_rows(workdir), index_rows(expected_dir)
+    assert rows.keys() == expected.keys()
+    for p_id, (vector, metadata) in expected.items():
+        assert rows[p_id][1] == metadata
+        np.testing.assert_allclose(rows[p_id][0], vector, rtol=1e-6)
+
+def assert_same_segment(workdir, expected_dir, feed):
+    arrays, expected = segment(workdir, feed), segment(expected_dir, feed)
+    assert arrays.keys() == expected.keys()
+    for name in expected:
+        np.testing.assert_array_equal(arrays[name], expected[name])
+
+
+@pytest.fixture(scope="module")
+def clean_run(feed, tmp_path_factory):
+    workdir = str(tmp_path_factory.mktemp("clean"))
+    return workdir, ingest(feed, workdir)
+
+
+def test_resume_after_crash_matches_an_uninterrupted_run(feed, clean_run, tmp_path, capsys):
+    clean_dir, clean_stats = clean_run
+    workdir = str(tmp_path)
+    crash(feed, workdir, crash_at=12)
+
+    checkpoint = IngestManifest(feed_name(feed), os.path.join(workdir, "manifest.db")).checkpoint()
+    assert checkpoint is not None and checkpoint["row"] >= CHECKPOINT_ROWS
+    assert checkpoint["lexical"]["docs"] > 0
+    journal = os.listdir(os.path.join(workdir, "index", "journal"))
+    assert journal # Rows before the checkpoint were persisted, not merged
+
+    stats = ingest(feed, workdir)
+    assert f"Resuming at row {checkpoint['row']}" in capsys.readouterr().out
+    assert not stats["errors"]
+    for key in ("success", "skipped", "duplicates", "failed", "unchanged"):
+        assert stats[key] == clean_stats[key], key
+    assert_same_index(workdir, clean_dir)
+    assert_same_segment(workdir, clean_dir, feed)
+    assert not os.path.exists(os.path.join(workdir, "index", "journal")) or not os.listdir(
+        os.path.join(workdir, "index", "journal"))
+    assert IngestManifest(feed_name(feed), os.path.join(workdir, "manifest.db")).checkpoint() is None
+
+
+def test_crash_before_the_first_checkpoint_loses_nothing(feed, clean_run, tmp_path, capsys):
+    clean_dir, clean_stats = clean_run
+    workdir = str(tmp_path)
+    crash(feed, workdir, crash_at=3) # Two batches upserted, still buffered in memory
+
+    stats = ingest(feed, workdir)
+    assert "Resuming at row 0" in capsys.readouterr().out
+    assert stats["success"] == clean_stats["success"]
+    assert_same_index(workdir, clean_dir)
+
+
+def test_resume_without_the_lexical_log_starts_over(feed, clean_run, tmp_path, capsys):
+    clean_dir, clean_stats = clean_run
+    workdir = str(tmp_path)
+    crash(feed, workdir, crash_at=12)
+    os.remove(LexicalIndexBuilder(feed_name(feed), os.path.join(workdir, "lexical")).log_path)
+
+    stats = ingest(feed, workdir)
+    assert "Resuming" not in capsys.readouterr().out
+    assert stats["duplicates"] == clean_stats["duplicates"]
+    assert stats["success"] + stats["unchanged"] == clean_stats["success"]
+    assert_same_index(workdir, clean_dir)
+    assert_same_segment(workdir, clean_dir, feed)
+
+
+def test_rerun_of_an_unchanged_feed_writes_nothing(feed, tmp_path):
+    workdir = str(tmp_path)
+    first = ingest(feed, workdir)
+    second = ingest(feed, workdir)
+    assert second["success"] == 0 and second["deleted"] == 0
+    assert second["unchanged"] == first["success"]
+    assert not second["index_changed"]
+
+
+def test_segment_does_not_depend_on_run_size(feed, tmp_path):
+    # One run per 7 documents forces a multi-run (and multi-pass) merge
+    small, large = str(tmp_path / "small"), str(tmp_path / "large")
+    ingest(feed, small, run_docs=7)
+    ingest(feed, large, run_docs=100000)
+    assert_same_segment(small, large, feed)
+    docs = json.loads(segment(small, feed)["docs"].tobytes().decode("utf-8"))
+    assert len(docs["ids"]) == len(set(docs["ids"]))
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+import threading
+import numpy as np
+import pytest
+
+from intent import IntentRegistry, IntentEmbeddings
+
+INTENTS = {"sleep": "magnesium sleep mask", "travel": "neck pillow eye mask", "focus": "caffeine headphones"}
+
+
+class RecordingEncoder:
+    """One-hot vector per distinct text, so every intent vector is orthogonal to the others."""
+
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.texts = {}
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.batches.append((threading.current_thread().name, list(texts)))
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row, self.texts.setdefault(text, len(self.texts))] = 2.0 # Not unit length on purpose
+        return vectors
+
+    def vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        vector[self.texts[text]] = 1.0
+        return vector
+
+
+def unit(vector):
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return IntentRegistry(path=str(tmp_path / "intent_map.json"), default_map=INTENTS, reload_interval=0)
+
+
+def test_warm_encodes_every_intent_in_one_batch(registry):
+    encoder = RecordingEncoder()
+    IntentEmbeddings(encoder.encode, registry=registry).warm()
+    assert len(encoder.batches) == 1
+    assert sorted(encoder.batches[0][1]) == sorted(f"{p} {k}" for p, k in INTENTS.items())
+
+
+def test_blend_weights_the_query_against_the_mean_intent(registry):
+    encoder = RecordingEncoder()
+    embeddings = IntentEmbeddings(encoder.encode, registry=registry, query_weight=0.6)
+    embeddings.warm()
+    query = np.zeros(16, dtype=np.float32)
+    query[15] = 3.0
+
+    np.testing.assert_allclose(embeddings.blend(query, []), unit(query))
+    sleep, travel = encoder.vector("sleep " + INTENTS["sleep"]), encoder.vector("travel " + INTENTS["travel"])
+    expected = unit(0.6 * unit(query) + 0.4 * unit(sleep + travel))
+    np.testing.assert_allclose(embeddings.blend(query, ["sleep", "travel"]), expected, rtol=1e-6)
+    assert np.linalg.norm(embeddings.blend(query, ["sleep"])) == pytest.approx(1.0)
+    # Unknown intents are ignored rather than failing the search
+    np.testing.assert_allclose(embeddings.blend(query, ["gone"]), unit(query))
+
+
+def test_hot_reload_re_encodes_only_changed_intents_off_the_request_path(registry):
+    encoder = RecordingEncoder()
+    embeddings = IntentEmbeddings(encoder.encode, registry=registry, query_weight=0.6)
+    embeddings.warm()
+    query = np.ones(16, dtype=np.float32)
+
+    with open(registry.path, mode='w', encoding='utf-8') as f:
+        json.dump({**INTENTS, "focus": "standing desk", "yoga": "yoga mat"}, f)
+    os.utime(registry.path, (time.time() + 5, time.time() + 5)) # A distinct mtime even on coarse clocks
+
+    # The first blend after the reload must not wait for the model
+    assert embeddings.blend(query, ["yoga"]) is not None
+    deadline = time.monotonic() + 5
+    while len(encoder.batches) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    embeddings._warming.join(timeout=5)
+
+    thread, texts = encoder.batches[1]
+    assert thread == "intent-warm"
+    assert sorted(texts) == ["focus standing desk", "yoga yoga mat"]
+    yoga = encoder.vector("yoga yoga mat")
+    np.testing.assert_allclose(embeddings.blend(query, ["yoga"]),
+                               unit(0.6 * unit(query) + 0.4 * yoga), rtol=1e-6)
@@ -0,0 +1,40 @@
+import pytest
+
+from intent import IntentMatcher, INTENT_MAP, tokenize
+
+
+@pytest.fixture
+def matcher():
+    return IntentMatcher(INTENT_MAP)
+
+
+def test_tokens_split_on_hyphens_but_keep_apostrophes():
+    assert tokenize("Marathon-Training lion's mane") == ["marathon", "training", "lion's", "mane"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("marathon-training plan", ["marathon"]),
+    ("getting hyrox-ready", ["hyrox"]),
+    ("post-marathon recovery", ["marathon", "recovery"]),
+    ("sleep-friendly night routine", ["sleep", "night routine"])
+])
+def test_hyphenated_words_match_their_intents(matcher, query, expected):
+    assert matcher.match(query) == expected
+
+
+def test_short_phrases_only_match_whole_words(matcher):
+    assert matcher.match("training for a 5k") == ["5k"]
+    assert matcher.match("15kg kettlebell") == []
+    assert matcher.match("10k and 5k") == ["10k", "5k"]
+
+
+def test_the_longest_phrase_wins_and_repeats_collapse(matcher):
+    assert matcher.match("Half Marathon then a marathon") == ["half marathon", "marathon"]
+    assert matcher.match("home gym or gym") == ["home gym", "gym"]
+    assert matcher.match("yoga yoga yoga") == ["yoga"]
+
+
+def test_keywords_are_deduplicated_across_intents(matcher):
+    keywords = matcher.keywords("yoga and home gym")
+    assert keywords.count("yoga") == 1 and "dumbbells" in keywords
+    assert matcher.keywords("nothing relevant here") == []
@@ -0,0 +1,74 @@
+import pytest
+
+from lexical import LexicalIndexBuilder, LexicalIndex, analyze, rrf_fuse, LEXICAL_MIN_COVERAGE
+
+PRODUCTS = [
+    ("p1", "NeuroPeak Focus Capsules", "Nootropic blend with lion's mane.", "Supplements"),
+    ("p2", "Weighted Blanket 15lbs", "Calming blanket for deep sleep.", "Sleep"),
+    ("p3", "Magnesium Glycinate 500mg", "Supports sleep and recovery.", "Supplements"),
+    ("p4", "Sleep Mask", "Blocks light. Pairs well with a weighted blanket.", "Sleep"),
+    ("p5", "Probiotic 50 Billion CFU", "Gut health support.", "Supplements")
+]
+
+
+def build(directory, feed, products):
+    builder = LexicalIndexBuilder(feed, str(directory))
+    for p_id, title, description, category in products:
+        builder.add(p_id, title, description, category, {"title": title, "category": category})
+    builder.save()
+
+
+def ids(results):
+    return [m["id"] for m in results["matches"]]
+
+
+@pytest.fixture
+def index(tmp_path):
+    build(tmp_path, "feed.csv", PRODUCTS)
+    return LexicalIndex(str(tmp_path))
+
+
+def test_mixed_tokens_also_emit_their_parts():
+    assert analyze("Weighted blanket 15lbs for the bed") == ["weighted", "blanket", "15lbs", "15", "lbs", "bed"]
+    assert "500" in analyze("500mg") and "1.5" in analyze("1.5kg")
+
+
+def test_exact_brand_and_dosage_hits_rank_first(index):
+    assert ids(index.search("NeuroPeak"))[:1] == ["p1"]
+    assert ids(index.search("50 Billion CFU"))[:1] == ["p5"]
+    assert ids(index.search("blanket 15 lbs"))[:1] == ["p2"] # "15 lbs" meets "15lbs"
+
+
+def test_title_matches_outrank_description_matches(index):
+    # Both mention a weighted blanket; only p2 has it in the title
+    assert ids(index.search("weighted blanket"))[:2] == ["p2", "p4"]
+
+
+def test_coverage_is_the_matched_share_of_the_query(index):
+    by_id = {m["id"]: m for m in index.search("magnesium glycinate", top_k=5)["matches"]}
+    assert by_id["p3"]["coverage"] == pytest.approx(1.0)
+    partial = {m["id"]: m for m in index.search("magnesium zinc copper", top_k=5)["matches"]}
+    assert partial["p3"]["coverage"] < LEXICAL_MIN_COVERAGE
+    assert index.search("the for with")["matches"] == [] # Stopwords only
+    assert index.search("nonexistentword")["matches"] == []
+
+
+def test_segments_share_idf_and_reload_on_a_new_generation(tmp_path):
+    build(tmp_path, "a.csv", PRODUCTS[:3])
+    generation = [1]
+    index = LexicalIndex(str(tmp_path), generation_source=lambda: generation[0], check_interval=0)
+    assert ids(index.search("probiotic")) == []
+
+    build(tmp_path, "b.csv", PRODUCTS[3:])
+    assert ids(index.search("probiotic")) == [] # Not visible until the generation moves
+    generation[0] = 2
+    assert ids(index.search("probiotic")) == ["p5"]
+    assert index.stats()["segments"] == 2 and len(index) == len(PRODUCTS)
+
+
+def test_rrf_rewards_candidates_both_lists_agree_on():
+    vector = [{"id": i, "score": 0.5, "metadata": {}} for i in ("a", "c")]
+    lexical = [{"id": i, "score": 5.0, "metadata": {}} for i in ("c", "d", "e")]
+    fused = rrf_fuse({"vector": vector, "lexical": lexical})
+    assert [m["id"] for m in fused] == ["c", "a", "d", "e"]
+    assert [m["id"] for m in rrf_fuse({"vector": vector, "lexical": lexical}, limit=2)] == ["c", "a"]
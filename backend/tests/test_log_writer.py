@@ -0,0 +1,59 @@
+import datetime
+import threading
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from log_writer import LogWriter
+from models import SearchLog, ClickLog
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def search_rows(engine):
+    with Session(engine) as session:
+        return session.exec(select(SearchLog).order_by(SearchLog.id)).all()
+
+
+def test_rows_are_written_in_bulk_on_stop(engine):
+    writer = LogWriter(engine, dedupe_model=SearchLog, batch_size=1000, flush_interval=60)
+    writer.start()
+    for i in range(5):
+        writer.submit(SearchLog(query=f"q{i}", results_summary=""))
+    writer.submit(ClickLog(product_title="Mat", query="q0", link_clicked=""))
+    writer.stop()
+    assert [row.query for row in search_rows(engine)] == [f"q{i}" for i in range(5)]
+    assert writer.stats()["written"] == 6 and writer.stats()["flushes"] == 1
+
+
+def test_repeat_of_the_latest_query_bumps_it_even_if_another_worker_wrote_it(engine):
+    with Session(engine) as session: # Logged by another worker after this writer started
+        session.add(SearchLog(query="Yoga Mat", results_summary="cork", timestamp=datetime.datetime(2024, 1, 1)))
+        session.commit()
+    writer = LogWriter(engine, dedupe_model=SearchLog, batch_size=1000, flush_interval=60)
+    writer.start()
+    repeat = datetime.datetime(2024, 1, 2)
+    writer.submit(SearchLog(query="yoga mat", results_summary="cork", timestamp=repeat))
+    writer.submit(SearchLog(query="foam roller", results_summary=""))
+    writer.submit(SearchLog(query="Foam Roller", results_summary=""))
+    writer.stop()
+
+    rows = search_rows(engine)
+    assert [row.query for row in rows] == ["Yoga Mat", "foam roller"]
+    assert rows[0].timestamp == repeat
+
+
+def test_a_full_queue_drops_instead_of_blocking_and_counts_exactly(engine):
+    writer = LogWriter(engine, max_queue=100) # Not started, so nothing drains the queue
+    threads = [threading.Thread(target=lambda: [writer.submit(ClickLog(product_title="", query="", link_clicked=""))
+                                                for _ in range(50)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = writer.stats()
+    assert (stats["submitted"], stats["dropped"], stats["queue_depth"]) == (100, 300, 100)
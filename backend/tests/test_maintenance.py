@@ -0,0 +1,68 @@
+import datetime
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from database import ensure_indexes
+from maintenance import run_rollup, prune_raw_logs, total_clicks, top_queries, top_products
+from models import SearchLog, ClickLog, DailyQueryStat
+from pagination import keyset_page
+
+COMPOSITES = {"ix_searchlog_timestamp_id", "ix_userlead_timestamp_id", "ix_clicklog_timestamp_id"}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def days_ago(days, hour=12):
+    today = datetime.datetime.combine(datetime.datetime.utcnow().date(), datetime.time.min)
+    return today - datetime.timedelta(days=days) + datetime.timedelta(hours=hour)
+
+
+def test_ensure_indexes_adds_the_composites_to_existing_tables(engine):
+    with engine.begin() as conn: # Tables created before the composite indexes existed
+        for name in COMPOSITES:
+            conn.execute(text(f"DROP INDEX {name}"))
+    assert set(ensure_indexes(engine)) == COMPOSITES
+    assert ensure_indexes(engine) == []
+
+
+def test_keyset_pages_are_served_by_the_composite_index(engine):
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM searchlog WHERE timestamp < :t OR (timestamp = :t AND id < :i) "
+            "ORDER BY timestamp DESC, id DESC LIMIT 101"
+        ), {"t": "2024-01-01", "i": 5}).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_searchlog_timestamp_id" in details and "TEMP B-TREE" not in details
+    with Session(engine) as session:
+        assert keyset_page(session, SearchLog, limit=5) == ([], None)
+
+
+def test_rollup_then_prune_keeps_the_totals(engine):
+    with Session(engine) as session:
+        for days in (200, 200, 3):
+            session.add(SearchLog(query=" Yoga  Mat", results_summary="", timestamp=days_ago(days)))
+        session.add(ClickLog(product_title="Cork Mat", query="yoga mat", link_clicked="", timestamp=days_ago(200)))
+        session.add(ClickLog(product_title="Cork Mat", query="yoga mat", link_clicked="", timestamp=days_ago(3)))
+        session.add(ClickLog(product_title="Strap", query="yoga mat", link_clicked="")) # Today: not rolled up
+        session.commit()
+
+    assert prune_raw_logs(engine, retention_days=90) == 0 # Nothing rolled up yet
+    assert run_rollup(engine) == 200
+    run_rollup(engine) # Re-rolls the trailing days without data; rollup_day is idempotent
+    with Session(engine) as session:
+        stat = session.get(DailyQueryStat, (days_ago(200).date(), "yoga mat"))
+        assert (stat.searches, stat.clicks) == (2, 1)
+        before = total_clicks(session)
+
+    assert prune_raw_logs(engine, retention_days=90, batch_size=1) == 3
+    with Session(engine) as session:
+        assert before == total_clicks(session) == 3
+        assert len(session.exec(select(SearchLog)).all()) == 1
+        assert top_queries(session, days=365) == [{"query": "yoga mat", "searches": 3, "clicks": 2}]
+        assert top_products(session, days=365) == [{"product_title": "Cork Mat", "clicks": 2}]
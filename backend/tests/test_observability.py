@@ -0,0 +1,74 @@
+import json
+import logging
+import sqlite3
+import pytest
+
+import observability
+from observability import MetricsRegistry, JsonFormatter, get_logger, log_event
+from query_cache import EmbeddingCache
+from intent import IntentRegistry
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def events():
+    handler = Capture()
+    root = get_logger("test").parent
+    root.addHandler(handler)
+    yield handler.records
+    root.removeHandler(handler)
+
+
+def test_collectors_render_gauges_and_counters():
+    registry = MetricsRegistry(prefix="t")
+    registry.counter("requests_total", "Requests", ("route",)).inc(route="/search")
+    registry.register_collector(lambda: {"queue_depth": [({"queue": "logs"}, 3)], "ready": True})
+    registry.register_collector(lambda: {"cache_hits_total": 7}, kind="counter")
+    registry.register_collector(lambda: 1 / 0) # Must not take the others down
+    lines = registry.render().splitlines()
+
+    assert 't_requests_total{route="/search"} 1.0' in lines
+    assert "# TYPE t_queue_depth gauge" in lines and 't_queue_depth{queue="logs"} 3' in lines
+    assert "t_ready 1" in lines
+    assert "# TYPE t_cache_hits_total counter" in lines and "t_cache_hits_total 7" in lines
+    assert any(line.startswith("# collector error") for line in lines)
+    with pytest.raises(ValueError):
+        registry.register_collector(dict, kind="summary")
+
+
+def test_log_events_are_json_lines_and_sampled(events, monkeypatch):
+    logger = get_logger("test")
+    log_event(logger, "search_received", query="yoga mat")
+    record = events[-1]
+    assert json.loads(JsonFormatter().format(record)) == {
+        "ts": round(record.created, 3), "level": "info", "logger": "ventiko.test",
+        "event": "search_received", "query": "yoga mat"
+    }
+
+    monkeypatch.setattr(observability, "LOG_SAMPLE_RATE", 0.0)
+    log_event(logger, "click_tracked", sampled=True)
+    assert events[-1] is record
+
+
+def test_request_path_errors_are_logged_not_printed(events, tmp_path, capsys):
+    path = tmp_path / "intent_map.json"
+    path.write_text("{not json", encoding="utf-8")
+    IntentRegistry(path=str(path), default_map={"sleep": "magnesium"}, reload_interval=0)
+
+    cache = EmbeddingCache(model_name="m", disk_path=str(tmp_path / "cache.sqlite"))
+    def broken():
+        raise sqlite3.OperationalError("disk I/O error")
+    cache._connect = broken
+    assert cache._disk_get("key", 0.0) is None
+
+    assert capsys.readouterr().out == ""
+    failures = {(r.name, r.getMessage()) for r in events if r.levelno == logging.ERROR}
+    assert failures == {("ventiko.intent", "intent_reload_failed"), ("ventiko.query_cache", "disk_error")}
@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import base64
+import datetime
+import subprocess
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, SQLModel, create_engine
+
+from models import SearchLog
+from pagination import keyset_page, decode_cursor, encode_cursor, MAX_PAGE_SIZE
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    base = datetime.datetime(2024, 1, 1)
+    with Session(engine) as session:
+        for i in range(25):
+            # Groups of three rows share a timestamp, so the id tie-break matters
+            session.add(SearchLog(query=f"q{i}", results_summary="", timestamp=base + datetime.timedelta(minutes=i // 3)))
+        session.commit()
+        yield session
+
+
+def walk(session, limit):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(session, SearchLog, limit=limit, cursor=cursor)
+        pages.append(rows)
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 25, 100])
+def test_pages_cover_every_row_once_newest_first(session, limit):
+    pages = walk(session, limit)
+    rows = [row for page in pages for row in page]
+    assert len(rows) == 25
+    assert len({row.id for row in rows}) == 25
+    keys = [(row.timestamp, row.id) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_last_full_page_has_no_next_cursor(session):
+    rows, cursor = keyset_page(session, SearchLog, limit=25)
+    assert len(rows) == 25 and cursor is None
+
+
+def test_rows_inserted_after_the_first_page_do_not_shift_later_pages(session):
+    first, cursor = keyset_page(session, SearchLog, limit=10)
+    session.add(SearchLog(query="newer", results_summary="", timestamp=datetime.datetime(2030, 1, 1)))
+    session.commit()
+    second, _ = keyset_page(session, SearchLog, limit=10, cursor=cursor)
+    assert not {row.id for row in first} & {row.id for row in second}
+    assert all(row.query != "newer" for row in second)
+
+
+def test_cursor_round_trip_and_limit_clamp(session):
+    rows, _ = keyset_page(session, SearchLog, limit=MAX_PAGE_SIZE * 10)
+    assert len(rows) == 25
+    assert decode_cursor(encode_cursor(rows[3])) == (rows[3].timestamp, rows[3].id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    base64.urlsafe_b64encode(b"no separator").decode(),
+    base64.urlsafe_b64encode(b"2024-01-01T00:00:00|not-an-id").decode()
+])
+def test_malformed_cursor_is_a_400(session, cursor):
+    with pytest.raises(HTTPException) as error:
+        keyset_page(session, SearchLog, cursor=cursor)
+    assert error.value.status_code == 400
+
+
+def test_bulk_exports_are_admin_only(tmp_path):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}", "DATABASE_REPLICA_URL": "",
+           "EMAIL_SENDER": "stub", "PRELOAD_MODEL": "false"}
+    script = (
+        "import json, main\n"
+        "print(json.dumps({r.path: [d.call.__name__ for d in r.dependant.dependencies]\n"
+        "                  for r in main.app.routes if getattr(r, 'path', '').endswith('/export')}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    exports = json.loads(next(line for line in result.stdout.splitlines() if line.startswith("{\"/")))
+    assert sorted(exports) == ["/admin-data/export", "/archive/export"]
+    assert all("require_admin" in dependencies for dependencies in exports.values())
@@ -0,0 +1,57 @@
+import time
+import pytest
+
+from ingest_orchestrator import RateLimiter, RateLimitedIndex
+
+
+class RecordingIndex:
+    def __init__(self):
+        self.calls = []
+
+    def upsert(self, vectors):
+        self.calls.append(("upsert", len(vectors)))
+
+    def update_metadata(self, items):
+        self.calls.append(("update_metadata", len(items)))
+
+    def delete(self, ids):
+        self.calls.append(("delete", len(ids)))
+
+    def flush(self):
+        self.calls.append(("flush", 0))
+
+
+def test_burst_is_free_then_refills_at_rate():
+    limiter = RateLimiter(rate=50, burst=5)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.05
+    for _ in range(5):
+        limiter.acquire()
+    assert 0.09 <= time.monotonic() - started < 0.5 # 5 tokens at 50/s
+
+
+def test_cost_above_burst_is_rejected():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=10, burst=3).acquire(4)
+
+
+def test_metadata_updates_are_charged_per_id_in_burst_sized_chunks():
+    limiter = RateLimiter(rate=100, burst=10)
+    inner = RecordingIndex()
+    index = RateLimitedIndex(inner, limiter)
+    started = time.monotonic()
+    index.update_metadata([(str(i), {}) for i in range(35)])
+    assert inner.calls == [("update_metadata", 10)] * 3 + [("update_metadata", 5)]
+    assert 0.24 <= time.monotonic() - started < 1.0 # 25 ids past the burst at 100/s
+
+
+def test_writes_take_tokens_and_the_rest_passes_through():
+    limiter = RateLimiter(rate=1000, burst=2)
+    inner = RecordingIndex()
+    index = RateLimitedIndex(inner, limiter)
+    index.upsert([("a", [0.0], {})])
+    index.delete(["a"])
+    index.flush()
+    assert inner.calls == [("upsert", 1), ("delete", 1), ("flush", 0)]
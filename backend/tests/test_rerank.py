@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from lexical import rrf_fuse
+from rerank import diversify
+
+
+def match(p_id, score, title, values=None):
+    result = {"id": p_id, "score": score, "metadata": {"title": title}}
+    if values is not None:
+        result["values"] = np.asarray(values, dtype=np.float32)
+    return result
+
+
+def test_rrf_keeps_cosine_score_and_orders_by_fused_score():
+    vector = [match("a", 0.9, "alpha"), match("b", 0.8, "bravo")]
+    lexical = [match("b", 12.0, "bravo"), match("c", 7.0, "charlie")]
+    fused = rrf_fuse({"vector": vector, "lexical": lexical}, k=60, score_from="vector")
+
+    assert [m["id"] for m in fused] == ["b", "a", "c"] # b is in both lists
+    by_id = {m["id"]: m for m in fused}
+    assert by_id["b"]["fused_score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert by_id["a"]["score"] == 0.9 and by_id["b"]["score"] == 0.8
+    assert by_id["c"]["score"] is None # BM25-only: no cosine to report
+    assert "scores" not in by_id["a"]
+
+
+def test_rrf_limit():
+    ranked = {"vector": [match(str(i), 1.0 - i / 10, f"t{i}") for i in range(5)]}
+    assert len(rrf_fuse(ranked, limit=2)) == 2
+
+
+def test_diversify_collapses_near_duplicate_vectors_and_titles():
+    candidates = rrf_fuse({"vector": [
+        match("a", 0.9, "magnesium glycinate", [1, 0, 0]),
+        match("a-other-merchant", 0.89, "glycinate magnesium powder", [1, 0.01, 0]), # Same vector
+        match("b", 0.8, "blue light glasses", [0, 1, 0]),
+        match("b-copy", 0.7, "blue light glasses", [0, 0, 1]) # Same title, different vector
+    ]}, score_from="vector")
+    picked = diversify(candidates, top_k=5)
+    assert [m["id"] for m in picked] == ["a", "b"]
+    assert all("values" not in m for m in picked)
+
+
+def test_diversify_prefers_variety_over_a_close_second():
+    candidates = rrf_fuse({"vector": [
+        match("a", 0.9, "sleep mask", [1, 0]),
+        match("a2", 0.85, "eye cover", [0.9, 0.43]), # Similar to a but under the dedup threshold
+        match("b", 0.8, "compression socks", [0, 1])
+    ]}, score_from="vector")
+    assert [m["id"] for m in diversify(candidates, top_k=2, mmr_lambda=0.5)] == ["a", "b"]
+    assert [m["id"] for m in diversify(candidates, top_k=2, mmr_lambda=1.0)] == ["a", "a2"]
+
+
+def test_diversify_without_vectors_falls_back_to_titles():
+    candidates = rrf_fuse({"lexical": [
+        match("a", 5.0, "red light therapy panel"),
+        match("b", 4.0, "red light therapy panel"),
+        match("c", 3.0, "weighted blanket")
+    ]})
+    assert [m["id"] for m in diversify(candidates, top_k=3)] == ["a", "c"]
+    assert diversify([], top_k=3) == []
@@ -0,0 +1,56 @@
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+from resources import Resources
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("torch", "sentence_transformers", "onnxruntime", "transformers", "pinecone")
+
+
+def test_importing_the_app_loads_no_model_or_index(tmp_path):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "DATABASE_REPLICA_URL": "",
+        "EMAIL_SENDER": "", # No provider key either: the sender is only built at startup
+        "RESEND_API_KEY": "",
+        "INTENT_MAP_PATH": str(tmp_path / "intent_map.json"),
+        "PRELOAD_MODEL": "false"
+    }
+    script = (
+        "import sys, json, main\n"
+        "from resources import resources\n"
+        f"print(json.dumps([sorted(resources._values), [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    loaded, heavy = json.loads(next(line for line in result.stdout.splitlines() if line.startswith("[[")))
+    assert loaded == []
+    assert heavy == []
+
+
+def test_each_resource_is_built_once_and_timed():
+    resources = Resources()
+    calls = []
+
+    def factory():
+        calls.append(threading.current_thread().name)
+        time.sleep(0.05) # Long enough for every thread to arrive while it's building
+        return object()
+
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(resources._get("model", factory))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({id(value) for value in values}) == 1
+    assert resources.is_loaded("model") and not resources.is_loaded("index")
+    assert resources.timings_ms["model"] >= 50
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import query_cache
+import resources
+import vector_store
+from query_cache import ResultCache, EmbeddingCache, bump_cache_generation, read_generation, bump_generation
+
+
+@pytest.fixture
+def generations(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "INDEX_GENERATION_FILE", str(tmp_path / "index_generation"))
+    monkeypatch.setattr(query_cache, "CACHE_GENERATION_FILE", str(tmp_path / "cache_generation"))
+
+
+def test_generation_files_start_at_zero_and_bump(tmp_path):
+    path = str(tmp_path / "nested" / "generation")
+    assert read_generation(path) == 0
+    assert bump_generation(path) == 1 and bump_generation(path) == 2
+    assert read_generation(path) == 2
+
+
+def test_results_are_cached_per_normalized_query_until_they_expire():
+    cache = ResultCache(lambda: 0, max_size=2, ttl=60, check_interval=0)
+    cache.put("Yoga Mat", {"matches": [1]})
+    assert cache.get(" yoga  mat") == {"matches": [1]}
+    cache.put("b", {})
+    cache.put("c", {}) # Evicts the least recently used entry
+    assert cache.get("yoga mat") is None and cache.evictions == 1
+    cache.ttl = -1
+    cache.put("d", {})
+    assert cache.get("d") is None
+    assert cache.clear() == 1 # Only "c" is left
+
+
+def test_a_new_ingest_or_a_purge_drops_cached_results(generations):
+    cache = ResultCache(resources.result_generation, check_interval=0)
+    cache.put("yoga mat", {"matches": []})
+    vector_store.bump_index_generation()
+    assert cache.get("yoga mat") is None
+
+    cache.put("yoga mat", {"matches": []})
+    bump_cache_generation()
+    assert cache.get("yoga mat") is None
+    assert cache.invalidations == 2
+
+
+def test_a_purge_drops_embeddings_but_leaves_the_index_generation(generations):
+    cache = EmbeddingCache(model_name="m", disk_path="", generation_source=query_cache.read_cache_generation,
+                           check_interval=0)
+    cache.put("yoga mat", np.ones(4))
+    vector_store.bump_index_generation() # Embeddings don't depend on the index
+    assert cache.get("yoga mat") is not None
+
+    bump_cache_generation() # What /cache-purge does in another worker
+    assert cache.get("yoga mat") is None
+    assert vector_store.read_index_generation() == 1
@@ -0,0 +1,84 @@
+import time
+import asyncio
+import threading
+import numpy as np
+import pytest
+
+import main
+from resources import resources
+from query_cache import EmbeddingCache
+from vector_store import VectorStore
+
+PRODUCTS = {"p1": "Cork Yoga Mat", "p2": "Foam Roller", "p3": "Resistance Bands"}
+
+
+class SlowIndex(VectorStore):
+    """Remote-style index: query() blocks, so query_async() must hop to the store's pool."""
+
+    def __init__(self, delay=0.05):
+        super().__init__()
+        self.delay = delay
+        self.threads = set()
+
+    def query_batch(self, vectors, top_k=3, include_metadata=True, filter=None, include_values=False):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        matches = [{"id": p_id, "score": 0.9 - 0.1 * rank, "metadata": {"title": title}}
+                   for rank, (p_id, title) in enumerate(PRODUCTS.items())]
+        return [{"matches": matches[:top_k]} for _ in vectors]
+
+
+class FakeBatchEncoder:
+    def __init__(self):
+        self.texts = []
+
+    async def encode_async(self, text):
+        self.texts.append(text)
+        return np.ones(4, dtype=np.float32)
+
+
+class NoIntents:
+    def blend(self, vector, intents):
+        return vector
+
+
+class NoLexicalHits:
+    def search(self, query, top_k=10, filter=None):
+        return {"matches": []}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = SlowIndex()
+    monkeypatch.setattr(resources, "_values", {
+        "index": index,
+        "batch_encoder": FakeBatchEncoder(),
+        "embedding_cache": EmbeddingCache(model_name="fake", disk_path=""),
+        "intent_embeddings": NoIntents(),
+        "lexical_index": NoLexicalHits()
+    })
+    return index
+
+
+def test_retrieve_matches_returns_the_fused_top_k(index):
+    matches = asyncio.run(main.retrieve_matches_async("yoga mat", [], top_k=2))
+    assert [m["id"] for m in matches] == ["p1", "p2"]
+    assert matches[0]["score"] == pytest.approx(0.9)
+    assert index.threads and all(name.startswith("vector-query") for name in index.threads)
+
+
+def test_concurrent_searches_overlap_on_the_event_loop(index):
+    async def run():
+        started = time.perf_counter()
+        await asyncio.gather(*(main.retrieve_matches_async(f"query {i}", [], top_k=3) for i in range(10)))
+        return time.perf_counter() - started
+
+    # Ten 50 ms index queries would take 0.5 s back to back
+    assert asyncio.run(run()) < 0.3
+    assert resources.batch_encoder.texts == [f"query {i}" for i in range(10)]
+
+
+def test_a_cached_embedding_skips_the_encoder(index):
+    asyncio.run(main.retrieve_matches_async("Yoga Mat", [], top_k=3))
+    asyncio.run(main.retrieve_matches_async("yoga  mat", [], top_k=3))
+    assert resources.batch_encoder.texts == ["Yoga Mat"]
@@ -0,0 +1,53 @@
+from seen_ids import BloomFilter, SeenIds, SEEN_IDS_FLUSH_SIZE
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"p_{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"q_{i}" in bloom for i in range(10000))
+    assert false_positives < 500 # ~1% expected; generous bound keeps the test stable
+    bloom.clear()
+    assert not any(key in bloom for key in keys)
+
+
+def test_duplicates_are_caught_before_and_after_a_flush(tmp_path):
+    seen = SeenIds("feed.csv", str(tmp_path / "seen.db"))
+    assert seen.add("a", 0)
+    assert not seen.add("a", 1) # Still buffered in memory
+    seen.flush()
+    assert not seen.add("a", 2) # Only in SQLite now
+    assert seen.add("b", 3)
+
+
+def test_false_positives_never_drop_a_new_id(tmp_path):
+    # A filter sized for one id says "maybe seen" for nearly everything after it fills up
+    seen = SeenIds("feed.csv", str(tmp_path / "seen.db"), capacity=1, error_rate=0.5)
+    ids = [f"p_{i}" for i in range(3 * SEEN_IDS_FLUSH_SIZE)]
+    assert all(seen.add(p_id, row) for row, p_id in enumerate(ids))
+    assert not any(seen.add(p_id, row) for row, p_id in enumerate(ids))
+    stats = seen.stats()
+    assert stats["false_positives"] > 0
+    assert stats["exact_checks"] >= stats["false_positives"]
+
+
+def test_rollback_forgets_ids_from_the_checkpoint_on(tmp_path):
+    seen = SeenIds("feed.csv", str(tmp_path / "seen.db"))
+    for row, p_id in enumerate(["a", "b", "c", "d"]):
+        seen.add(p_id, row)
+    seen.flush()
+    seen.rollback(2)
+    assert not seen.add("a", 0) and not seen.add("b", 1)
+    assert seen.add("c", 2) and seen.add("d", 3)
+
+
+def test_feeds_are_scoped_and_reset_clears_one_feed(tmp_path):
+    path = str(tmp_path / "seen.db")
+    first, second = SeenIds("first.csv", path), SeenIds("second.csv", path)
+    first.add("a", 0)
+    first.flush()
+    assert second.add("a", 0)
+    first.reset()
+    assert first.add("a", 0)
@@ -0,0 +1,55 @@
+import csv
+import gzip
+import pytest
+
+from generate_stress_feed import generate, shard_bounds
+
+
+def read_rows(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, mode='rt', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_shard_bounds_cover_every_row_once():
+    bounds = shard_bounds(10, 3)
+    assert bounds == [(0, 4), (4, 7), (7, 10)]
+    assert shard_bounds(2, 4) == [(0, 1), (1, 2), (2, 2), (2, 2)]
+
+
+def test_same_seed_gives_identical_files_however_many_processes(tmp_path):
+    serial = generate(900, shards=3, processes=1, output_dir=str(tmp_path / "serial"))
+    parallel = generate(900, shards=3, processes=3, output_dir=str(tmp_path / "parallel"))
+    assert len(serial["files"]) == 3
+    for a, b in zip(serial["files"], parallel["files"]):
+        with open(a["path"], mode='rb') as fa, open(b["path"], mode='rb') as fb:
+            assert fa.read() == fb.read()
+    other = generate(900, shards=3, processes=1, seed=7, output_dir=str(tmp_path / "other"))
+    assert read_rows(other["files"][0]["path"]) != read_rows(serial["files"][0]["path"])
+
+
+def test_dirt_is_injected_at_the_requested_kinds(tmp_path):
+    summary = generate(2000, output_dir=str(tmp_path), missing_id=0.05, duplicate=0.05)
+    rows = read_rows(summary["files"][0]["path"])
+    assert len(rows) == 2000 == sum(summary["rows_by_kind"].values())
+
+    missing = sum(1 for row in rows if not row["aw_product_id"])
+    assert missing == summary["rows_by_kind"]["missing_id"] and 50 < missing < 150
+    keys = [(row["merchant_name"], row["aw_product_id"]) for row in rows if row["aw_product_id"]]
+    # Every duplicate repeats an earlier merchant + id, which is what ingestion dedupes on
+    assert len(keys) - len(set(keys)) == summary["rows_by_kind"]["duplicate"] > 0
+
+
+def test_gzip_shards_hold_the_same_rows(tmp_path):
+    plain = generate(300, shards=2, processes=1, output_dir=str(tmp_path / "plain"))
+    packed = generate(300, shards=2, processes=1, output_dir=str(tmp_path / "gz"), compress=True)
+    for a, b in zip(plain["files"], packed["files"]):
+        assert b["path"].endswith(".csv.gz")
+        assert read_rows(a["path"]) == read_rows(b["path"])
+
+
+def test_impossible_ratios_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        generate(10, output_dir=str(tmp_path), missing_id=0.7, duplicate=0.7)
+    with pytest.raises(ValueError):
+        generate(10, output_dir=str(tmp_path), html=1.5)
@@ -0,0 +1,68 @@
+import asyncio
+import numpy as np
+import pytest
+
+from vector_store import LocalVectorStore
+
+
+def unit(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def ids(response):
+    return [m["id"] for m in response["matches"]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "index"))
+    store.upsert([
+        ("a", unit(1, 0, 0), {"title": "A"}),
+        ("b", unit(3, 4, 0), {"title": "B"}), # Stored normalized: (0.6, 0.8, 0)
+        ("c", unit(0, 0, 2), {"title": "C"})
+    ])
+    store.flush()
+    return store
+
+
+def test_scores_are_cosine_similarities_best_first(store):
+    response = store.query(unit(2, 0, 0), top_k=2, include_values=True)
+    assert ids(response) == ["a", "b"]
+    assert [m["score"] for m in response["matches"]] == pytest.approx([1.0, 0.6])
+    assert response["matches"][0]["metadata"] == {"title": "A"}
+    np.testing.assert_allclose(response["matches"][1]["values"], [0.6, 0.8, 0.0], rtol=1e-6)
+
+
+def test_a_batch_of_queries_is_answered_in_one_call(store):
+    first, second = store.query_batch([unit(1, 0, 0), unit(0, 0, 1)], top_k=1)
+    assert ids(first) == ["a"] and ids(second) == ["c"]
+
+
+def test_journaled_writes_survive_a_restart_and_merge_on_flush(store, tmp_path):
+    store.upsert([("d", unit(0, 1, 0), {"title": "D"})])
+    store.update_metadata([("a", {"title": "A2"})])
+    store.delete(["c"])
+    store.persist() # What an ingest checkpoint does; nothing is merged yet
+    assert len(store) == 3
+
+    reopened = LocalVectorStore(str(tmp_path / "index"))
+    reopened.flush()
+    assert sorted(reopened.ids) == ["a", "b", "d"]
+    assert ids(reopened.query(unit(0, 1, 0), top_k=1)) == ["d"]
+    assert reopened.query(unit(1, 0, 0), top_k=1)["matches"][0]["metadata"] == {"title": "A2"}
+    assert reopened._journal_entries() == []
+
+
+def test_a_serving_store_remaps_when_the_generation_moves(store, tmp_path):
+    generation = [1]
+    serving = LocalVectorStore(str(tmp_path / "index"), generation_source=lambda: generation[0], check_interval=0)
+    store.upsert([("d", unit(0, 1, 0), {"title": "D"})])
+    store.flush()
+    assert "d" not in ids(serving.query(unit(0, 1, 0), top_k=4))
+    generation[0] = 2
+    assert ids(serving.query(unit(0, 1, 0), top_k=1)) == ["d"]
+
+
+def test_query_async_matches_query(store):
+    expected = store.query(unit(1, 1, 0), top_k=3)
+    assert asyncio.run(store.query_async(unit(1, 1, 0), top_k=3)) == expected
@@ -0,0 +1,407 @@
+import os
+import json
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+
+from filters import MetadataBitmaps
+from query_cache import GENERATION_CHECK_INTERVAL, read_generation, bump_generation
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# VECTOR_BACKEND=pinecone (default) talks to the hosted index.
+# VECTOR_BACKEND=local serves everything from a memory-mapped .npy on disk.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+INDEX_NAME = os.getenv("PINECONE_INDEX", "ventiko-index")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "data/local_index")
+# Bumped by ingest_awin.py after every upsert run so local indexes, BM25 and result caches reload
+INDEX_GENERATION_FILE = os.getenv("INDEX_GENERATION_FILE", "data/index_generation")
+# Threads (and pooled HTTP connections) reserved for remote index queries from async handlers
+VECTOR_QUERY_WORKERS = int(os.getenv("VECTOR_QUERY_WORKERS", "16"))
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+JOURNAL_DIR = "journal"
+FLUSH_CHUNK_ROWS = 65536 # Rows copied per step when merging the index on flush
+
+
+class VectorStore:
+    """Common interface for every index backend (Pinecone or local)."""
+
+    def __init__(self):
+        # Created up front: concurrent first queries would each build (and leak) their own lazily.
+        # Its threads only start on the first query_async, so backends that override it pay nothing.
+        self._executor = ThreadPoolExecutor(max_workers=VECTOR_QUERY_WORKERS, thread_name_prefix="vector-query")
+
+    def query(self, vector, top_k=3, include_metadata=True, filter=None, include_values=False):
+        return self.query_batch([vector], top_k=top_k, include_metadata=include_metadata, filter=filter,
+                                include_values=include_values)[0]
+
+    def query_batch(self, vectors, top_k=3, include_metadata=True, filter=None, include_values=False):
+        """
+        filter is a Pinecone-style metadata filter (see filters.py), applied before ranking.
+        include_values adds each match's stored vector under "values" (used for re-ranking).
+        """
+        raise NotImplementedError
+
+    async def query_async(self, vector, top_k=3, include_metadata=True, filter=None, include_values=False):
+        """Runs query() on this store's own bounded pool, so the event loop never waits on I/O."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self.query, vector, top_k, include_metadata, filter, include_values)
+        )
+
+    def upsert(self, vectors):
+        raise NotImplementedError
+
+    def update_metadata(self, items):
+        """Replaces metadata for existing ids without touching their vectors."""
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def flush(self):
+        """Makes pending writes visible. A no-op for remote backends."""
+        pass
+
+    def persist(self):
+        """Makes pending writes durable (not necessarily visible); cheap enough for every checkpoint."""
+        pass
+
+
+# --- PINECONE BACKEND ---
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index_name=INDEX_NAME):
+        super().__init__()
+        from pinecone import Pinecone
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        # One pooled HTTP connection per query thread, so concurrent async queries reuse sockets
+        self.index = pc.Index(index_name, pool_threads=VECTOR_QUERY_WORKERS)
+
+    def query_batch(self, vectors, top_k=3, include_metadata=True, filter=None, include_values=False):
+        responses = []
+        for vector in vectors:
+            results = self.index.query(
+                vector=_as_list(vector),
+                top_k=top_k,
+                include_metadata=include_metadata,
+                include_values=include_values,
+                filter=filter
+            )
+            matches = []
+            for m in results['matches']:
+                match = {"id": m['id'], "score": m['score'], "metadata": m.get('metadata') or {}}
+                if include_values:
+                    match["values"] = m.get('values')
+                matches.append(match)
+            responses.append({"matches": matches})
+        return responses
+
+    def upsert(self, vectors):
+        self.index.upsert(vectors=[(p_id, _as_list(vec), meta) for p_id, vec, meta in vectors])
+
+    def update_metadata(self, items):
+        for p_id, meta in items:
+            self.index.update(id=p_id, set_metadata=meta)
+
+    def delete(self, ids):
+        if ids:
+            self.index.delete(ids=list(ids))
+
+
+# --- LOCAL (NUMPY / MMAP) BACKEND ---
+class LocalVectorStore(VectorStore):
+    """
+    Keeps L2-normalized float32 embeddings in a memory-mapped .npy file and the
+    metadata as a column-oriented JSON table. Scores are cosine similarities,
+    matching the Pinecone index metric.
+
+    With a generation_source, a serving process remaps the files when
+    ingestion bumps the index generation (checked every check_interval
+    seconds), like the result cache and the BM25 segments do.
+
+    persist() appends pending writes to a journal of small files and drops
+    them from memory; flush() merges the index, the journal and what is
+    still pending into new files. So an ingest checkpoint costs only the
+    rows written since the last one, and a crashed run keeps them.
+    """
+
+    def __init__(self, index_dir=LOCAL_INDEX_DIR, generation_source=None,
+                 check_interval=GENERATION_CHECK_INTERVAL):
+        super().__init__()
+        self.index_dir = index_dir
+        self.generation_source = generation_source
+        self.check_interval = check_interval
+        self.embeddings = None
+        self.ids = []
+        self.metadata = []
+        self._pending_upserts = {}
+        self._pending_meta = {} # Metadata-only updates for ids already in the index or journal
+        self._pending_deletes = set()
+        self._lock = threading.Lock() # Ingestion upserts from a thread pool
+        self._reload_lock = threading.Lock()
+        self._generation = generation_source() if generation_source else None
+        self._checked_at = time.time()
+        self.load()
+
+    def load(self):
+        emb_path = os.path.join(self.index_dir, EMBEDDINGS_FILE)
+        meta_path = os.path.join(self.index_dir, METADATA_FILE)
+        if not os.path.exists(emb_path) or not os.path.exists(meta_path):
+            embeddings = np.zeros((0, 0), dtype=np.float32)
+            ids, metadata = [], []
+        else:
+            embeddings = np.load(emb_path, mmap_mode="r")
+            with open(meta_path, mode='r', encoding='utf-8') as f:
+                table = json.load(f)
+            ids = table["ids"]
+            columns = table["columns"]
+            metadata = [
+                {name: values[i] for name, values in columns.items() if values[i] is not None}
+                for i in range(len(ids))
+            ]
+        bitmaps = MetadataBitmaps(metadata)
+
+        self.embeddings, self.ids, self.metadata, self.bitmaps = embeddings, ids, metadata, bitmaps
+        self._positions = {p_id: i for i, p_id in enumerate(ids)}
+        self._journal = self._journal_entries()
+        # Queries read this one tuple, so a reload never pairs new ids with old vectors
+        self._view = (embeddings, ids, metadata, bitmaps)
+
+    def _maybe_reload(self):
+        if self.generation_source is None:
+            return
+        now = time.time()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._reload_lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            generation = self.generation_source()
+            if generation != self._generation:
+                self._generation = generation
+                self.load()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query_batch(self, vectors, top_k=3, include_metadata=True, filter=None, include_values=False):
+        self._maybe_reload()
+        embeddings, ids, metadata, bitmaps = self._view
+        mask = bitmaps.mask(filter)
+        allowed = len(ids) if mask is None else int(mask.sum())
+        if not allowed:
+            return [{"matches": []} for _ in vectors]
+
+        queries = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+        scores = queries @ embeddings.T  # (n_queries, n_items) in one matmul
+        if mask is not None:
+            scores[:, ~mask] = -np.inf # Filtered rows can never make the top k
+
+        k = min(top_k, allowed)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        responses = []
+        for row, candidates in enumerate(top):
+            order = candidates[np.argsort(-scores[row, candidates])]
+            matches = []
+            for i in order:
+                match = {
+                    "id": ids[i],
+                    "score": float(scores[row, i]),
+                    "metadata": metadata[i] if include_metadata else {}
+                }
+                if include_values:
+                    match["values"] = np.asarray(embeddings[i])
+                matches.append(match)
+            responses.append({"matches": matches})
+        return responses
+
+    async def query_async(self, vector, top_k=3, include_metadata=True, filter=None, include_values=False):
+        # An in-memory matmul is cheaper than a thread hop
+        return self.query(vector, top_k, include_metadata, filter, include_values)
+
+    def upsert(self, vectors):
+        with self._lock:
+            for p_id, vec, meta in vectors:
+                self._pending_deletes.discard(p_id)
+                self._pending_meta.pop(p_id, None)
+                self._pending_upserts[p_id] = (np.asarray(vec, dtype=np.float32), meta)
+
+    def update_metadata(self, items):
+        with self._lock:
+            for p_id, meta in items:
+                if p_id in self._pending_upserts:
+                    self._pending_upserts[p_id] = (self._pending_upserts[p_id][0], meta)
+                elif p_id not in self._pending_deletes:
+                    self._pending_meta[p_id] = meta # Applied on flush if the id exists by then
+
+    def delete(self, ids):
+        with self._lock:
+            for p_id in ids:
+                self._pending_upserts.pop(p_id, None)
+                self._pending_meta.pop(p_id, None)
+                self._pending_deletes.add(p_id)
+
+    # --- JOURNAL ---
+    def _journal_entries(self):
+        """Committed journal entry numbers, oldest first (an entry commits when its .json lands)."""
+        directory = os.path.join(self.index_dir, JOURNAL_DIR)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(name[:-5]) for name in os.listdir(directory)
+                      if name.endswith(".json") and name[:-5].isdigit())
+
+    def _journal_path(self, entry, suffix):
+        return os.path.join(self.index_dir, JOURNAL_DIR, f"{entry:08d}{suffix}")
+
+    def persist(self):
+        """Appends pending writes to the journal and releases them from memory."""
+        with self._lock:
+            if not self._pending_upserts and not self._pending_meta and not self._pending_deletes:
+                return
+            entry = self._journal[-1] + 1 if self._journal else 0
+            os.makedirs(os.path.join(self.index_dir, JOURNAL_DIR), exist_ok=True)
+            ids = list(self._pending_upserts)
+            if ids:
+                matrix = _normalize(np.vstack([self._pending_upserts[p_id][0] for p_id in ids]).astype(np.float32))
+            else:
+                matrix = np.zeros((0, 0), dtype=np.float32)
+            with open(self._journal_path(entry, ".npy"), mode='wb') as f:
+                np.save(f, matrix)
+                os.fsync(f.fileno())
+            record = {
+                "ids": ids,
+                "metadata": [self._pending_upserts[p_id][1] for p_id in ids],
+                "metadata_updates": self._pending_meta,
+                "deletes": sorted(self._pending_deletes)
+            }
+            json_path = self._journal_path(entry, ".json")
+            with open(json_path + ".tmp", mode='w', encoding='utf-8') as f:
+                json.dump(record, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(json_path + ".tmp", json_path)
+            self._journal.append(entry)
+            self._pending_upserts = {}
+            self._pending_meta = {}
+            self._pending_deletes = set()
+
+    def flush(self):
+        """Merges the journal and pending writes into the on-disk files and remaps them."""
+        with self._lock:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        if not self._pending_upserts and not self._pending_meta and not self._pending_deletes and not self._journal:
+            return
+
+        # Resolve where every surviving row's vector comes from, applying writes in order:
+        # the current index, each journal entry, then what is still in memory
+        sources = {p_id: (None, i) for i, p_id in enumerate(self.ids)}
+        metas = dict(zip(self.ids, self.metadata))
+        journal = {}
+        dim = self.embeddings.shape[1] if self.embeddings.size else 0
+        layers = []
+        for entry in self._journal:
+            with open(self._journal_path(entry, ".json"), mode='r', encoding='utf-8') as f:
+                record = json.load(f)
+            journal[entry] = np.load(self._journal_path(entry, ".npy"), mmap_mode="r")
+            dim = dim or (journal[entry].shape[1] if journal[entry].size else 0)
+            layers.append((entry, record["ids"], record["metadata"], record["metadata_updates"], record["deletes"]))
+        pending_ids = list(self._pending_upserts)
+        if pending_ids:
+            journal["pending"] = np.vstack([self._pending_upserts[p_id][0] for p_id in pending_ids]).astype(np.float32)
+            dim = dim or journal["pending"].shape[1]
+        layers.append(("pending", pending_ids, [self._pending_upserts[p_id][1] for p_id in pending_ids],
+                       self._pending_meta, self._pending_deletes))
+        for source, ids, metadata, updates, deletes in layers:
+            for p_id in deletes:
+                sources.pop(p_id, None)
+                metas.pop(p_id, None)
+            for row, (p_id, meta) in enumerate(zip(ids, metadata)):
+                sources[p_id] = (source, row)
+                metas[p_id] = meta
+            for p_id, meta in updates.items():
+                if p_id in metas:
+                    metas[p_id] = meta
+
+        ids = list(sources)
+        metadata = [metas[p_id] for p_id in ids]
+
+        column_names = sorted({name for meta in metadata for name in meta})
+        table = {
+            "ids": ids,
+            "columns": {name: [meta.get(name) for meta in metadata] for name in column_names}
+        }
+
+        # Write to temp files then swap, so readers never see a half-written index
+        os.makedirs(self.index_dir, exist_ok=True)
+        emb_path = os.path.join(self.index_dir, EMBEDDINGS_FILE)
+        meta_path = os.path.join(self.index_dir, METADATA_FILE)
+        # Filled a chunk at a time straight into the new file, never stacked in memory
+        matrix = np.lib.format.open_memmap(emb_path + ".tmp", mode='w+', dtype=np.float32,
+                                           shape=(len(ids), dim if ids else 0))
+        codes = {source: code for code, source in enumerate([None, *journal])}
+        origin = np.fromiter((codes[sources[p_id][0]] for p_id in ids), dtype=np.int32, count=len(ids))
+        rows = np.fromiter((sources[p_id][1] for p_id in ids), dtype=np.int64, count=len(ids))
+        for source, code in codes.items():
+            positions = np.flatnonzero(origin == code)
+            vectors = self.embeddings if source is None else journal[source]
+            for start in range(0, len(positions), FLUSH_CHUNK_ROWS):
+                part = positions[start:start + FLUSH_CHUNK_ROWS]
+                chunk = np.asarray(vectors[rows[part]], dtype=np.float32)
+                matrix[part] = chunk if source is None else _normalize(chunk) # The index is stored normalized
+        matrix.flush()
+        del matrix
+        with open(meta_path + ".tmp", mode='w', encoding='utf-8') as f:
+            json.dump(table, f, separators=(",", ":"))
+        self.embeddings = None  # Release the old mapping before replacing the file
+        journal.clear()
+        os.replace(emb_path + ".tmp", emb_path)
+        os.replace(meta_path + ".tmp", meta_path)
+        for entry in self._journal: # Only once the merged files are in place
+            os.remove(self._journal_path(entry, ".json"))
+            os.remove(self._journal_path(entry, ".npy"))
+
+        self._pending_upserts = {}
+        self._pending_meta = {}
+        self._pending_deletes = set()
+        self.load()
+
+
+# --- HELPERS ---
+def _as_list(vector):
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def read_index_generation():
+    """Returns the current index generation number (0 if never ingested)."""
+    return read_generation(INDEX_GENERATION_FILE)
+
+def bump_index_generation():
+    """Increments the index generation after an ingestion run and returns it."""
+    return bump_generation(INDEX_GENERATION_FILE)
+
+def get_vector_store(backend=None, generation_source=None):
+    """
+    Returns the index backend selected by VECTOR_BACKEND. generation_source
+    (e.g. read_index_generation) makes the local backend follow new ingests;
+    Pinecone is always live.
+    """
+    backend = (backend or VECTOR_BACKEND).lower()
+    if backend == "local":
+        return LocalVectorStore(generation_source=generation_source)
+    if backend == "pinecone":
+        return PineconeVectorStore()
+    raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")